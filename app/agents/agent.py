@@ -1,22 +1,6 @@
 from google.adk.agents import LlmAgent
-from .tools.fetch_nearby import fetch_location_info
-from .tools.incident import CreateIncidentTool, UpdateIncidentTool
-from .tools.hospital import (
-    get_hospital_tool,
-    get_all_hospitals_tool,
-    get_nearby_hospitals_tool,
-)
-from .tools.ambulance import (
-    get_ambulance_tool,
-    create_ambulance_tool,
-    get_ambulance_assignment_tool,
-    get_ambulance_assignments_by_ambulance_tool,
-    get_ambulances_by_hospital_tool,
-    update_ambulance_location_tool,
-    update_ambulance_status_tool,
-    assign_ambulance_to_incident_tool,
-)
-from google.adk.tools import google_search
+from .tools.phases import PhaseToolset, advance_phase
+from app.services.orchestrator import launch_specialists
 
 root_agent = LlmAgent(
     name="emergency_supervisor_agent",
@@ -37,7 +21,10 @@ root_agent = LlmAgent(
         "2. **Triage Phase**: Classify severity: P1 (critical, e.g., cardiac arrest), P2 (urgent, e.g., chest pain), P3 (standard). Assign resources (e.g., ambulance with defibrillator). "
         "Provide pre-arrival instructions. Err on higher priority if unsure.\n"
         "3. **Location Phase**: Resolve exact coordinates/address using available tools. Compute ETA considering traffic. For P1, prioritize fastest routes.\n"
-        "4. **Dispatch Phase**: Find and allocate nearest available responders. Send notifications. Reserve units and track status.\n"
+        "4. **Dispatch Phase**: Find and allocate nearest available responders; get_dispatch_candidates returns them (and nearby hospitals) "
+        "precomputed for the incident; prefer its recommended_responder, planned across all active incidents. "
+        "Reserve the chosen responder with assign_responder_to_incident; if it reports the unit is no longer available, take the next candidate. "
+        "Use assign_ambulance_to_incident only for a hospital fleet ambulance (get_ambulances_by_hospital). Track unit status.\n"
         "5. **Hospital Phase**: Find suitable hospitals based on patient needs. Notify facilities with minimal PHI.\n"
         "6. **Audit Phase**: Log all steps, metrics, and decisions for compliance. Track response times and SLA.\n\n"
         "**General Rules**:\n"
@@ -48,23 +35,12 @@ root_agent = LlmAgent(
         "- **Early Incident Creation**: Log the incident immediately upon receiving any initial data to ensure auditability.\n"
         "- **Ongoing Conversation**: Keep the caller engaged and gather additional details as needed while responders are en route.\n"
         "- **Fallback**: If a phase fails, retry once then escalate.\n"
+        "- **Background Results**: Messages starting with [Background ...] come from specialist agents working on the incident. "
+        "Use them, and do not repeat work they report as done.\n"
         "Handle stressed callers calmly. Base decisions on standard emergency protocols. Your goal: Save lives efficiently."
     ),
-    tools=[
-        fetch_location_info, 
-        google_search, 
-        CreateIncidentTool, 
-        UpdateIncidentTool,
-        get_hospital_tool,
-        get_all_hospitals_tool,
-        get_nearby_hospitals_tool,
-        get_ambulance_tool,
-        create_ambulance_tool,
-        get_ambulance_assignment_tool,
-        get_ambulance_assignments_by_ambulance_tool,
-        get_ambulances_by_hospital_tool,
-        update_ambulance_location_tool,
-        update_ambulance_status_tool,
-        assign_ambulance_to_incident_tool,
-    ],
+    # Only the current incident phase's tools are declared to the model
+    tools=[PhaseToolset()],
+    # Phase first: launch_specialists reads the incident id it stores
+    after_tool_callback=[advance_phase, launch_specialists],
 ) 
\ No newline at end of file
@@ -1,13 +1,26 @@
 from google.adk.agents import LlmAgent
-from .tools.fetch_nearby import get_nearby_responders_tool, get_nearby_hospitals_tool
+from .tools.fetch_nearby import (
+    get_nearby_responders_tool,
+    get_nearby_hospitals_tool,
+    find_responders_expanding_radius_tool,
+    get_dispatch_candidates_tool,
+)
 
 dispatch_agent = LlmAgent(
     name="dispatch_agent",
     model="gemini-2.5-flash",
     description="Allocates ambulances, issues dispatch commands, tracks en-route status and ETA updates.",
     instruction=(
+        "Start with get_dispatch_candidates for the incident; it is usually precomputed. "
+        "Reserve its recommended_responder when present; it is planned across all active incidents. "
         "Match available responders to incident based on ETA, skills, and load. Reserve unit(s), notify crew via sms_sender, "
-        "and provide continuous ETA updates. If no ambulances are available locally, expand radius exponentially and escalate."
+        "and provide continuous ETA updates. If no ambulances are available locally, expand radius exponentially "
+        "(find_responders_expanding_radius) and escalate."
     ),
-    tools=[get_nearby_responders_tool, get_nearby_hospitals_tool],
+    tools=[
+        get_dispatch_candidates_tool,
+        get_nearby_responders_tool,
+        get_nearby_hospitals_tool,
+        find_responders_expanding_radius_tool,
+    ],
 )
\ No newline at end of file
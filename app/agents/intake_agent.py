@@ -1,5 +1,5 @@
 from google.adk.agents import LlmAgent
-from .tools.fetch_nearby import fetch_location_info
+from .tools.fetch_nearby import fetch_location_info_tool
 
 intake_agent = LlmAgent(
     name="intake_agent",
@@ -34,5 +34,5 @@ intake_agent = LlmAgent(
         "}\n\n"
         "**Emergency Rules**: Prioritize life over data. If unsure, assume worst-case and escalate. Keep responses under 30 seconds per interaction."
     ),
-    tools=[fetch_location_info],
+    tools=[fetch_location_info_tool],
 )
\ No newline at end of file
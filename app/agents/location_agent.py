@@ -1,5 +1,5 @@
 from google.adk.agents import LlmAgent
-from .tools.fetch_nearby import fetch_location_info
+from .tools.fetch_nearby import estimate_travel_time_tool, fetch_location_info_tool
 from google.adk.tools import google_search
 
 location_agent = LlmAgent(
@@ -12,7 +12,7 @@ location_agent = LlmAgent(
         "**Key Tasks**:\n"
         "1. Resolve location: Use provided coordinates/address. If vague (e.g., 'near hospital'), use `fetch_location_info` or `google_search` "
         "to get exact lat/lng and canonical address.\n"
-        "2. Compute ETA: Factor in traffic, distance, and priority (P1 gets priority routing). Estimate based on real-time data.\n"
+        "2. Compute ETA: Use `estimate_travel_time` for road-network driving time; factor in priority (P1 gets priority routing).\n"
         "3. Provide route details: Include confidence score and alternatives if traffic is bad.\n"
         "4. For P1 incidents, prioritize fastest route even if unconventional.\n"
         "5. Handle errors: If location unresolvable, use nearest landmark or GPS fallback.\n"
@@ -28,5 +28,5 @@ location_agent = LlmAgent(
         "}\n\n"
         "**Emergency Rules**: Complete in under 5 seconds. For P1, assume worst-case traffic. Use tools aggressively for precision."
     ),
-    tools=[fetch_location_info, google_search],
+    tools=[fetch_location_info_tool, estimate_travel_time_tool, google_search],
 )
\ No newline at end of file
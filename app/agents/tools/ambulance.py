@@ -6,15 +6,21 @@ from app.db.crud import (
     get_ambulances_by_hospital,
     update_ambulance_location,
     update_ambulance_status,
+    update_ambulance_assignment_status,
     assign_ambulance_to_incident,
 )
-from google.adk.tools import FunctionTool
+from app.agents.tools.base import AMBULANCE_FIELDS, ASSIGNMENT_FIELDS, TimedFunctionTool
+from app.utils.serialization import ResultShape
 
-get_ambulance_tool = FunctionTool(get_ambulance)
-create_ambulance_tool = FunctionTool(create_ambulance)
-get_ambulance_assignment_tool = FunctionTool(get_ambulance_assignment)
-get_ambulance_assignments_by_ambulance_tool = FunctionTool(get_ambulance_assignments_by_ambulance)
-get_ambulances_by_hospital_tool = FunctionTool(get_ambulances_by_hospital)
-update_ambulance_location_tool = FunctionTool(update_ambulance_location)
-update_ambulance_status_tool = FunctionTool(update_ambulance_status)
-assign_ambulance_to_incident_tool = FunctionTool(assign_ambulance_to_incident)
+AMBULANCE_SHAPE = ResultShape(fields=AMBULANCE_FIELDS, max_items=15, max_bytes=3072)
+ASSIGNMENT_SHAPE = ResultShape(fields=ASSIGNMENT_FIELDS, max_items=10, max_bytes=2048)
+
+get_ambulance_tool = TimedFunctionTool(get_ambulance, shape=AMBULANCE_SHAPE)
+create_ambulance_tool = TimedFunctionTool(create_ambulance, shape=AMBULANCE_SHAPE)
+get_ambulance_assignment_tool = TimedFunctionTool(get_ambulance_assignment, shape=ASSIGNMENT_SHAPE)
+get_ambulance_assignments_by_ambulance_tool = TimedFunctionTool(get_ambulance_assignments_by_ambulance, shape=ASSIGNMENT_SHAPE)
+get_ambulances_by_hospital_tool = TimedFunctionTool(get_ambulances_by_hospital, shape=AMBULANCE_SHAPE)
+update_ambulance_location_tool = TimedFunctionTool(update_ambulance_location, shape=AMBULANCE_SHAPE)
+update_ambulance_status_tool = TimedFunctionTool(update_ambulance_status, shape=AMBULANCE_SHAPE)
+assign_ambulance_to_incident_tool = TimedFunctionTool(assign_ambulance_to_incident, shape=ASSIGNMENT_SHAPE)
+update_ambulance_assignment_status_tool = TimedFunctionTool(update_ambulance_assignment_status, shape=ASSIGNMENT_SHAPE)
@@ -0,0 +1,60 @@
+import time
+from typing import Any, Callable, Optional
+
+from google.adk.tools import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+
+from app.core.metrics import TOOL_DURATION, TOOL_MONGO_TIME, TOOL_RESULT_BYTES, mongo_time
+from app.utils.serialization import ResultShape, shape_result
+
+# Per-document fields the agent needs; everything else stays out of the model context
+HOSPITAL_FIELDS = (
+    "_id", "name", "address", "contact_phone", "status", "beds_available", "specialties", "distance_km",
+)
+AMBULANCE_FIELDS = (
+    "_id", "hospital_id", "vehicle_number", "status", "current_location", "equipment", "capacity",
+)
+ASSIGNMENT_FIELDS = ("_id", "ambulance_id", "incident_id", "hospital_id", "status", "estimated_arrival")
+RESPONDER_FIELDS = (
+    "_id", "name", "vehicle_type", "status", "skills", "distance_km", "eta_minutes", "search_radius_km",
+)
+
+# Used when a tool does not declare its own shape
+DEFAULT_SHAPE = ResultShape(max_items=20)
+
+
+class TimedFunctionTool(FunctionTool):
+    """
+    FunctionTool that records its duration and the MongoDB time spent inside it,
+    shapes its result with ``shape`` before it reaches the model, and caches its
+    function declaration.
+    """
+
+    def __init__(self, func: Callable[..., Any], *, shape: Optional[ResultShape] = DEFAULT_SHAPE, **kwargs):
+        super().__init__(func=func, **kwargs)
+        self.shape = shape
+        self._declaration = None
+
+    def _get_declaration(self):
+        # Built from the signature by introspection; the result never changes, so
+        # build it once instead of on every request that lists this tool
+        if self._declaration is None:
+            self._declaration = super()._get_declaration()
+        return self._declaration
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        accumulator = [0.0]
+        token = mongo_time.set(accumulator)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await super().run_async(args=args, tool_context=tool_context)
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+            if self.shape is not None and result is not None:
+                result, size = shape_result(result, self.shape)
+                TOOL_RESULT_BYTES.observe(size, tool=self.name)
+            return result
+        finally:
+            mongo_time.reset(token)
+            TOOL_DURATION.observe(time.perf_counter() - started, tool=self.name, outcome=outcome)
+            TOOL_MONGO_TIME.observe(accumulator[0], tool=self.name)
@@ -1,21 +1,79 @@
-from app.db.crud import get_nearby_responders, get_nearby_hospitals
-from geopy.geocoders import Nominatim
-from google.adk.tools import FunctionTool
-
-def fetch_location_info(lat: float, lng: float) -> dict:
-    geolocator = Nominatim(user_agent="emergency_response_app")
-    location = geolocator.reverse((lat, lng), language='en')
-    print("Finding")
-    if location and location.raw and 'address' in location.raw:
-        address = location.raw['address']
-        return {
-            "city": address.get("city") or address.get("town") or address.get("village"),
-            "state": address.get("state"),
-            "country": address.get("country"),
-            "postcode": address.get("postcode")
+import asyncio
+
+from app.db.crud import (
+    get_incident,
+    get_nearby_responders,
+    get_nearby_hospitals,
+    find_responders_expanding_radius,
+    find_hospitals_expanding_radius,
+    estimate_travel_time,
+)
+from app.services.geocoding import reverse_geocode
+from app.services.optimizer import dispatch_optimizer
+from app.services.prefetch import dispatch_prefetcher
+from app.agents.tools.base import HOSPITAL_FIELDS, RESPONDER_FIELDS, TimedFunctionTool
+from app.utils.serialization import ResultShape, shape_result
+
+RESPONDER_SHAPE = ResultShape(fields=RESPONDER_FIELDS, max_items=10, max_bytes=3072)
+NEARBY_HOSPITAL_SHAPE = ResultShape(fields=HOSPITAL_FIELDS, max_items=5, max_bytes=2048)
+CANDIDATES_SHAPE = ResultShape(max_bytes=5120)
+
+async def fetch_location_info(lat: float, lng: float) -> dict:
+    """Resolve coordinates to city, state, country and postcode."""
+    return await reverse_geocode(lat, lng)
+
+async def get_dispatch_candidates(incident_id: str) -> dict:
+    """
+    Nearest available responders and suitable hospitals for an incident.
+
+    Computed in the background as soon as the incident has a location, so this
+    normally returns immediately. Use it before the individual nearby searches.
+    When present, recommended_responder is the unit planned for this incident
+    across all active incidents; prefer it over the nearest one so critical
+    incidents elsewhere keep their closest unit.
+
+    Args:
+        incident_id (str): The incident ID returned by create_incident.
+
+    Returns:
+        dict: {"incident_id", "responders", "hospitals"}, nearest first, plus
+        "recommended_responder" when the dispatch plan covers the incident; or
+        {"error": ...} if the incident has no location yet.
+    """
+    candidates = await dispatch_prefetcher.get(incident_id)
+    if candidates is None:
+        incident = await get_incident(incident_id)
+        location = incident and incident.get("location")
+        if not location or "lat" not in location or "lng" not in location:
+            return {"error": "Incident has no location yet", "incident_id": incident_id}
+        dispatch_prefetcher.schedule(incident_id, location)
+        candidates = await dispatch_prefetcher.get(incident_id)
+        if candidates is None:
+            # Prefetching is disabled; search directly
+            responders, hospitals = await asyncio.gather(
+                get_nearby_responders(location["lat"], location["lng"]),
+                get_nearby_hospitals(location["lat"], location["lng"]),
+            )
+            candidates = {"incident_id": incident_id, "responders": responders, "hospitals": hospitals}
+    result = {
+        "incident_id": incident_id,
+        "responders": shape_result(candidates["responders"], RESPONDER_SHAPE)[0],
+        "hospitals": shape_result(candidates["hospitals"], NEARBY_HOSPITAL_SHAPE)[0],
+    }
+    planned = dispatch_optimizer.recommendation(incident_id)
+    if planned is not None:
+        result["recommended_responder"] = {
+            "id": planned.responder_id,
+            "eta_minutes": planned.eta_minutes,
+            "distance_km": planned.distance_km,
         }
-    return {}
+    return result
+
+fetch_location_info_tool = TimedFunctionTool(func=fetch_location_info)
+get_nearby_responders_tool = TimedFunctionTool(func=get_nearby_responders, shape=RESPONDER_SHAPE)
+get_nearby_hospitals_tool = TimedFunctionTool(func=get_nearby_hospitals, shape=NEARBY_HOSPITAL_SHAPE)
+find_responders_expanding_radius_tool = TimedFunctionTool(func=find_responders_expanding_radius, shape=RESPONDER_SHAPE)
+find_hospitals_expanding_radius_tool = TimedFunctionTool(func=find_hospitals_expanding_radius, shape=NEARBY_HOSPITAL_SHAPE)
+estimate_travel_time_tool = TimedFunctionTool(func=estimate_travel_time)
 
-fetch_location_info_tool = FunctionTool(func=fetch_location_info)
-get_nearby_responders_tool = FunctionTool(func=get_nearby_responders)
-get_nearby_hospitals_tool = FunctionTool(func=get_nearby_hospitals)
\ No newline at end of file
+get_dispatch_candidates_tool = TimedFunctionTool(func=get_dispatch_candidates, shape=CANDIDATES_SHAPE)
@@ -1,6 +1,9 @@
 from app.db.crud import get_hospital, get_all_hospitals, get_nearby_hospitals
-from google.adk.tools import FunctionTool
+from app.agents.tools.base import HOSPITAL_FIELDS, TimedFunctionTool
+from app.utils.serialization import ResultShape
 
-get_hospital_tool = FunctionTool(get_hospital)
-get_all_hospitals_tool = FunctionTool(get_all_hospitals)
-get_nearby_hospitals_tool = FunctionTool(get_nearby_hospitals)
\ No newline at end of file
+HOSPITAL_SHAPE = ResultShape(fields=HOSPITAL_FIELDS, max_items=10, max_bytes=3072)
+
+get_hospital_tool = TimedFunctionTool(get_hospital, shape=HOSPITAL_SHAPE)
+get_all_hospitals_tool = TimedFunctionTool(get_all_hospitals, shape=HOSPITAL_SHAPE)
+get_nearby_hospitals_tool = TimedFunctionTool(get_nearby_hospitals, shape=HOSPITAL_SHAPE)
\ No newline at end of file
@@ -1,6 +1,11 @@
-from app.db.crud import create_incident, update_incident, create_response
-from google.adk.tools import FunctionTool
+from app.db.crud import create_incident, update_incident, create_response, assign_responder_to_incident
+from app.agents.tools.base import TimedFunctionTool
 from app.schemas.incident import Incident
+from app.utils.serialization import ResultShape
 
-CreateIncidentTool = FunctionTool(func=create_incident)
-UpdateIncidentTool = FunctionTool(func=update_incident)
\ No newline at end of file
+CreateIncidentTool = TimedFunctionTool(func=create_incident)
+UpdateIncidentTool = TimedFunctionTool(func=update_incident)
+assign_responder_to_incident_tool = TimedFunctionTool(
+    func=assign_responder_to_incident,
+    shape=ResultShape(fields=("_id", "incident_id", "responder_id", "status"), max_bytes=1024),
+)
@@ -0,0 +1,166 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import google_search
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.tool_context import ToolContext
+
+from app.agents.tools.ambulance import (
+    assign_ambulance_to_incident_tool,
+    get_ambulance_assignment_tool,
+    get_ambulance_assignments_by_ambulance_tool,
+    get_ambulance_tool,
+    get_ambulances_by_hospital_tool,
+    update_ambulance_assignment_status_tool,
+    update_ambulance_status_tool,
+)
+from app.agents.tools.fetch_nearby import (
+    estimate_travel_time_tool,
+    fetch_location_info_tool,
+    get_dispatch_candidates_tool,
+)
+from app.agents.tools.hospital import get_all_hospitals_tool, get_hospital_tool, get_nearby_hospitals_tool
+from app.agents.tools.incident import CreateIncidentTool, UpdateIncidentTool, assign_responder_to_incident_tool
+
+# Session state keys
+PHASE_KEY = "incident_phase"
+INCIDENT_KEY = "incident_id"
+# temp: state is never stored, so the flag lasts only for the call that set it
+LIVE_KEY = "temp:live_call"
+CALLER_KEY = "caller_id"
+
+# In call order; an incident only moves forward, and a new incident starts over
+PHASES = ("intake", "triage", "dispatch", "hospital")
+
+# Incident statuses that end its pipeline
+CLOSED_STATUSES = ("resolved", "cancelled", "closed")
+
+PHASE_TOOLS: Dict[str, Sequence[BaseTool]] = {
+    "intake": (fetch_location_info_tool, google_search, CreateIncidentTool, UpdateIncidentTool),
+    "triage": (
+        UpdateIncidentTool,
+        fetch_location_info_tool,
+        get_dispatch_candidates_tool,
+        get_nearby_hospitals_tool,
+    ),
+    "dispatch": (
+        UpdateIncidentTool,
+        get_dispatch_candidates_tool,
+        assign_responder_to_incident_tool,
+        get_nearby_hospitals_tool,
+        estimate_travel_time_tool,
+        get_ambulances_by_hospital_tool,
+        get_ambulance_tool,
+        assign_ambulance_to_incident_tool,
+        update_ambulance_status_tool,
+    ),
+    "hospital": (
+        UpdateIncidentTool,
+        get_hospital_tool,
+        get_nearby_hospitals_tool,
+        get_all_hospitals_tool,
+        get_ambulance_assignment_tool,
+        get_ambulance_assignments_by_ambulance_tool,
+        update_ambulance_assignment_status_tool,
+        update_ambulance_status_tool,
+    ),
+}
+
+
+def _dedupe(tools) -> List[BaseTool]:
+    seen, out = set(), []
+    for tool in tools:
+        if tool.name not in seen:
+            seen.add(tool.name)
+            out.append(tool)
+    return out
+
+
+def current_phase(state) -> str:
+    phase = state.get(PHASE_KEY) if state is not None else None
+    return phase if phase in PHASES else PHASES[0]
+
+
+def call_start_state(caller_id: str, resumed: bool) -> Dict[str, Any]:
+    """
+    State delta to apply when a live call starts on a session.
+
+    Sessions are reused per caller, so a fresh call starts a new incident
+    pipeline in intake. A call resuming the model's previous connection
+    carries on with the incident and phase it had.
+    """
+    state: Dict[str, Any] = {CALLER_KEY: caller_id}
+    if not resumed:
+        state[PHASE_KEY] = PHASES[0]
+        state[INCIDENT_KEY] = None
+    return state
+
+
+class PhaseToolset(BaseToolset):
+    """
+    Exposes only the tools for the session's current incident phase.
+
+    The phase lives in session state under ``incident_phase``; it is reset by
+    ``call_start_state`` and advanced by ``advance_phase`` as tools succeed.
+    Tool lists are built once per phase, and the tools cache their
+    declarations, so each request only picks a list.
+
+    Live calls (``temp:live_call`` in state) send their tool declarations once,
+    when the connection opens. For those the current phase and every later one
+    are exposed, so a call that starts in intake can still dispatch: a fresh
+    call gets every phase's tools and only a resumed one drops the phases it
+    has already passed.
+    """
+
+    def __init__(self, phase_tools: Dict[str, Sequence[BaseTool]] = PHASE_TOOLS):
+        super().__init__()
+        self._per_turn = {phase: _dedupe(phase_tools[phase]) for phase in PHASES}
+        self._from_phase = {
+            phase: _dedupe(tool for later in PHASES[i:] for tool in phase_tools[later])
+            for i, phase in enumerate(PHASES)
+        }
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        if readonly_context is None:
+            return self._from_phase[PHASES[0]]
+        state = readonly_context.state
+        phase = current_phase(state)
+        if state.get(LIVE_KEY):
+            return self._from_phase[phase]
+        return self._per_turn[phase]
+
+    async def close(self) -> None:
+        pass
+
+
+def _succeeded(tool_response: Any) -> bool:
+    return not (isinstance(tool_response, dict) and "error" in tool_response)
+
+
+def advance_phase(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> Optional[dict]:
+    """after_tool_callback that moves the incident to the next phase on milestone tools and resets it when closed."""
+    if not _succeeded(tool_response):
+        return None
+    state = tool_context.state
+    target = None
+    update = args.get("update_data") or {}
+    if tool.name == CreateIncidentTool.name:
+        # A new incident starts its own pipeline, whatever the previous one reached
+        incident_id = tool_response.get("result") if isinstance(tool_response, dict) else tool_response
+        state[INCIDENT_KEY] = incident_id or None
+        state[PHASE_KEY] = "triage"
+        return None
+    elif tool.name == UpdateIncidentTool.name and update.get("status") in CLOSED_STATUSES:
+        state[INCIDENT_KEY] = None
+        state[PHASE_KEY] = PHASES[0]
+        return None
+    elif tool.name == UpdateIncidentTool.name and "priority" in update:
+        target = "dispatch"
+    elif tool.name in (assign_responder_to_incident_tool.name, assign_ambulance_to_incident_tool.name):
+        target = "hospital"
+    if target and PHASES.index(target) > PHASES.index(current_phase(state)):
+        state[PHASE_KEY] = target
+    return None
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.db.crud import get_dashboard_stats
+from app.services.optimizer import dispatch_optimizer
+
+router = APIRouter()
+
+@router.get("/stats")
+async def dashboard_stats():
+    return await get_dashboard_stats()
+
+
+@router.get("/dispatch-plan")
+async def dispatch_plan():
+    return dispatch_optimizer.plan()
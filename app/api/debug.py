@@ -0,0 +1,60 @@
+import asyncio
+import hmac
+import os
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.config import settings
+from app.core.diagnostics import collapsed, loop_monitor, sample_stacks
+
+router = APIRouter()
+
+# One profile at a time per worker; sampling competes with the calls it observes
+_profiling = asyncio.Lock()
+
+
+def _denied(token: Optional[str]) -> Optional[JSONResponse]:
+    # Stacks expose internals and sampling holds the GIL: off by default, and never without the token
+    if not settings.PROFILE_ENABLED or not settings.DEBUG_TOKEN:
+        return JSONResponse({"error": "Debug endpoints are disabled"}, status_code=404)
+    if token is None or not hmac.compare_digest(token, settings.DEBUG_TOKEN):
+        return JSONResponse({"error": "Invalid debug token"}, status_code=403)
+    return None
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    threads: Literal["loop", "all"] = "loop",
+    lines: bool = False,
+    x_debug_token: Optional[str] = Header(default=None),
+):
+    """
+    Sample this worker's Python stacks and return them in collapsed (flame graph) format.
+
+    Feed the body to flamegraph.pl or open it in speedscope. ``threads=loop`` keeps
+    only the event-loop thread; ``lines`` splits frames by line number.
+    """
+    denied = _denied(x_debug_token)
+    if denied is not None:
+        return denied
+    if _profiling.locked():
+        return JSONResponse({"error": "A profile is already running on this worker"}, status_code=409)
+    thread_ids = [loop_monitor.loop_thread_id] if threads == "loop" and loop_monitor.loop_thread_id else None
+    async with _profiling:
+        counts = await asyncio.to_thread(
+            sample_stacks, min(seconds, settings.PROFILE_MAX_SECONDS), interval_ms / 1000, thread_ids, lines
+        )
+    return PlainTextResponse(collapsed(counts), headers={"X-Worker-Pid": str(os.getpid())})
+
+
+@router.get("/stalls")
+async def stalls(x_debug_token: Optional[str] = Header(default=None)):
+    """Recent callbacks that blocked the event loop, with the stack captured while they ran."""
+    denied = _denied(x_debug_token)
+    if denied is not None:
+        return denied
+    return {"pid": os.getpid(), "threshold_ms": settings.SLOW_CALLBACK_MS, "stalls": list(loop_monitor.stalls)}
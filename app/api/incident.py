@@ -1,8 +1,61 @@
-from fastapi import APIRouter
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from app.db.crud import get_latest_incident
+from app.services.incident_feed import incident_feed
 
 router = APIRouter()
 
+# Idle SSE connections get a comment line so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+
 @router.get("/")
 async def get_incident():
-    return await get_latest_incident()
\ No newline at end of file
+    return await get_latest_incident()
+
+@router.get("/stream")
+async def stream_incidents(
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events feed of incident creates and updates."""
+    subscription = incident_feed.subscribe(last_event_id_header or last_event_id)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    item = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                event_id, payload = item
+                if event_id:
+                    yield f"id: {event_id}\n"
+                yield f"data: {payload}\n\n"
+        finally:
+            incident_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def incident_updates_ws(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """WebSocket feed of incident creates and updates; each message is one JSON event."""
+    await websocket.accept()
+    subscription = incident_feed.subscribe(last_event_id)
+    try:
+        async for _, payload in subscription:
+            await websocket.send_text(payload)
+        # The feed dropped a subscriber that fell behind; it should reconnect and resume
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        incident_feed.unsubscribe(subscription)
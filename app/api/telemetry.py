@@ -0,0 +1,38 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from app.schemas.telemetry import PositionBatch
+from app.services.telemetry import telemetry_ingestor
+
+router = APIRouter()
+
+@router.post("/positions", status_code=202)
+async def ingest_positions(batch: PositionBatch):
+    result = telemetry_ingestor.ingest(batch.positions)
+    if telemetry_ingestor.saturated:
+        # Ask the sender to slow down until the next flush drains the buffer
+        retry_after = max(1, round(telemetry_ingestor.flush_interval))
+        return JSONResponse(result, status_code=429, headers={"Retry-After": str(retry_after)})
+    return result
+
+@router.websocket("/ws")
+async def ingest_positions_ws(websocket: WebSocket):
+    """Streams of {"positions": [...]} batches; each batch is acknowledged with its counts."""
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                batch = PositionBatch.model_validate_json(message)
+            except ValidationError as e:
+                await websocket.send_json({"error": e.errors(include_url=False)})
+                continue
+            result = telemetry_ingestor.ingest(batch.positions)
+            result["saturated"] = telemetry_ingestor.saturated
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/stats")
+async def telemetry_stats():
+    return telemetry_ingestor.snapshot()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services import vad
+from app.services.admission import admission
+from app.services.drain import worker_drain
+
+router = APIRouter()
+
+@router.get("/vad/stats")
+async def vad_stats():
+    """Bytes suppressed by the voice activity gate, per connected session."""
+    return vad.snapshot()
+
+
+@router.get("/workers")
+async def workers():
+    """Live sessions and drain state of every worker in the pool."""
+    return worker_drain.pool()
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness for the load balancer: 200 while this worker starts new calls without a hold, else 503."""
+    state = admission.state()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
@@ -8,4 +8,151 @@ class Settings:
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "emergency")
 
+    # Live agent sessions (per worker)
+    SESSION_MAX: int = int(os.getenv("SESSION_MAX", "1000"))
+    SESSION_IDLE_TTL_SECONDS: float = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "900"))
+    SESSION_EVICTION_INTERVAL_SECONDS: float = float(os.getenv("SESSION_EVICTION_INTERVAL_SECONDS", "60"))
+    # Session store: "memory" keeps sessions in the worker, "mongo" shares them across workers and nodes
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", "0.25"))
+    SESSION_FLUSH_BATCH: int = int(os.getenv("SESSION_FLUSH_BATCH", "500"))
+    SESSION_STORE_TTL_SECONDS: float = float(os.getenv("SESSION_STORE_TTL_SECONDS", "86400"))
+    # Live API resumption handles older than this are not offered on reconnect
+    SESSION_RESUMPTION_MAX_AGE_SECONDS: float = float(os.getenv("SESSION_RESUMPTION_MAX_AGE_SECONDS", "7200"))
+
+    # Reverse geocoding ("nominatim" or "offline")
+    GEOCODER_PROVIDER: str = os.getenv("GEOCODER_PROVIDER", "nominatim")
+    GEOCODER_TIMEOUT_SECONDS: float = float(os.getenv("GEOCODER_TIMEOUT_SECONDS", "5"))
+    GEOCODER_CACHE_PRECISION: int = int(os.getenv("GEOCODER_CACHE_PRECISION", "3"))
+    GEOCODER_CACHE_TTL_SECONDS: float = float(os.getenv("GEOCODER_CACHE_TTL_SECONDS", "3600"))
+    GEOCODER_CACHE_MAX_ENTRIES: int = int(os.getenv("GEOCODER_CACHE_MAX_ENTRIES", "10000"))
+    # Fallback and empty answers are cached this long so a provider outage is retried soon
+    GEOCODER_NEGATIVE_TTL_SECONDS: float = float(os.getenv("GEOCODER_NEGATIVE_TTL_SECONDS", "60"))
+    GAZETTEER_PATH: str = os.getenv("GAZETTEER_PATH", "data/gazetteer.csv")
+
+    # In-memory spatial index for nearby queries; "false" sends them to MongoDB $geoNear
+    SPATIAL_INDEX_ENABLED: bool = os.getenv("SPATIAL_INDEX_ENABLED", "true").lower() == "true"
+    # Every refresh reads documents changed since the last one; a full reload runs every
+    # SPATIAL_INDEX_FULL_REFRESH_SECONDS to pick up deletes
+    SPATIAL_INDEX_REFRESH_SECONDS: float = float(os.getenv("SPATIAL_INDEX_REFRESH_SECONDS", "30"))
+    SPATIAL_INDEX_FULL_REFRESH_SECONDS: float = float(os.getenv("SPATIAL_INDEX_FULL_REFRESH_SECONDS", "600"))
+
+    # Run dispatch writes in a multi-document transaction (requires a replica set)
+    DISPATCH_TRANSACTIONS: bool = os.getenv("DISPATCH_TRANSACTIONS", "false").lower() == "true"
+    # Average response speed behind every eta_minutes
+    DISPATCH_SPEED_KMH: float = float(os.getenv("DISPATCH_SPEED_KMH", "40"))
+
+    # Offline road graph for ETAs (see app/services/routing.py for the CSV format); without
+    # the files, ETAs stay straight-line at DISPATCH_SPEED_KMH
+    ROUTING_NODES_PATH: str = os.getenv("ROUTING_NODES_PATH", "data/road_nodes.csv")
+    ROUTING_EDGES_PATH: str = os.getenv("ROUTING_EDGES_PATH", "data/road_edges.csv")
+    ROUTING_LANDMARKS: int = int(os.getenv("ROUTING_LANDMARKS", "8"))
+    ROUTING_MAX_MINUTES: float = float(os.getenv("ROUTING_MAX_MINUTES", "60"))
+    ROUTING_CACHE_DESTINATIONS: int = int(os.getenv("ROUTING_CACHE_DESTINATIONS", "64"))
+    ROUTING_MAX_SNAP_KM: float = float(os.getenv("ROUTING_MAX_SNAP_KM", "1"))
+    ROUTING_ACCESS_SPEED_KMH: float = float(os.getenv("ROUTING_ACCESS_SPEED_KMH", "20"))
+
+    # Global assignment of available responders to unassigned active incidents, recomputed
+    # (after OPTIMIZER_DEBOUNCE_SECONDS) when incidents or responder availability change on
+    # this worker, and every OPTIMIZER_REFRESH_SECONDS for changes made by other workers
+    OPTIMIZER_ENABLED: bool = os.getenv("OPTIMIZER_ENABLED", "true").lower() == "true"
+    OPTIMIZER_DEBOUNCE_SECONDS: float = float(os.getenv("OPTIMIZER_DEBOUNCE_SECONDS", "0.5"))
+    OPTIMIZER_REFRESH_SECONDS: float = float(os.getenv("OPTIMIZER_REFRESH_SECONDS", "30"))
+    OPTIMIZER_CANDIDATES: int = int(os.getenv("OPTIMIZER_CANDIDATES", "32"))
+    OPTIMIZER_MAX_ETA_MINUTES: float = float(os.getenv("OPTIMIZER_MAX_ETA_MINUTES", "90"))
+
+    # Vehicle GPS telemetry
+    TELEMETRY_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "1"))
+    TELEMETRY_MAX_PENDING: int = int(os.getenv("TELEMETRY_MAX_PENDING", "50000"))
+
+    # Incident feed source: "auto" (change stream if available), "change_stream" or "local".
+    # Local events only reach subscribers of the worker that made the write, so run a
+    # replica set when gunicorn has more than one worker
+    INCIDENT_FEED_MODE: str = os.getenv("INCIDENT_FEED_MODE", "auto")
+    INCIDENT_FEED_HISTORY: int = int(os.getenv("INCIDENT_FEED_HISTORY", "1000"))
+    INCIDENT_FEED_QUEUE_SIZE: int = int(os.getenv("INCIDENT_FEED_QUEUE_SIZE", "256"))
+
+    # Live dashboard counters
+    COUNTERS_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("COUNTERS_FLUSH_INTERVAL_SECONDS", "1"))
+    COUNTERS_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("COUNTERS_RECONCILE_INTERVAL_SECONDS", "300"))
+
+    # Cache for hospital/ambulance/assignment reads, invalidated by this worker's writes
+    READ_CACHE_ENABLED: bool = os.getenv("READ_CACHE_ENABLED", "true").lower() == "true"
+    READ_CACHE_TTL_SECONDS: float = float(os.getenv("READ_CACHE_TTL_SECONDS", "30"))
+    READ_CACHE_MAX_ENTRIES: int = int(os.getenv("READ_CACHE_MAX_ENTRIES", "5000"))
+
+    # Background lookup of nearby responders/hospitals when an incident gets a location
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_TTL_SECONDS: float = float(os.getenv("PREFETCH_TTL_SECONDS", "120"))
+    PREFETCH_MAX_INCIDENTS: int = int(os.getenv("PREFETCH_MAX_INCIDENTS", "1000"))
+
+    # Worker recycling for live calls: after WORKER_RECYCLE_SESSIONS sessions (0 = never; set by
+    # gunicorn.conf.py), or when DRAIN_FILE is touched, a worker refuses new WebSockets and exits
+    # once its calls end or DRAIN_TIMEOUT_SECONDS pass. Per-worker counts go to WORKER_STATE_DIR.
+    WORKER_RECYCLE_SESSIONS: int = int(os.getenv("WORKER_RECYCLE_SESSIONS", "0"))
+    WORKER_RECYCLE_JITTER: int = int(os.getenv("WORKER_RECYCLE_JITTER", "50"))
+    DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "900"))
+    DRAIN_FILE: str = os.getenv("DRAIN_FILE", "/tmp/emergency-backend.drain")
+    WORKER_STATE_DIR: str = os.getenv("WORKER_STATE_DIR", "/tmp/emergency-backend-workers")
+    WORKER_STATE_INTERVAL_SECONDS: float = float(os.getenv("WORKER_STATE_INTERVAL_SECONDS", "2"))
+
+    # Admission control for live calls: the per-worker budget shrinks when smoothed event-loop
+    # lag or process CPU passes its target and grows back while both stay low. Callers over
+    # budget are put on hold for up to ADMISSION_MAX_WAIT_SECONDS, reconnects first.
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_INITIAL_SESSIONS: int = int(os.getenv("ADMISSION_INITIAL_SESSIONS", "20"))
+    ADMISSION_MIN_SESSIONS: int = int(os.getenv("ADMISSION_MIN_SESSIONS", "2"))
+    ADMISSION_MAX_SESSIONS: int = int(os.getenv("ADMISSION_MAX_SESSIONS", "200"))
+    ADMISSION_LAG_TARGET_MS: float = float(os.getenv("ADMISSION_LAG_TARGET_MS", "50"))
+    ADMISSION_CPU_TARGET: float = float(os.getenv("ADMISSION_CPU_TARGET", "0.85"))
+    ADMISSION_SAMPLE_INTERVAL_SECONDS: float = float(os.getenv("ADMISSION_SAMPLE_INTERVAL_SECONDS", "0.5"))
+    ADMISSION_MAX_WAITING: int = int(os.getenv("ADMISSION_MAX_WAITING", "50"))
+    ADMISSION_MAX_WAIT_SECONDS: float = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+    ADMISSION_HOLD_UPDATE_SECONDS: float = float(os.getenv("ADMISSION_HOLD_UPDATE_SECONDS", "5"))
+
+    # "single": root agent does everything in the live session; "orchestrated": specialist
+    # agents run concurrently on a non-live model and report back into the live session
+    AGENT_MODE: str = os.getenv("AGENT_MODE", "single")
+    SPECIALIST_MODEL: str = os.getenv("SPECIALIST_MODEL", "gemini-2.5-flash")
+    SPECIALIST_TIMEOUT_SECONDS: float = float(os.getenv("SPECIALIST_TIMEOUT_SECONDS", "30"))
+
+    # Logging: LOG_FORMAT "json" or "text"; frame-level records are DEBUG, one in LOG_FRAME_SAMPLE_EVERY per session
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_FRAME_SAMPLE_EVERY: int = int(os.getenv("LOG_FRAME_SAMPLE_EVERY", "50"))
+
+    # Diagnostics: loop lag is sampled every LOOP_LAG_INTERVAL_MS (percentiles over the last
+    # LOOP_LAG_WINDOW samples on /health); a watchdog thread logs the loop's stack whenever a
+    # callback holds it for SLOW_CALLBACK_MS. /debug/profile samples stacks on demand and
+    # /debug/stalls lists the captured stacks; both are off unless PROFILE_ENABLED is set and
+    # the request carries DEBUG_TOKEN in an X-Debug-Token header.
+    LOOP_LAG_INTERVAL_MS: float = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+    LOOP_LAG_WINDOW: int = int(os.getenv("LOOP_LAG_WINDOW", "600"))
+    SLOW_CALLBACK_MS: float = float(os.getenv("SLOW_CALLBACK_MS", "100"))
+    SLOW_CALLBACK_HISTORY: int = int(os.getenv("SLOW_CALLBACK_HISTORY", "50"))
+    PROFILE_ENABLED: bool = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    DEBUG_TOKEN: str = os.getenv("DEBUG_TOKEN", "")
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+    # Voice activity gate on caller audio; backend "auto" (Silero if installed), "silero" or "energy"
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "false").lower() == "true"
+    VAD_BACKEND: str = os.getenv("VAD_BACKEND", "auto")
+    VAD_SAMPLE_RATE: int = int(os.getenv("VAD_SAMPLE_RATE", "16000"))
+    VAD_THRESHOLD: float = float(os.getenv("VAD_THRESHOLD", "0.5"))
+    VAD_ENERGY_RMS: float = float(os.getenv("VAD_ENERGY_RMS", "300"))
+    VAD_HANGOVER_MS: int = int(os.getenv("VAD_HANGOVER_MS", "800"))
+    VAD_PREROLL_MS: int = int(os.getenv("VAD_PREROLL_MS", "400"))
+    # Send activity start/end to the model instead of relying on its own turn detection
+    VAD_ACTIVITY_MARKERS: bool = os.getenv("VAD_ACTIVITY_MARKERS", "false").lower() == "true"
+
+    # WebSocket bridge queues per session; audio policies "drop_oldest", "drop_newest" or "merge"
+    STREAM_INBOUND_MAX_AUDIO_FRAMES: int = int(os.getenv("STREAM_INBOUND_MAX_AUDIO_FRAMES", "50"))
+    STREAM_INBOUND_AUDIO_POLICY: str = os.getenv("STREAM_INBOUND_AUDIO_POLICY", "drop_oldest")
+    STREAM_OUTBOUND_MAX_AUDIO_FRAMES: int = int(os.getenv("STREAM_OUTBOUND_MAX_AUDIO_FRAMES", "50"))
+    STREAM_OUTBOUND_AUDIO_POLICY: str = os.getenv("STREAM_OUTBOUND_AUDIO_POLICY", "merge")
+    STREAM_MERGE_MAX_BYTES: int = int(os.getenv("STREAM_MERGE_MAX_BYTES", "96000"))
+    # Partial text shorter than this many characters waits up to STREAM_TEXT_COALESCE_MS for more
+    STREAM_TEXT_COALESCE_CHARS: int = int(os.getenv("STREAM_TEXT_COALESCE_CHARS", "32"))
+    STREAM_TEXT_COALESCE_MS: float = float(os.getenv("STREAM_TEXT_COALESCE_MS", "30"))
+
 settings = Settings()
\ No newline at end of file
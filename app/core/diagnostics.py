@@ -0,0 +1,172 @@
+# Event-loop lag, blocked-loop stack capture and an on-demand sampling profiler
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as StackCounts
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import registry
+
+logger = get_logger("diagnostics")
+
+LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke from a timed sleep.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = registry.counter(
+    "event_loop_stalls_total", "Times a callback held the event loop past the slow-callback threshold."
+)
+
+PERCENTILES = (50, 90, 99)
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LoopMonitor:
+    """
+    Samples event-loop lag and catches callbacks that block the loop.
+
+    ``run`` sleeps ``interval`` seconds at a time and records how late each
+    wake-up was; the last ``window`` samples back the percentiles reported by
+    ``/health``. Each wake-up also refreshes a heartbeat. A watchdog thread
+    checks it, and when the loop has not woken for ``slow_threshold`` seconds
+    past its sleep it captures the loop thread's stack while the culprit is
+    still running. The stack, and how long the loop was held, is logged and
+    kept in ``stalls`` (last ``history`` entries).
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600, slow_threshold: float = 0.1, history: int = 50):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.started_at = time.time()
+        self.loop_thread_id: Optional[int] = None
+        self.stalls: Deque[dict] = deque(maxlen=history)
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._heartbeat = time.monotonic()
+        # Stall being watched by the watchdog; finished by the loop when it wakes
+        self._open_stall: Optional[dict] = None
+        self._stop = threading.Event()
+
+    def percentiles(self) -> Dict[str, float]:
+        ordered = sorted(self._samples)
+        report = {f"p{pct}_ms": round(_percentile(ordered, pct) * 1000, 3) for pct in PERCENTILES}
+        report["max_ms"] = round(ordered[-1] * 1000, 3) if ordered else 0.0
+        report["samples"] = len(ordered)
+        return report
+
+    def recent_lag(self, seconds: float) -> float:
+        """Mean lag over the samples taken in the last ``seconds`` (at least one)."""
+        count = max(1, int(seconds / self.interval))
+        recent = list(self._samples)[-count:]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "loop_lag": self.percentiles(),
+            "stalls": len(self.stalls),
+            "last_stall_at": self.stalls[-1]["at"] if self.stalls else None,
+        }
+
+    def _watch(self):
+        while not self._stop.wait(self.slow_threshold / 2):
+            behind = time.monotonic() - self._heartbeat - self.interval
+            if behind < self.slow_threshold or self._open_stall is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stall = {
+                "at": time.time(),
+                "blocked_ms": round(behind * 1000, 1),
+                "finished": False,
+                "stack": traceback.format_stack(frame) if frame is not None else [],
+            }
+            self._open_stall = stall
+            self.stalls.append(stall)
+            LOOP_STALLS.inc()
+
+    def _woke(self, lag: float):
+        self._heartbeat = time.monotonic()
+        self._samples.append(lag)
+        LOOP_LAG.observe(lag)
+        stall = self._open_stall
+        if stall is not None:
+            self._open_stall = None
+            stall["blocked_ms"] = round(lag * 1000, 1)
+            stall["finished"] = True
+            logger.warning(
+                "event loop blocked",
+                extra={"fields": {"blocked_ms": stall["blocked_ms"], "stack": "".join(stall["stack"][-12:])}},
+            )
+
+    async def run(self):
+        """Background loop; cancel it on shutdown (the watchdog thread stops with it)."""
+        loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self._woke(max(loop.time() - expected, 0.0))
+        finally:
+            self._stop.set()
+
+
+def _frame_label(frame, lines: bool) -> str:
+    code = frame.f_code
+    where = f"{os.path.basename(code.co_filename)}:{frame.f_lineno}" if lines else os.path.basename(code.co_filename)
+    return f"{code.co_name} ({where})"
+
+
+def sample_stacks(
+    seconds: float, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None, lines: bool = False
+) -> StackCounts:
+    """
+    Sample Python stacks for ``seconds`` and count identical ones.
+
+    Runs in its own thread (the caller's is skipped). Keys are root-first,
+    ``;``-separated frames prefixed with the thread name: the collapsed format
+    flamegraph.pl and speedscope read.
+    """
+    wanted = set(thread_ids) if thread_ids is not None else None
+    own = threading.get_ident()
+    counts: StackCounts = StackCounts()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (wanted is not None and ident not in wanted):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame, lines))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: StackCounts) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_LAG_INTERVAL_MS / 1000,
+    window=settings.LOOP_LAG_WINDOW,
+    slow_threshold=settings.SLOW_CALLBACK_MS / 1000,
+    history=settings.SLOW_CALLBACK_HISTORY,
+)
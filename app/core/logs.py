@@ -0,0 +1,133 @@
+# Structured logging: JSON records written to stdout from a background thread
+
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+
+LOGGER_NAME = "app"
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from ``extra={"fields": {...}}``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _FieldsQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib version formats the message on the caller's thread; defer it
+        # to the listener, only resolving args so the record is safe to hand over
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging() -> logging.Logger:
+    """
+    Route the ``app`` logger through a queue to a stdout writer thread.
+
+    Callers only pay for building a record and a queue put; formatting and the
+    blocking write happen on the listener thread. Safe to call more than once.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger.handlers = [_FieldsQueueHandler(records)]
+    # Keep uvicorn/gunicorn root handlers from writing the same record again
+    logger.propagate = False
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Drain the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class FrameLogger:
+    """
+    Per-session, per-direction logger for frame-level events.
+
+    Logs one frame in ``sample_every`` at DEBUG with session id, direction, byte
+    count and latency. Unsampled frames cost a counter increment; nothing is
+    formatted unless the record is actually emitted.
+    """
+
+    def __init__(self, logger: logging.Logger, session_id: str, direction: str, sample_every: int):
+        self.logger = logger
+        self.session_id = session_id
+        self.direction = direction
+        self.sample_every = max(sample_every, 1)
+        self.frames = 0
+        self.bytes = 0
+
+    def frame(self, kind: str, size: int, started: Optional[float] = None):
+        """Record one frame; ``started`` is a ``time.perf_counter()`` taken before handling it."""
+        self.frames += 1
+        self.bytes += size
+        if self.frames % self.sample_every or not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        fields = {
+            "session_id": self.session_id,
+            "direction": self.direction,
+            "kind": kind,
+            "bytes": size,
+            "frames": self.frames,
+            "total_bytes": self.bytes,
+        }
+        if started is not None:
+            fields["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.logger.debug("frame", extra={"fields": fields})
+
+    def event(self, message: str, **fields):
+        """Log a non-frame event (turn complete, interrupted, text) for this session at INFO."""
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(
+                message,
+                extra={"fields": {"session_id": self.session_id, "direction": self.direction, **fields}},
+            )
@@ -0,0 +1,300 @@
+# In-process metrics with Prometheus text exposition
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to slow model turns
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        # Updates come from the event loop and from driver threads (command listener)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_label_str(self.label_names, key)} {value}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time from ``collect`` callbacks."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: List[Callable[[], Dict[Tuple[str, ...], float]]] = []
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self, callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Register a callback returning {label values tuple: value}, evaluated on each scrape."""
+        self._callbacks.append(callback)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for callback in self._callbacks:
+            values.update(callback())
+        return self.header() + [
+            f"{self.name}{_label_str(self.label_names, key)} {value}" for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. ``observe`` is a bisect and three additions under a
+    lock, cheap enough for per-frame use.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def total(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _label_str(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# One registry per worker process
+registry = Registry()
+
+# Streaming bridge
+STREAM_RECEIVE_TO_SEND = registry.histogram(
+    "stream_receive_to_send_seconds",
+    "WebSocket receive to hand-off to the live request queue.",
+    ["kind"],
+)
+STREAM_FIRST_AUDIO = registry.histogram(
+    "stream_first_agent_audio_seconds",
+    "Last caller speech to the first agent audio byte sent to the client.",
+)
+STREAM_TURN_COMPLETE = registry.histogram(
+    "stream_turn_complete_seconds",
+    "Last caller speech or text to turn_complete.",
+)
+
+# Tools and MongoDB
+TOOL_DURATION = registry.histogram(
+    "tool_duration_seconds", "FunctionTool invocation time.", ["tool", "outcome"]
+)
+TOOL_MONGO_TIME = registry.histogram(
+    "tool_mongo_seconds", "MongoDB command time spent inside one tool invocation.", ["tool"]
+)
+TOOL_RESULT_BYTES = registry.histogram(
+    "tool_result_bytes",
+    "Encoded size of shaped tool results sent to the model.",
+    ["tool"],
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536),
+)
+MONGO_COMMAND_DURATION = registry.histogram(
+    "mongo_command_seconds", "MongoDB command round trip as seen by the driver.", ["command", "outcome"]
+)
+
+# Call pipeline
+INCIDENT_TO_DISPATCH = registry.histogram(
+    "incident_to_dispatch_seconds",
+    "Incident creation to the first unit reserved for it, by agent mode.",
+    ["mode"],
+)
+SPECIALIST_DURATION = registry.histogram(
+    "specialist_agent_seconds", "Background specialist agent run time.", ["agent", "outcome"]
+)
+
+_incident_created: "OrderedDict[str, float]" = OrderedDict()
+MAX_TRACKED_INCIDENTS = 10000
+
+
+def mark_incident_created(incident_id: str):
+    _incident_created[str(incident_id)] = time.monotonic()
+    while len(_incident_created) > MAX_TRACKED_INCIDENTS:
+        _incident_created.popitem(last=False)
+
+
+def mark_incident_dispatched(incident_id: str, mode: str):
+    """Observe incident-to-dispatch once, for the first unit reserved in this worker."""
+    created = _incident_created.pop(str(incident_id), None)
+    if created is not None:
+        INCIDENT_TO_DISPATCH.observe(time.monotonic() - created, mode=mode)
+
+
+# Mutable accumulator for MongoDB time within the current tool call. Motor copies
+# the context into its executor threads, so the command listener adds to the
+# same list the awaiting tool created.
+mongo_time: ContextVar[Optional[list]] = ContextVar("mongo_time", default=None)
+
+
+def record_mongo_command(command: str, seconds: float, outcome: str):
+    MONGO_COMMAND_DURATION.observe(seconds, command=command, outcome=outcome)
+    accumulator = mongo_time.get()
+    if accumulator is not None:
+        accumulator[0] += seconds
+
+
+# Peak sample level (16-bit PCM) above which a caller chunk counts as speech for turn timing
+SPEECH_PEAK = 1000
+
+
+class TurnTimer:
+    """
+    Turn latency for one connection, shared by both bridge directions.
+
+    The reference point is the last caller chunk with audible speech (or the last
+    text message), so a microphone streaming silence does not reset it.
+    """
+
+    def __init__(self):
+        self._last_input: Optional[float] = None
+        self._awaiting_audio = False
+
+    def caller_audio(self, pcm: bytes, received: float):
+        if len(pcm) < 2:
+            return
+        samples = memoryview(pcm)[: len(pcm) & ~1].cast("h")
+        if max(samples) >= SPEECH_PEAK or min(samples) <= -SPEECH_PEAK:
+            self._last_input = received
+            self._awaiting_audio = True
+
+    def caller_text(self, received: float):
+        self._last_input = received
+        self._awaiting_audio = True
+
+    def agent_audio(self):
+        if self._awaiting_audio and self._last_input is not None:
+            STREAM_FIRST_AUDIO.observe(time.perf_counter() - self._last_input)
+        self._awaiting_audio = False
+
+    def turn_complete(self):
+        if self._last_input is not None:
+            STREAM_TURN_COMPLETE.observe(time.perf_counter() - self._last_input)
+        self._last_input = None
+        self._awaiting_audio = False
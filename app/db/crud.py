@@ -2,7 +2,37 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.db.session import get_db
+from app.core.config import settings
+from app.core.metrics import mark_incident_created
+from app.services.counters import live_counters
+from app.services.incident_feed import incident_feed
+from app.services.optimizer import dispatch_optimizer
+from app.services.prefetch import dispatch_prefetcher
+from app.services.read_cache import (
+    ALL_HOSPITALS_TAG,
+    ambulance_assignments_tag,
+    ambulance_tag,
+    assignment_tag,
+    hospital_fleet_tag,
+    hospital_tag,
+    read_cache,
+)
+from app.services.dispatch import DispatchConflict, dispatch_ambulance, dispatch_responder
+from app.services.routing import road_router
+from app.services.spatial_index import point_of, responder_index, hospital_index
+from app.utils.geo import haversine_km
+
+# Fields returned by the mutators. Writes return the document in the same round
+# trip (find_one_and_update / the inserted dict) and only what the agent needs.
+AMBULANCE_PROJECTION = {
+    "hospital_id": 1, "vehicle_number": 1, "status": 1,
+    "current_location": 1, "updated_at": 1,
+}
+RESPONDER_PROJECTION = {"name": 1, "status": 1, "vehicle_type": 1, "location": 1}
+HOSPITAL_PROJECTION = {"name": 1, "status": 1, "beds_available": 1}
+RESPONSE_PROJECTION = {"incident_id": 1, "responder_id": 1, "status": 1}
 
 # User operations (kept from original)
 async def get_user(user_id: str):
@@ -11,8 +41,9 @@ async def get_user(user_id: str):
 
 async def create_user(data: dict):
     db = await get_db()
-    result = await db.users.insert_one(data)
-    return await db.users.find_one({"_id": result.inserted_id})
+    # insert_one sets data["_id"]
+    await db.users.insert_one(data)
+    return data
 
 async def get_user_by_email(email: str):
     db = await get_db()
@@ -43,9 +74,19 @@ async def create_incident(data: dict) -> dict:
         The unique identifier of the created incident.
     """
     db = await get_db()
+    data.setdefault("priority", "P3")
+    data.setdefault("status", "active")
     data["created_at"] = datetime.now(timezone.utc)
     data["updated_at"] = datetime.now(timezone.utc)
     result = await db.incidents.insert_one(data)
+    live_counters.record_incident(None, data)
+    incident_feed.notify("insert", data)
+    mark_incident_created(result.inserted_id)
+    if data["status"] == "active":
+        # Dispatch candidates are usually ready before the agent asks for them
+        dispatch_prefetcher.schedule(str(result.inserted_id), data.get("location"))
+        if data.get("location"):
+            dispatch_optimizer.request()
     return str(result.inserted_id)
 
 async def get_incident(incident_id: str):
@@ -96,13 +137,44 @@ async def update_incident(incident_id: str, update_data: dict):
         Exception: If the database operation fails (e.g., invalid incident_id or connection issues).
             Specific exceptions depend on the database driver used.
     """
+    await _apply_incident_update(incident_id, update_data)
+    return incident_id
+
+async def escalate_incident_priority(incident_id: str, priority: str) -> bool:
+    """
+    Raise an incident's priority, never lowering it.
+
+    The comparison happens in the update filter, so a priority the call agent
+    raised in the meantime is not overwritten with a lower one. A missing
+    priority counts as the lowest.
+
+    Returns:
+        bool: Whether the priority was changed.
+    """
+    return await _apply_incident_update(
+        incident_id, {"priority": priority}, {"priority": {"$not": {"$lte": priority}}}
+    )
+
+async def _apply_incident_update(incident_id: str, update_data: dict, conditions: Optional[dict] = None) -> bool:
     db = await get_db()
     update_data["updated_at"] = datetime.now(timezone.utc)
-    await db.incidents.update_one(
-        {"_id": ObjectId(incident_id)}, 
-        {"$set": update_data}
+    # The previous version feeds the counters; the new one is built locally
+    before = await db.incidents.find_one_and_update(
+        {"_id": ObjectId(incident_id), **(conditions or {})},
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
-    return incident_id
+    if before:
+        incident = {**before, **update_data}
+        live_counters.record_incident(before, incident)
+        incident_feed.notify("update", incident)
+        if incident.get("status") != "active":
+            dispatch_prefetcher.discard(incident_id)
+        elif "location" in update_data:
+            dispatch_prefetcher.schedule(incident_id, update_data["location"])
+        if update_data.keys() & {"location", "priority", "status", "assigned_responder_id"}:
+            dispatch_optimizer.request()
+    return before is not None
 
 async def get_active_incidents(limit: int = 50):
     db = await get_db()
@@ -133,8 +205,9 @@ async def create_ambulance(data: dict) -> dict:
     db = await get_db()
     data["created_at"] = datetime.now(timezone.utc)
     data["updated_at"] = datetime.now(timezone.utc)
-    result = await db.ambulances.insert_one(data)
-    return await db.ambulances.find_one({"_id": result.inserted_id})
+    await db.ambulances.insert_one(data)
+    read_cache.invalidate(hospital_fleet_tag(data.get("hospital_id")))
+    return data
 
 async def get_ambulance(ambulance_id: str) -> Optional[dict]:
     """
@@ -146,8 +219,13 @@ async def get_ambulance(ambulance_id: str) -> Optional[dict]:
     Returns:
         dict or None: The ambulance document if found, else None.
     """
-    db = await get_db()
-    return await db.ambulances.find_one({"_id": ObjectId(ambulance_id)})
+    async def load():
+        db = await get_db()
+        return await db.ambulances.find_one({"_id": ObjectId(ambulance_id)})
+
+    return await read_cache.get_or_load(
+        ("ambulance", ambulance_id), load, lambda doc: [ambulance_tag(ambulance_id)]
+    )
 
 async def update_ambulance_status(ambulance_id: str, status: str, current_location: Optional[Dict[str, float]] = None) -> Optional[dict]:
     """
@@ -165,11 +243,17 @@ async def update_ambulance_status(ambulance_id: str, status: str, current_locati
     update_fields = {"status": status, "updated_at": datetime.now(timezone.utc)}
     if current_location:
         update_fields["current_location"] = current_location
-    await db.ambulances.update_one(
+    ambulance = await db.ambulances.find_one_and_update(
         {"_id": ObjectId(ambulance_id)},
-        {"$set": update_fields}
+        {"$set": update_fields},
+        projection=AMBULANCE_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    # A status change can move the ambulance in or out of status-filtered fleet lists
+    read_cache.invalidate(
+        ambulance_tag(ambulance_id), ambulance and hospital_fleet_tag(ambulance.get("hospital_id"))
     )
-    return await db.ambulances.find_one({"_id": ObjectId(ambulance_id)})
+    return ambulance
 
 async def update_ambulance_location(ambulance_id: str, current_location: Dict[str, float]) -> Optional[dict]:
     """
@@ -183,11 +267,14 @@ async def update_ambulance_location(ambulance_id: str, current_location: Dict[st
         dict or None: The updated ambulance document.
     """
     db = await get_db()
-    await db.ambulances.update_one(
+    ambulance = await db.ambulances.find_one_and_update(
         {"_id": ObjectId(ambulance_id)},
-        {"$set": {"current_location": current_location, "updated_at": datetime.now(timezone.utc)}}
+        {"$set": {"current_location": current_location, "updated_at": datetime.now(timezone.utc)}},
+        projection=AMBULANCE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    return await db.ambulances.find_one({"_id": ObjectId(ambulance_id)})
+    read_cache.invalidate(ambulance_tag(ambulance_id))
+    return ambulance
 
 async def get_ambulances_by_hospital(hospital_id: str, status: Optional[str] = None) -> List[dict]:
     """
@@ -200,11 +287,18 @@ async def get_ambulances_by_hospital(hospital_id: str, status: Optional[str] = N
     Returns:
         List[dict]: List of matching ambulance documents.
     """
-    db = await get_db()
-    query = {"hospital_id": hospital_id}
-    if status:
-        query["status"] = status
-    return await db.ambulances.find(query).to_list(length=None)
+    async def load():
+        db = await get_db()
+        query = {"hospital_id": hospital_id}
+        if status:
+            query["status"] = status
+        return await db.ambulances.find(query).to_list(length=None)
+
+    return await read_cache.get_or_load(
+        ("ambulances_by_hospital", hospital_id, status or ""),
+        load,
+        lambda docs: [hospital_fleet_tag(hospital_id)] + [ambulance_tag(d["_id"]) for d in docs],
+    )
 
 async def assign_ambulance_to_incident(assignment_data: dict) -> dict:
     """
@@ -219,17 +313,40 @@ async def assign_ambulance_to_incident(assignment_data: dict) -> dict:
             - status (str): Assignment status ("assigned", "en_route", "arrived", "completed").
 
     Returns:
-        dict: The created assignment document.
+        dict: The created assignment document, or {"error": ...} if the ambulance
+        is not operational (e.g. already dispatched to another incident) or the
+        incident already has a unit.
+    """
+    try:
+        return await dispatch_ambulance(assignment_data)
+    except DispatchConflict as e:
+        return {"error": str(e), "ambulance_id": assignment_data["ambulance_id"]}
+
+async def update_ambulance_assignment_status(assignment_id: str, status: str) -> Optional[dict]:
+    """
+    Move an ambulance assignment to a new status.
+
+    Args:
+        assignment_id (str): Assignment document ID.
+        status (str): New status ("assigned", "en_route", "arrived", "completed").
+
+    Returns:
+        dict or None: The updated assignment document, or None if it does not exist.
     """
     db = await get_db()
-    assignment_data["created_at"] = datetime.now(timezone.utc)
-    result = await db.ambulance_assignments.insert_one(assignment_data)
-    # Optionally update ambulance status to "en_route"
-    await db.ambulances.update_one(
-        {"_id": ObjectId(assignment_data["ambulance_id"])},
-        {"$set": {"status": "en_route", "updated_at": datetime.now(timezone.utc)}}
+    before = await db.ambulance_assignments.find_one_and_update(
+        {"_id": ObjectId(assignment_id)},
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    live_counters.record_assignment(before.get("hospital_id"), before.get("status", "assigned"), status)
+    read_cache.invalidate(
+        assignment_tag(assignment_id), before.get("ambulance_id") and ambulance_assignments_tag(before["ambulance_id"])
     )
-    return await db.ambulance_assignments.find_one({"_id": result.inserted_id})
+    before["status"] = status
+    return before
 
 async def get_ambulance_assignment(assignment_id: str) -> Optional[dict]:
     """
@@ -241,8 +358,13 @@ async def get_ambulance_assignment(assignment_id: str) -> Optional[dict]:
     Returns:
         dict or None: The assignment document if found, else None.
     """
-    db = await get_db()
-    return await db.ambulance_assignments.find_one({"_id": ObjectId(assignment_id)})
+    async def load():
+        db = await get_db()
+        return await db.ambulance_assignments.find_one({"_id": ObjectId(assignment_id)})
+
+    return await read_cache.get_or_load(
+        ("assignment", assignment_id), load, lambda doc: [assignment_tag(assignment_id)]
+    )
 
 async def get_ambulance_assignments_by_ambulance(ambulance_id: str) -> List[dict]:
     """
@@ -254,132 +376,290 @@ async def get_ambulance_assignments_by_ambulance(ambulance_id: str) -> List[dict
     Returns:
         List[dict]: List of assignment documents.
     """
-    db = await get_db()
-    return await db.ambulance_assignments.find({"ambulance_id": ambulance_id}).to_list(length=None)
+    async def load():
+        db = await get_db()
+        return await db.ambulance_assignments.find({"ambulance_id": ambulance_id}).to_list(length=None)
+
+    return await read_cache.get_or_load(
+        ("assignments_by_ambulance", ambulance_id),
+        load,
+        lambda docs: [ambulance_assignments_tag(ambulance_id)] + [assignment_tag(d["_id"]) for d in docs],
+    )
 
-# Responder operations
-async def get_nearby_responders(
-    lat: float, lng: float, 
-    radius: float = 10.0, vehicle_type: Optional[str] = None,
-    max_results: int = 10, available_only: bool = True
+# Geo search helpers
+async def _geo_near(
+    collection: str, index, lat: float, lng: float,
+    min_radius: float, radius: float, conditions: dict, limit: int
 ) -> List[Dict]:
+    """Nearest documents between min_radius and radius km that match conditions."""
+    if settings.SPATIAL_INDEX_ENABLED and index.ready:
+        # Answer from this worker's in-memory index
+        return index.nearest(lat, lng, limit, radius, conditions, min_distance_km=min_radius)
+
     db = await get_db()
-    # Create base match conditions
+    # Filters run inside $geoNear so only candidate documents are scanned,
+    # and its output is already sorted by distance
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [lng, lat]},
+        "key": "location",
+        "distanceField": "distance_meters",
+        "maxDistance": radius * 1000,  # Convert km to meters
+        "query": conditions,
+        "spherical": True
+    }
+    if min_radius:
+        geo_near["minDistance"] = min_radius * 1000
+    pipeline = [{"$geoNear": geo_near}, {"$limit": limit}]
+    return await db[collection].aggregate(pipeline).to_list(length=limit)
+
+async def _geo_near_expanding(
+    collection: str, index, lat: float, lng: float, conditions: dict,
+    min_results: int, max_results: int, initial_radius: float, max_radius: float,
+    factor: float = 2.0
+) -> List[Dict]:
+    """
+    Search rings of exponentially growing radius until min_results are found.
+
+    Each ring only asks for the annulus beyond the previous radius (minDistance),
+    so no document is scanned twice and results stay ordered by distance.
+    """
+    min_results = min(min_results, max_results)
+    found, seen = [], set()
+    inner, outer = 0.0, min(initial_radius, max_radius)
+    while True:
+        ring = await _geo_near(
+            collection, index, lat, lng, inner, outer, conditions, max_results - len(found)
+        )
+        for doc in ring:
+            # Both bounds are inclusive, so a document on the boundary can repeat
+            if doc["_id"] not in seen:
+                seen.add(doc["_id"])
+                found.append(doc)
+        if len(found) >= min_results or outer >= max_radius:
+            break
+        inner, outer = outer, min(outer * factor, max_radius)
+    for doc in found:
+        doc["search_radius_km"] = outer
+    return found
+
+# Responder operations
+def _responder_conditions(vehicle_type: Optional[str], available_only: bool) -> dict:
     match_conditions = {}
     if available_only:
         match_conditions["status"] = "available"
     if vehicle_type:
         match_conditions["vehicle_type"] = vehicle_type
+    return match_conditions
 
-    # MongoDB geospatial aggregation pipeline
-    pipeline = [
-        {
-            "$geoNear": {
-                "near": {"type": "Point", "coordinates": [lng, lat]},
-                "distanceField": "distance_meters",
-                "maxDistance": radius * 1000,  # Convert km to meters
-                "spherical": True
-            }
-        },
-        {"$match": match_conditions},
-        {"$limit": max_results}
-    ]
-
-    results = await db.responders.aggregate(pipeline).to_list(length=max_results)
-    
-    # Add distance in km and estimated ETA
-    responders = []
-    for doc in results:
+async def _with_eta(results: List[Dict], lat: float, lng: float) -> List[Dict]:
+    # Add distance in km and estimated ETA: road travel time when the road graph covers
+    # both ends, otherwise straight-line distance at the average response speed
+    road = await road_router.minutes_to(lat, lng, [point_of(doc) for doc in results])
+    for doc, minutes in zip(results, road):
         doc["distance_km"] = doc["distance_meters"] / 1000
-        # Simple ETA calculation (distance_km / average_speed * 60)
-        # Assuming average emergency response speed of 40 km/h
-        doc["eta_minutes"] = int((doc["distance_km"] / 40) * 60)
-        responders.append(doc)
-    
-    return responders
+        if minutes is None:
+            doc["eta_minutes"] = int((doc["distance_km"] / settings.DISPATCH_SPEED_KMH) * 60)
+        else:
+            doc["eta_minutes"] = int(round(minutes))
+    if any(minutes is not None for minutes in road):
+        results.sort(key=lambda doc: doc["eta_minutes"])
+    return results
+
+async def get_nearby_responders(
+    lat: float, lng: float, 
+    radius: float = 10.0, vehicle_type: Optional[str] = None,
+    max_results: int = 10, available_only: bool = True
+) -> List[Dict]:
+    conditions = _responder_conditions(vehicle_type, available_only)
+    results = await _geo_near(
+        "responders", responder_index, lat, lng, 0.0, radius, conditions, max_results
+    )
+    return await _with_eta(results, lat, lng)
+
+async def find_responders_expanding_radius(
+    lat: float, lng: float,
+    vehicle_type: Optional[str] = None, min_results: int = 1, max_results: int = 10,
+    initial_radius: float = 5.0, max_radius: float = 80.0
+) -> List[Dict]:
+    """
+    Find available responders, doubling the search radius until enough are found.
+
+    Args:
+        lat (float): Incident latitude.
+        lng (float): Incident longitude.
+        vehicle_type (Optional[str]): Filter by vehicle type ("ambulance", "paramedic", "fire_truck").
+        min_results (int): Stop expanding once this many responders are found.
+        max_results (int): Maximum number of responders to return.
+        initial_radius (float): First search radius in km.
+        max_radius (float): Largest radius to try in km.
+
+    Returns:
+        List[dict]: Responders fastest first with distance_km, eta_minutes and the
+        search_radius_km that was reached. Empty if none are available within max_radius.
+    """
+    conditions = _responder_conditions(vehicle_type, True)
+    results = await _geo_near_expanding(
+        "responders", responder_index, lat, lng, conditions,
+        min_results, max_results, initial_radius, max_radius
+    )
+    return await _with_eta(results, lat, lng)
+
+async def estimate_travel_time(from_lat: float, from_lng: float, to_lat: float, to_lng: float) -> dict:
+    """
+    Estimate driving time between two points over the road network.
+
+    Args:
+        from_lat (float): Start latitude (e.g. a responder or the incident).
+        from_lng (float): Start longitude.
+        to_lat (float): Destination latitude (e.g. the incident or a hospital).
+        to_lng (float): Destination longitude.
+
+    Returns:
+        dict: {"eta_minutes", "distance_km", "method"}; method is "road" when both
+        points are on the loaded road graph, otherwise "straight_line" at the
+        average response speed.
+    """
+    distance_km = haversine_km(from_lat, from_lng, to_lat, to_lng)
+    minutes = await road_router.travel_minutes((from_lat, from_lng), (to_lat, to_lng))
+    if minutes is None:
+        return {
+            "eta_minutes": round(distance_km / settings.DISPATCH_SPEED_KMH * 60, 1),
+            "distance_km": round(distance_km, 2),
+            "method": "straight_line",
+        }
+    return {"eta_minutes": round(minutes, 1), "distance_km": round(distance_km, 2), "method": "road"}
 
 async def create_responder(data: dict):
     db = await get_db()
-    result = await db.responders.insert_one(data)
-    return await db.responders.find_one({"_id": result.inserted_id})
+    data.setdefault("updated_at", datetime.now(timezone.utc))
+    await db.responders.insert_one(data)
+    responder_index.upsert(dict(data))
+    live_counters.transition("responders.status", None, data.get("status"))
+    dispatch_prefetcher.responder_changed(data["_id"], data.get("status"))
+    dispatch_optimizer.responder_changed(data["_id"], data.get("status"))
+    return data
 
 async def update_responder_status(responder_id: str, status: str):
     db = await get_db()
-    await db.responders.update_one(
+    responder = await db.responders.find_one_and_update(
         {"_id": ObjectId(responder_id)}, 
-        {"$set": {"status": status}}
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}},
+        projection=RESPONDER_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
-    return await db.responders.find_one({"_id": ObjectId(responder_id)})
+    if responder is None:
+        return None
+    live_counters.transition("responders.status", responder.get("status"), status)
+    responder_index.update(responder_id, {"status": status})
+    dispatch_prefetcher.responder_changed(responder_id, status)
+    dispatch_optimizer.responder_changed(responder_id, status)
+    responder["status"] = status
+    return responder
 
 async def get_responder(responder_id: str):
     db = await get_db()
     return await db.responders.find_one({"_id": ObjectId(responder_id)})
 
 # Hospital operations
-async def get_nearby_hospitals(
-    lat: float, lng: float,
-    radius: float = 20.0, specialty: Optional[str] = None,
-    beds_required: int = 1, max_results: int = 5
-) -> List[Dict]:
-    db = await get_db()
-    # Create match conditions
+def _hospital_conditions(specialty: Optional[str], beds_required: int) -> dict:
     match_conditions = {"status": "operational", "beds_available": {"$gte": beds_required}}
     if specialty:
         match_conditions["specialties"] = {"$in": [specialty]}
+    return match_conditions
 
-    pipeline = [
-        {
-            "$geoNear": {
-                "near": {"type": "Point", "coordinates": [lng, lat]},
-                "distanceField": "distance_meters",
-                "maxDistance": radius * 1000,
-                "spherical": True
-            }
-        },
-        {"$match": match_conditions},
-        {"$sort": {"distance_meters": 1}},
-        {"$limit": max_results}
-    ]
-
-    results = await db.hospitals.aggregate(pipeline).to_list(length=max_results)
-    
-    # Add distance in km
-    hospitals = []
+def _with_distance(results: List[Dict]) -> List[Dict]:
     for doc in results:
         doc["distance_km"] = doc["distance_meters"] / 1000
-        hospitals.append(doc)
-    
-    return hospitals
+    return results
+
+async def get_nearby_hospitals(
+    lat: float, lng: float,
+    radius: float = 20.0, specialty: Optional[str] = None,
+    beds_required: int = 1, max_results: int = 5
+) -> List[Dict]:
+    conditions = _hospital_conditions(specialty, beds_required)
+    results = await _geo_near(
+        "hospitals", hospital_index, lat, lng, 0.0, radius, conditions, max_results
+    )
+    return _with_distance(results)
+
+async def find_hospitals_expanding_radius(
+    lat: float, lng: float,
+    specialty: Optional[str] = None, beds_required: int = 1,
+    min_results: int = 1, max_results: int = 5,
+    initial_radius: float = 10.0, max_radius: float = 160.0
+) -> List[Dict]:
+    """
+    Find operational hospitals with free beds, doubling the search radius until enough are found.
+
+    Args:
+        lat (float): Patient latitude.
+        lng (float): Patient longitude.
+        specialty (Optional[str]): Required specialty, e.g. "Cardiology".
+        beds_required (int): Minimum number of available beds.
+        min_results (int): Stop expanding once this many hospitals are found.
+        max_results (int): Maximum number of hospitals to return.
+        initial_radius (float): First search radius in km.
+        max_radius (float): Largest radius to try in km.
+
+    Returns:
+        List[dict]: Hospitals nearest first with distance_km and the search_radius_km reached.
+    """
+    conditions = _hospital_conditions(specialty, beds_required)
+    results = await _geo_near_expanding(
+        "hospitals", hospital_index, lat, lng, conditions,
+        min_results, max_results, initial_radius, max_radius
+    )
+    return _with_distance(results)
 
 async def create_hospital(data: dict):
     db = await get_db()
-    result = await db.hospitals.insert_one(data)
-    return await db.hospitals.find_one({"_id": result.inserted_id})
+    data.setdefault("updated_at", datetime.now(timezone.utc))
+    await db.hospitals.insert_one(data)
+    hospital_index.upsert(dict(data))
+    read_cache.invalidate(ALL_HOSPITALS_TAG)
+    dispatch_prefetcher.hospital_changed(data["_id"])
+    return data
 
 async def update_hospital_beds(hospital_id: str, beds_available: int):
     db = await get_db()
-    await db.hospitals.update_one(
+    hospital = await db.hospitals.find_one_and_update(
         {"_id": ObjectId(hospital_id)}, 
-        {"$set": {"beds_available": beds_available}}
+        {"$set": {"beds_available": beds_available, "updated_at": datetime.now(timezone.utc)}},
+        projection=HOSPITAL_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    return await db.hospitals.find_one({"_id": ObjectId(hospital_id)})
+    hospital_index.update(hospital_id, {"beds_available": beds_available})
+    read_cache.invalidate(hospital_tag(hospital_id))
+    dispatch_prefetcher.hospital_changed(hospital_id)
+    return hospital
 
 async def get_hospital(hospital_id: str):
-    db = await get_db()
-    return await db.hospitals.find_one({"_id": ObjectId(hospital_id)})
+    async def load():
+        db = await get_db()
+        return await db.hospitals.find_one({"_id": ObjectId(hospital_id)})
+
+    return await read_cache.get_or_load(
+        ("hospital", hospital_id), load, lambda doc: [hospital_tag(hospital_id)]
+    )
 
 
 async def get_all_hospitals() -> List[dict]:
-    db = await get_db()
-    return await db.hospitals.find().to_list(length=None)
+    async def load():
+        db = await get_db()
+        return await db.hospitals.find().to_list(length=None)
+
+    return await read_cache.get_or_load(
+        ("hospitals",), load, lambda docs: [ALL_HOSPITALS_TAG] + [hospital_tag(d["_id"]) for d in docs]
+    )
 
 
 # Response operations
 async def create_response(data: dict):
     db = await get_db()
     data["created_at"] = datetime.now(timezone.utc)
-    result = await db.responses.insert_one(data)
-    return await db.responses.find_one({"_id": result.inserted_id})
+    await db.responses.insert_one(data)
+    return data
 
 async def get_response(response_id: str):
     db = await get_db()
@@ -391,44 +671,45 @@ async def get_responses_by_incident(incident_id: str):
 
 async def update_response_status(response_id: str, status: str):
     db = await get_db()
-    await db.responses.update_one(
+    return await db.responses.find_one_and_update(
         {"_id": ObjectId(response_id)}, 
-        {"$set": {"status": status}}
+        {"$set": {"status": status}},
+        projection=RESPONSE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    return await db.responses.find_one({"_id": ObjectId(response_id)})
 
 # Utility functions for emergency management
 async def get_dashboard_stats():
-    db = await get_db()
-    active_incidents = await db.incidents.count_documents({"status": "active"})
-    available_responders = await db.responders.count_documents({"status": "available"})
-    busy_responders = await db.responders.count_documents({"status": {"$in": ["en_route", "busy"]}})
+    # Served from live counters kept current by the writers above; no collection scans
+    active_incidents = live_counters.get("incidents.status.active")
+    available_responders = live_counters.get("responders.status.available")
+    busy_responders = (
+        live_counters.get("responders.status.en_route") + live_counters.get("responders.status.busy")
+    )
     
     return {
         "active_incidents": active_incidents,
         "available_responders": available_responders,
         "busy_responders": busy_responders,
-        "total_responders": available_responders + busy_responders
+        "total_responders": available_responders + busy_responders,
+        "active_incidents_by_priority": live_counters.group("incidents.active_priority"),
+        "active_assignments_by_hospital": live_counters.group("assignments.hospital"),
     }
 
 async def assign_responder_to_incident(incident_id: str, responder_id: str):
-    db = await get_db()
-    # Update incident with assigned responder
-    await db.incidents.update_one(
-        {"_id": ObjectId(incident_id)}, 
-        {"$set": {"assigned_responder_id": responder_id, "updated_at": datetime.now(timezone.utc)}}
-    )
-    
-    # Update responder status
-    await db.responders.update_one(
-        {"_id": ObjectId(responder_id)}, 
-        {"$set": {"status": "en_route"}}
-    )
-    
-    # Create response record
-    response_data = {
-        "incident_id": incident_id,
-        "responder_id": responder_id,
-        "status": "dispatched"
-    }
-    return await create_response(response_data)
\ No newline at end of file
+    """
+    Dispatch an available responder to an incident.
+
+    Args:
+        incident_id (str): The incident to respond to.
+        responder_id (str): The responder to reserve.
+
+    Returns:
+        The response record, or {"error": ...} if the responder is no longer available
+        or the incident already has a unit (clear assigned_responder_id to reassign).
+    """
+    # Reserve the responder and record the response; a unit, and an incident, can only be dispatched once
+    try:
+        return await dispatch_responder(incident_id, responder_id, exclusive=True)
+    except DispatchConflict as e:
+        return {"error": str(e), "responder_id": responder_id}
\ No newline at end of file
@@ -0,0 +1,42 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+# Compound 2dsphere indexes let $geoNear apply its `query` filter inside the index scan
+RESPONDER_GEO_INDEX = [("location", "2dsphere"), ("status", 1), ("vehicle_type", 1)]
+HOSPITAL_GEO_INDEX = [("location", "2dsphere"), ("status", 1), ("beds_available", 1)]
+# Single-field index the old seed script created; the compound indexes replace it
+LEGACY_GEO_INDEX = "location_2dsphere"
+
+INDEX_NOT_FOUND = 27
+
+
+async def _drop_legacy_geo_index(collection):
+    # A second 2dsphere index on `location` only costs writes, and makes $geoNear
+    # without an explicit key fail
+    if LEGACY_GEO_INDEX in await collection.index_information():
+        try:
+            await collection.drop_index(LEGACY_GEO_INDEX)
+        except OperationFailure as e:
+            # Another worker starting at the same time dropped it first
+            if e.code != INDEX_NOT_FOUND:
+                raise
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Create the indexes the query layer relies on. Safe to call on every startup."""
+    await db.responders.create_index(RESPONDER_GEO_INDEX, name="location_status_vehicle")
+    await db.hospitals.create_index(HOSPITAL_GEO_INDEX, name="location_status_beds")
+    await _drop_legacy_geo_index(db.responders)
+    await _drop_legacy_geo_index(db.hospitals)
+    # Delta refresh of the in-memory spatial indexes
+    await db.responders.create_index("updated_at", name="updated_at")
+    await db.hospitals.create_index("updated_at", name="updated_at")
+    # Used by the live counters reconciliation and get_active_incidents
+    await db.incidents.create_index([("status", 1), ("priority", 1)], name="status_priority")
+    # Shared agent sessions (SESSION_BACKEND=mongo): latest session per user, events in order, expiry
+    await db.agent_sessions.create_index(
+        [("app_name", 1), ("user_id", 1), ("last_update_time", -1)], name="app_user_updated"
+    )
+    await db.agent_sessions.create_index("expires_at", name="expires_at", expireAfterSeconds=0)
+    await db.agent_session_events.create_index([("session_id", 1), ("timestamp", 1)], name="session_timestamp")
+    await db.agent_session_events.create_index("expires_at", name="expires_at", expireAfterSeconds=0)
@@ -1,8 +1,24 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from app.core.config import settings
+from app.core.metrics import record_mongo_command
 
-client = AsyncIOMotorClient(settings.MONGODB_URL)
+
+class CommandTimer(monitoring.CommandListener):
+    """Feeds driver-measured command durations into the metrics registry."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_mongo_command(event.command_name, event.duration_micros / 1e6, "ok")
+
+    def failed(self, event):
+        record_mongo_command(event.command_name, event.duration_micros / 1e6, "error")
+
+
+client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[CommandTimer()])
 db = client[settings.DATABASE_NAME]
 
 async def get_db():
-    return db
\ No newline at end of file
+    return db
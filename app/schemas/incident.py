@@ -15,4 +15,5 @@ class Incident(BaseModel):
     status: str = "active"  # active, resolved, cancelled
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
-    assigned_responder_id: Optional[str] = None
\ No newline at end of file
+    assigned_responder_id: Optional[str] = None
+    assigned_ambulance_id: Optional[str] = None
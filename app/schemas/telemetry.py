@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+class PositionReport(BaseModel):
+    vehicle_id: str
+    kind: str = "ambulance"  # ambulance, responder
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+    recorded_at: Optional[datetime] = None  # device timestamp, used to discard out-of-order fixes
+
+class PositionBatch(BaseModel):
+    positions: List[PositionReport]
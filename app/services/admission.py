@@ -0,0 +1,191 @@
+# Capacity-aware admission of live calls, sized from measured event-loop lag and CPU
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.diagnostics import loop_monitor
+from app.core.metrics import registry
+from app.services.drain import worker_drain
+
+SESSION_BUDGET = registry.gauge("admission_session_budget", "Live sessions this worker admits at its measured load.")
+ADMITTED = registry.gauge("admission_admitted_sessions", "Live sessions holding an admission slot.")
+WAITING = registry.gauge("admission_waiting", "Callers on hold waiting for a slot.")
+LOOP_LAG = registry.gauge("admission_loop_lag_seconds", "Smoothed event-loop scheduling lag.")
+CPU_RATIO = registry.gauge("admission_cpu_ratio", "Smoothed process CPU seconds per wall-clock second.")
+DECISIONS = registry.counter(
+    "admission_decisions_total", "Admission outcomes for live calls.", ["outcome"]
+)
+HOLD_DURATION = registry.histogram(
+    "admission_hold_seconds", "Time callers spent on hold before their call started.",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+
+# Lower is served first
+PRIORITY_RECONNECT = 0
+PRIORITY_NEW = 1
+
+
+class AdmissionController:
+    """
+    Per-worker budget of concurrent live calls, adjusted to what the worker can carry.
+
+    Every ``interval`` seconds the controller reads the event-loop lag sampled
+    by ``loop_monitor`` and measures how much CPU the process used, both smoothed. If
+    either is over its target the budget drops to 90% of the calls in progress
+    (never below ``min_sessions``); while both are well under target and the
+    budget is in use it grows by one, up to ``max_sessions``. Calls already in
+    progress are never cut off; the budget only gates new ones.
+
+    Callers over budget wait in a priority queue, reconnecting callers before
+    new ones and then by arrival; at most ``max_waiting`` wait at once and the
+    caller decides how long to hold. ``ready`` tells a load balancer whether
+    this worker should get new calls.
+    """
+
+    def __init__(
+        self,
+        initial_sessions: int = 20,
+        min_sessions: int = 2,
+        max_sessions: int = 200,
+        lag_target: float = 0.05,
+        cpu_target: float = 0.85,
+        interval: float = 0.5,
+        max_waiting: int = 50,
+        enabled: bool = True,
+    ):
+        self.min_sessions = min_sessions
+        self.max_sessions = max_sessions
+        self.budget = max(min(initial_sessions, max_sessions), min_sessions)
+        self.lag_target = lag_target
+        self.cpu_target = cpu_target
+        self.interval = interval
+        self.max_waiting = max_waiting
+        self.enabled = enabled
+        self.admitted = 0
+        self.lag = 0.0
+        self.cpu = 0.0
+        # (priority, arrival, held since, ticket)
+        self._waiting: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def _has_slot(self) -> bool:
+        return not self.enabled or self.admitted < self.budget
+
+    def ready(self) -> bool:
+        """Whether a new call would start here without waiting."""
+        return worker_drain.admit() and not self._waiting and self._has_slot()
+
+    def try_admit(self) -> bool:
+        """Take a slot if one is free and nobody is waiting for it."""
+        if self._waiting or not self._has_slot():
+            return False
+        self.admitted += 1
+        DECISIONS.inc(outcome="admitted")
+        return True
+
+    def enqueue(self, priority: int = PRIORITY_NEW) -> Optional[asyncio.Future]:
+        """Join the hold queue; the future resolves when a slot is granted. None if the queue is full."""
+        if len(self._waiting) >= self.max_waiting:
+            DECISIONS.inc(outcome="rejected")
+            return None
+        ticket = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._arrivals), time.monotonic(), ticket))
+        DECISIONS.inc(outcome="held")
+        return ticket
+
+    def position(self, ticket: asyncio.Future) -> int:
+        """1-based place in the hold queue."""
+        for place, (_, _, _, waiting) in enumerate(sorted(self._waiting), start=1):
+            if waiting is ticket:
+                return place
+        return 0
+
+    def cancel(self, ticket: asyncio.Future):
+        """Leave the hold queue, or give back the slot if it was granted meanwhile."""
+        if ticket.done():
+            if not ticket.cancelled():
+                self.release()
+            return
+        ticket.cancel()
+        self._waiting = [entry for entry in self._waiting if entry[3] is not ticket]
+        heapq.heapify(self._waiting)
+        DECISIONS.inc(outcome="abandoned")
+
+    def release(self):
+        """Give back a slot when a call ends."""
+        self.admitted = max(self.admitted - 1, 0)
+        self._grant()
+
+    def _grant(self):
+        while self._waiting and self._has_slot():
+            _, _, held_since, ticket = heapq.heappop(self._waiting)
+            if ticket.done():
+                continue
+            self.admitted += 1
+            ticket.set_result(True)
+            HOLD_DURATION.observe(time.monotonic() - held_since)
+            DECISIONS.inc(outcome="admitted_after_hold")
+
+    def _adjust(self):
+        overloaded = self.lag > self.lag_target or self.cpu > self.cpu_target
+        if overloaded:
+            self.budget = max(self.min_sessions, min(self.budget, int(self.admitted * 0.9)))
+        elif (
+            self.lag < self.lag_target / 2
+            and self.cpu < self.cpu_target * 0.8
+            and self.admitted >= self.budget - 1
+        ):
+            self.budget = min(self.max_sessions, self.budget + 1)
+        self._grant()
+
+    def state(self) -> dict:
+        return {
+            "ready": self.ready(),
+            "enabled": self.enabled,
+            "budget": self.budget,
+            "admitted": self.admitted,
+            "waiting": len(self._waiting),
+            "loop_lag_ms": round(self.lag * 1000, 3),
+            "cpu_ratio": round(self.cpu, 3),
+            "draining": worker_drain.draining,
+        }
+
+    async def run(self):
+        """Background loop measuring load and resizing the budget; cancel it on shutdown."""
+        cpu_before, wall_before = time.process_time(), time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            lag = loop_monitor.recent_lag(self.interval)
+            cpu_now, wall_now = time.process_time(), time.monotonic()
+            cpu = (cpu_now - cpu_before) / max(wall_now - wall_before, 1e-6)
+            cpu_before, wall_before = cpu_now, wall_now
+            # Smoothed so one slow callback does not halve the budget
+            self.lag = 0.7 * self.lag + 0.3 * lag
+            self.cpu = 0.7 * self.cpu + 0.3 * cpu
+            self._adjust()
+
+
+admission = AdmissionController(
+    initial_sessions=settings.ADMISSION_INITIAL_SESSIONS,
+    min_sessions=settings.ADMISSION_MIN_SESSIONS,
+    max_sessions=settings.ADMISSION_MAX_SESSIONS,
+    lag_target=settings.ADMISSION_LAG_TARGET_MS / 1000,
+    cpu_target=settings.ADMISSION_CPU_TARGET,
+    interval=settings.ADMISSION_SAMPLE_INTERVAL_SECONDS,
+    max_waiting=settings.ADMISSION_MAX_WAITING,
+    enabled=settings.ADMISSION_ENABLED,
+)
+
+SESSION_BUDGET.collect(lambda: {(): admission.budget})
+ADMITTED.collect(lambda: {(): admission.admitted})
+WAITING.collect(lambda: {(): admission.waiting})
+LOOP_LAG.collect(lambda: {(): admission.lag})
+CPU_RATIO.collect(lambda: {(): admission.cpu})
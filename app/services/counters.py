@@ -0,0 +1,199 @@
+# Live dashboard counters maintained from CRUD status transitions
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.db.session import get_db
+
+logger = get_logger("counters")
+
+STATS_ID = "live_counters"
+LEASE_ID = "live_counters_reconcile_lease"
+
+# Ambulance assignments in these states no longer count against their hospital
+CLOSED_ASSIGNMENT_STATUSES = ("arrived", "completed")
+
+
+def _part(value) -> str:
+    # Counter names become dotted field paths in the stats document
+    return str(value).replace(".", "_").replace("$", "_")
+
+
+def _flatten(doc: dict, prefix: str = "") -> Dict[str, int]:
+    flat = {}
+    for key, value in doc.items():
+        if key == "_id":
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+class LiveCounters:
+    """
+    Per-status counters kept current by the CRUD layer instead of count queries.
+
+    Writers record transitions (e.g. responder available -> en_route) as local
+    deltas. Every ``flush_interval`` the deltas are ``$inc``-ed into one document
+    in the ``stats`` collection and the merged totals come back in the same round
+    trip, so every worker sees the others' changes. Reads are dictionary lookups.
+    A periodic reconciliation recounts from the source collections to heal drift;
+    a lease in ``stats`` makes sure only one worker runs it at a time.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, reconcile_interval: float = 300.0):
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self._totals: Dict[str, int] = {}
+        self._pending: Counter = Counter()
+
+    def incr(self, key: str, amount: int = 1):
+        self._pending[key] += amount
+
+    def transition(self, prefix: str, old, new):
+        """Move one unit from ``prefix.old`` to ``prefix.new``; None means not counted."""
+        if old == new:
+            return
+        if old is not None:
+            self._pending[f"{prefix}.{_part(old)}"] -= 1
+        if new is not None:
+            self._pending[f"{prefix}.{_part(new)}"] += 1
+
+    def record_incident(self, before: Optional[dict], after: Optional[dict]):
+        """Record an incident create/update; None stands for a missing document."""
+        before, after = before or {}, after or {}
+        self.transition("incidents.status", before.get("status"), after.get("status"))
+        was_active = before.get("status") == "active"
+        is_active = after.get("status") == "active"
+        self.transition(
+            "incidents.active_priority",
+            before.get("priority") if was_active else None,
+            after.get("priority") if is_active else None,
+        )
+
+    def record_assignment(self, hospital_id, old_status: Optional[str], new_status: Optional[str]):
+        """Record an ambulance assignment create/status change; None stands for a missing document."""
+        def counted(status):
+            return hospital_id if status is not None and status not in CLOSED_ASSIGNMENT_STATUSES else None
+
+        self.transition("assignments.hospital", counted(old_status), counted(new_status))
+
+    def get(self, key: str) -> int:
+        return self._totals.get(key, 0) + self._pending.get(key, 0)
+
+    def group(self, prefix: str) -> Dict[str, int]:
+        """All counters under ``prefix`` keyed by their last path segment."""
+        keys = set(self._totals) | set(self._pending)
+        start = prefix + "."
+        return {
+            key[len(start):]: self.get(key)
+            for key in keys
+            if key.startswith(start) and self.get(key)
+        }
+
+    async def flush(self):
+        db = await get_db()
+        pending = {key: value for key, value in self._pending.items() if value}
+        self._pending = Counter()
+        try:
+            if pending:
+                doc = await db.stats.find_one_and_update(
+                    {"_id": STATS_ID},
+                    {"$inc": pending},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            else:
+                doc = await db.stats.find_one({"_id": STATS_ID})
+        except Exception:
+            self._pending.update(pending)
+            raise
+        if doc is None:
+            await self.reconcile()
+        else:
+            self._totals = _flatten(doc)
+
+    async def _acquire_lease(self, db) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await db.stats.find_one_and_update(
+                {"_id": LEASE_ID, "expires_at": {"$lt": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=self.reconcile_interval / 2)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+
+    async def reconcile(self):
+        """
+        Recount everything from the source collections and ``$set`` the totals.
+
+        This worker's pending deltas are flushed first so they are not applied on
+        top of a recount that already includes them. Other workers keep ``$inc``-ing
+        the same document; ``$set`` on each counter leaves their later flushes in
+        place instead of replacing the whole document.
+        """
+        if any(self._pending.values()):
+            await self.flush()
+        db = await get_db()
+        counts: Dict[str, int] = {}
+
+        async def tally(collection: str, match: dict, field: str, prefix: str):
+            pipeline = [{"$match": match}, {"$group": {"_id": f"${field}", "n": {"$sum": 1}}}]
+            async for row in db[collection].aggregate(pipeline):
+                if row["_id"] is not None:
+                    counts[f"{prefix}.{_part(row['_id'])}"] = row["n"]
+
+        await asyncio.gather(
+            tally("incidents", {}, "status", "incidents.status"),
+            tally("incidents", {"status": "active"}, "priority", "incidents.active_priority"),
+            tally("responders", {}, "status", "responders.status"),
+            tally(
+                "ambulance_assignments",
+                {"status": {"$nin": list(CLOSED_ASSIGNMENT_STATUSES)}},
+                "hospital_id",
+                "assignments.hospital",
+            ),
+        )
+        # Counters that no longer match anything go back to zero
+        totals = {**{key: 0 for key in self._totals}, **counts}
+        doc = await db.stats.find_one_and_update(
+            {"_id": STATS_ID},
+            {"$set": totals},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._totals = _flatten(doc) if doc else totals
+
+    async def run(self):
+        """Flush loop with periodic reconciliation; cancel it on shutdown."""
+        loop = asyncio.get_running_loop()
+        next_reconcile = loop.time() + self.reconcile_interval
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if loop.time() >= next_reconcile:
+                    next_reconcile = loop.time() + self.reconcile_interval
+                    if await self._acquire_lease(await get_db()):
+                        await self.reconcile()
+            except Exception as e:
+                logger.error(f"Live counters update failed: {e}")
+
+
+live_counters = LiveCounters(
+    flush_interval=settings.COUNTERS_FLUSH_INTERVAL_SECONDS,
+    reconcile_interval=settings.COUNTERS_RECONCILE_INTERVAL_SECONDS,
+)
@@ -0,0 +1,237 @@
+# Dispatch engine: reserve a unit and record the assignment without double dispatch
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.metrics import mark_incident_dispatched
+from app.db.session import client, get_db
+from app.services.counters import live_counters
+from app.services.incident_feed import incident_feed
+from app.services.optimizer import dispatch_optimizer
+from app.services.prefetch import dispatch_prefetcher
+from app.services.read_cache import (
+    ambulance_assignments_tag,
+    ambulance_tag,
+    hospital_fleet_tag,
+    read_cache,
+)
+from app.services.spatial_index import responder_index
+
+
+class DispatchConflict(Exception):
+    """The unit was not available, usually because another dispatch reserved it first."""
+
+
+def _first_error(results: list) -> Optional[BaseException]:
+    return next((r for r in results if isinstance(r, BaseException)), None)
+
+
+async def dispatch_responder(
+    incident_id: str, responder_id: str, eta: Optional[int] = None, exclusive: bool = False
+) -> dict:
+    """
+    Reserve a responder for an incident and record the response.
+
+    The reservation is a compare-and-set on ``status: "available"``, so only one
+    dispatch can win a unit. With ``exclusive`` the incident update is a
+    compare-and-set on ``assigned_responder_id`` (and ``assigned_ambulance_id``)
+    being unset as well, so only one dispatch can win an incident either.
+
+    By default the reservation, the incident update and the response insert are
+    sent concurrently (about one round trip) and the side writes are rolled back
+    if the reservation loses. An exclusive dispatch reserves the unit first and
+    only then claims the incident, so a dispatch whose unit is taken cannot make
+    one with a free unit lose the incident (two round trips). With
+    DISPATCH_TRANSACTIONS enabled (replica set required) all three run in one
+    transaction instead.
+
+    Returns:
+        dict: The created response record.
+
+    Raises:
+        DispatchConflict: If the responder is not available, or (``exclusive``)
+            the incident already has a responder.
+    """
+    db = await get_db()
+    now = datetime.now(timezone.utc)
+    response = {
+        "_id": ObjectId(),
+        "incident_id": incident_id,
+        "responder_id": responder_id,
+        "status": "dispatched",
+        "created_at": now,
+    }
+    if eta is not None:
+        response["eta"] = eta
+    reserve_filter = {"_id": ObjectId(responder_id), "status": "available"}
+    reserve_update = {"$set": {"status": "en_route", "incident_id": incident_id, "updated_at": now}}
+    incident_filter = {"_id": ObjectId(incident_id)}
+    if exclusive:
+        incident_filter.update(assigned_responder_id=None, assigned_ambulance_id=None)
+    incident_update = {"$set": {"assigned_responder_id": responder_id, "updated_at": now}}
+    taken = f"Incident {incident_id} already has a unit assigned"
+
+    if settings.DISPATCH_TRANSACTIONS:
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                reserved = await db.responders.find_one_and_update(
+                    reserve_filter, reserve_update, projection={"_id": 1}, session=session
+                )
+                if reserved is None:
+                    # Leaving the block aborts the transaction
+                    raise DispatchConflict(f"Responder {responder_id} is not available")
+                previous = await db.incidents.find_one_and_update(
+                    incident_filter, incident_update, return_document=ReturnDocument.BEFORE, session=session
+                )
+                if exclusive and previous is None:
+                    raise DispatchConflict(taken)
+                await db.responses.insert_one(response, session=session)
+    else:
+        def reserve():
+            return db.responders.find_one_and_update(reserve_filter, reserve_update, projection={"_id": 1})
+
+        def record():
+            return (
+                db.incidents.find_one_and_update(
+                    incident_filter, incident_update, return_document=ReturnDocument.BEFORE
+                ),
+                db.responses.insert_one(response),
+            )
+
+        if exclusive:
+            (reserved,) = await asyncio.gather(reserve(), return_exceptions=True)
+            previous = inserted = None
+            if isinstance(reserved, dict):
+                previous, inserted = await asyncio.gather(*record(), return_exceptions=True)
+        else:
+            reserved, previous, inserted = await asyncio.gather(reserve(), *record(), return_exceptions=True)
+        error = _first_error([reserved, previous, inserted])
+        lost_incident = exclusive and isinstance(reserved, dict) and previous is None
+        if reserved is None or lost_incident or error is not None:
+            undo = [db.responses.delete_one({"_id": response["_id"]})]
+            if isinstance(previous, dict):
+                # Only restore the incident if nobody assigned it in the meantime
+                restore = (
+                    {"$set": {"assigned_responder_id": previous["assigned_responder_id"]}}
+                    if "assigned_responder_id" in previous
+                    else {"$unset": {"assigned_responder_id": ""}}
+                )
+                undo.append(db.incidents.update_one(
+                    {**incident_filter, "assigned_responder_id": responder_id}, restore
+                ))
+            if reserved is not None and not isinstance(reserved, BaseException):
+                undo.append(db.responders.update_one(
+                    {"_id": ObjectId(responder_id), "status": "en_route", "incident_id": incident_id},
+                    {"$set": {"status": "available", "updated_at": now}, "$unset": {"incident_id": ""}}
+                ))
+            await asyncio.gather(*undo, return_exceptions=True)
+            if error is not None:
+                raise error
+            raise DispatchConflict(taken if lost_incident else f"Responder {responder_id} is not available")
+
+    if previous is not None:
+        incident_feed.notify("update", {**previous, **incident_update["$set"]})
+    responder_index.update(responder_id, {"status": "en_route", "incident_id": incident_id})
+    live_counters.transition("responders.status", "available", "en_route")
+    dispatch_prefetcher.responder_changed(responder_id, "en_route")
+    dispatch_optimizer.responder_changed(responder_id, "en_route")
+    mark_incident_dispatched(incident_id, settings.AGENT_MODE)
+    return response
+
+
+async def dispatch_ambulance(assignment_data: dict) -> dict:
+    """
+    Reserve an operational ambulance, claim the incident for it and record the assignment.
+
+    Same scheme as an exclusive ``dispatch_responder``: a compare-and-set on
+    ``status: "operational"`` guards the unit, then the incident is claimed with
+    a compare-and-set on ``assigned_responder_id`` and ``assigned_ambulance_id``
+    being unset, alongside the assignment insert. The side writes are rolled back
+    if either compare-and-set loses, or run in one transaction with
+    DISPATCH_TRANSACTIONS.
+
+    Returns:
+        dict: The created assignment document.
+
+    Raises:
+        DispatchConflict: If the ambulance is not operational or the incident
+            already has a unit.
+    """
+    db = await get_db()
+    now = datetime.now(timezone.utc)
+    ambulance_id = assignment_data["ambulance_id"]
+    incident_id = assignment_data["incident_id"]
+    assignment_data["_id"] = ObjectId()
+    assignment_data["created_at"] = now
+    reserve_filter = {"_id": ObjectId(ambulance_id), "status": "operational"}
+    reserve_update = {"$set": {"status": "en_route", "incident_id": incident_id, "updated_at": now}}
+    incident_filter = {"_id": ObjectId(incident_id), "assigned_responder_id": None, "assigned_ambulance_id": None}
+    incident_update = {"$set": {"assigned_ambulance_id": ambulance_id, "updated_at": now}}
+    taken = f"Incident {incident_id} already has a unit assigned"
+    reserved = None
+    try:
+        if settings.DISPATCH_TRANSACTIONS:
+            async with await client.start_session() as session:
+                async with session.start_transaction():
+                    reserved = await db.ambulances.find_one_and_update(
+                        reserve_filter, reserve_update, projection={"hospital_id": 1}, session=session
+                    )
+                    if reserved is None:
+                        raise DispatchConflict(f"Ambulance {ambulance_id} is not operational")
+                    claimed = await db.incidents.find_one_and_update(
+                        incident_filter, incident_update, return_document=ReturnDocument.BEFORE, session=session
+                    )
+                    if claimed is None:
+                        raise DispatchConflict(taken)
+                    await db.ambulance_assignments.insert_one(assignment_data, session=session)
+        else:
+            (reserved,) = await asyncio.gather(
+                db.ambulances.find_one_and_update(reserve_filter, reserve_update, projection={"hospital_id": 1}),
+                return_exceptions=True,
+            )
+            claimed = inserted = None
+            if isinstance(reserved, dict):
+                claimed, inserted = await asyncio.gather(
+                    db.incidents.find_one_and_update(
+                        incident_filter, incident_update, return_document=ReturnDocument.BEFORE
+                    ),
+                    db.ambulance_assignments.insert_one(assignment_data),
+                    return_exceptions=True,
+                )
+            error = _first_error([reserved, claimed, inserted])
+            lost_incident = isinstance(reserved, dict) and claimed is None
+            if reserved is None or lost_incident or error is not None:
+                undo = [db.ambulance_assignments.delete_one({"_id": assignment_data["_id"]})]
+                if isinstance(reserved, dict):
+                    undo.append(db.incidents.update_one(
+                        {"_id": ObjectId(incident_id), "assigned_ambulance_id": ambulance_id},
+                        {"$unset": {"assigned_ambulance_id": ""}}
+                    ))
+                    undo.append(db.ambulances.update_one(
+                        {"_id": ObjectId(ambulance_id), "status": "en_route", "incident_id": incident_id},
+                        {"$set": {"status": "operational", "updated_at": now}, "$unset": {"incident_id": ""}}
+                    ))
+                await asyncio.gather(*undo, return_exceptions=True)
+                if error is not None:
+                    raise error
+                raise DispatchConflict(taken if lost_incident else f"Ambulance {ambulance_id} is not operational")
+    finally:
+        # Also after a rollback: reads in between may have cached the transient state
+        home = reserved.get("hospital_id") if isinstance(reserved, dict) else None
+        read_cache.invalidate(
+            ambulance_tag(ambulance_id),
+            ambulance_assignments_tag(ambulance_id),
+            home and hospital_fleet_tag(home),
+        )
+
+    incident_feed.notify("update", {**claimed, **incident_update["$set"]})
+    # The incident is served; take it out of the responder plan
+    dispatch_optimizer.request()
+    live_counters.record_assignment(assignment_data.get("hospital_id"), None, assignment_data.get("status", "assigned"))
+    mark_incident_dispatched(incident_id, settings.AGENT_MODE)
+    return assignment_data
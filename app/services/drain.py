@@ -0,0 +1,185 @@
+# Graceful drain and load-based recycling for workers holding live calls
+
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import registry
+
+logger = get_logger("drain")
+
+LIVE_SESSIONS = registry.gauge("worker_live_sessions", "Live WebSocket sessions on this worker.")
+SESSIONS_SERVED = registry.gauge("worker_sessions_served", "Live sessions this worker has accepted since it started.")
+DRAINING = registry.gauge("worker_draining", "1 while this worker refuses new sessions and waits for calls to end.")
+
+# Close code for refused connections: RFC 6455 "Try Again Later"
+TRY_AGAIN_LATER = 1013
+
+
+class WorkerDrain:
+    """
+    Per-worker admission switch for live calls, and the exit that follows it.
+
+    A worker starts draining when it has accepted ``recycle_after`` sessions (plus
+    up to ``jitter`` so workers do not recycle together) or when ``drain_file`` is
+    touched after the worker started, which is how a deploy asks the current
+    workers to step aside. Deploy drains go one worker at a time: a worker waits
+    while another worker from before the touch is draining, and the lowest pid
+    goes next, so the rest of the pool keeps taking calls. A draining worker
+    refuses new WebSockets with close code 1013, lets its calls finish for up to
+    ``drain_timeout`` seconds, then sends itself SIGTERM; the gunicorn master
+    starts a replacement.
+
+    Each worker also writes its counts to ``state_dir/<pid>.json`` so any worker
+    can report the whole pool.
+    """
+
+    def __init__(
+        self,
+        recycle_after: int = 0,
+        jitter: int = 0,
+        drain_timeout: float = 900.0,
+        drain_file: Optional[str] = None,
+        state_dir: Optional[str] = None,
+        interval: float = 2.0,
+    ):
+        self.recycle_after = recycle_after + random.randint(0, jitter) if recycle_after else 0
+        self.drain_timeout = drain_timeout
+        self.drain_file = drain_file
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.interval = interval
+        self.started_at = time.time()
+        self.live = 0
+        self.served = 0
+        self.reason: Optional[str] = None
+        self._draining_since: Optional[float] = None
+
+    @property
+    def pid(self) -> int:
+        return os.getpid()
+
+    @property
+    def draining(self) -> bool:
+        return self._draining_since is not None
+
+    def admit(self) -> bool:
+        """Whether a new live session may start on this worker."""
+        return not self.draining
+
+    def session_started(self):
+        self.live += 1
+        self.served += 1
+        if self.recycle_after and self.served >= self.recycle_after:
+            self.begin("recycle")
+
+    def session_ended(self):
+        self.live = max(self.live - 1, 0)
+
+    def begin(self, reason: str):
+        """Stop admitting sessions; the worker exits once its calls end or the timeout passes."""
+        if self.draining:
+            return
+        self._draining_since = time.monotonic()
+        self.reason = reason
+        logger.info(f"Worker {self.pid} draining ({reason}) with {self.live} live sessions")
+
+    def _drain_requested_at(self) -> Optional[float]:
+        """When the drain file was touched, if that was after this worker started."""
+        if not self.drain_file:
+            return None
+        try:
+            touched = os.stat(self.drain_file).st_mtime
+        except FileNotFoundError:
+            return None
+        return touched if touched > self.started_at else None
+
+    def _deploy_turn(self, requested_at: float) -> bool:
+        # Without shared state there is no way to take turns
+        if self.state_dir is None:
+            return True
+        outgoing = [state for state in self.pool() if state.get("started_at", 0) < requested_at]
+        if any(state["draining"] for state in outgoing if state["pid"] != self.pid):
+            return False
+        return min(state["pid"] for state in outgoing) == self.pid
+
+    def state(self) -> dict:
+        return {
+            "pid": self.pid,
+            "live_sessions": self.live,
+            "sessions_served": self.served,
+            "recycle_after": self.recycle_after,
+            "draining": self.draining,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+        }
+
+    def _state_path(self) -> Optional[Path]:
+        return self.state_dir / f"{self.pid}.json" if self.state_dir else None
+
+    def _write_state(self):
+        path = self._state_path()
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state()))
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"Worker state write failed: {e}")
+
+    def remove_state(self):
+        path = self._state_path()
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def pool(self) -> List[dict]:
+        """Every worker's last reported state, this one fresh; stale files are skipped."""
+        workers = {self.pid: self.state()}
+        if self.state_dir and self.state_dir.is_dir():
+            cutoff = time.time() - 3 * self.interval
+            for path in self.state_dir.glob("*.json"):
+                try:
+                    state = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                if state.get("updated_at", 0) >= cutoff and state.get("pid") not in workers:
+                    workers[state["pid"]] = state
+        return sorted(workers.values(), key=lambda state: state["pid"])
+
+    async def run(self):
+        """Background loop: watch the drain file, publish state, exit when drained; cancel on shutdown."""
+        while True:
+            await asyncio.sleep(self.interval)
+            requested_at = self._drain_requested_at()
+            if requested_at is not None and not self.draining and self._deploy_turn(requested_at):
+                self.begin("deploy")
+            self._write_state()
+            if self.draining:
+                waited = time.monotonic() - self._draining_since
+                if self.live == 0 or waited >= self.drain_timeout:
+                    logger.info(f"Worker {self.pid} drained after {waited:.0f}s; {self.live} sessions cut off")
+                    os.kill(self.pid, signal.SIGTERM)
+                    return
+
+
+worker_drain = WorkerDrain(
+    recycle_after=settings.WORKER_RECYCLE_SESSIONS,
+    jitter=settings.WORKER_RECYCLE_JITTER,
+    drain_timeout=settings.DRAIN_TIMEOUT_SECONDS,
+    drain_file=settings.DRAIN_FILE,
+    state_dir=settings.WORKER_STATE_DIR,
+    interval=settings.WORKER_STATE_INTERVAL_SECONDS,
+)
+
+LIVE_SESSIONS.collect(lambda: {(): worker_drain.live})
+SESSIONS_SERVED.collect(lambda: {(): worker_drain.served})
+DRAINING.collect(lambda: {(): int(worker_drain.draining)})
@@ -0,0 +1,216 @@
+# Reverse geocoding with caching, request coalescing and an offline fallback
+
+import asyncio
+import csv
+import math
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Protocol, Tuple
+
+from geopy.geocoders import Nominatim
+
+from app.core.config import settings
+from app.utils.geo import haversine_km
+
+
+class GeocodingProvider(Protocol):
+    """Resolves coordinates to {"city", "state", "country", "postcode"} or None."""
+
+    async def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        ...
+
+
+class NominatimProvider:
+    """
+    Remote provider backed by OpenStreetMap Nominatim.
+
+    geopy's client is blocking, so lookups run in a worker thread and never
+    stall the event loop. One geolocator is shared by all calls.
+    """
+
+    def __init__(self, user_agent: str = "emergency_response_app", timeout: float = 5.0):
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    async def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        location = await asyncio.to_thread(self._geolocator.reverse, (lat, lng), language="en")
+        if location and location.raw and "address" in location.raw:
+            address = location.raw["address"]
+            return {
+                "city": address.get("city") or address.get("town") or address.get("village"),
+                "state": address.get("state"),
+                "country": address.get("country"),
+                "postcode": address.get("postcode"),
+            }
+        return None
+
+
+class GazetteerProvider:
+    """
+    Offline provider that answers with the nearest place in a local CSV gazetteer.
+
+    The file needs the columns name, state, country, postcode, lat, lng. Places
+    are bucketed into 1 degree cells so a lookup only scans the surrounding cells.
+    """
+
+    def __init__(self, path: str, max_distance_km: float = 50.0):
+        self.max_distance_km = max_distance_km
+        self._cells: Dict[Tuple[int, int], list] = {}
+        if Path(path).exists():
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    lat, lng = float(row["lat"]), float(row["lng"])
+                    self._cells.setdefault(self._cell(lat, lng), []).append((lat, lng, row))
+
+    @staticmethod
+    def _cell(lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat), math.floor(lng)
+
+    def lookup(self, lat: float, lng: float) -> Optional[dict]:
+        cell_lat, cell_lng = self._cell(lat, lng)
+        best, best_km = None, self.max_distance_km
+        for d_lat in (-1, 0, 1):
+            for d_lng in (-1, 0, 1):
+                for p_lat, p_lng, row in self._cells.get((cell_lat + d_lat, cell_lng + d_lng), ()):
+                    km = haversine_km(lat, lng, p_lat, p_lng)
+                    if km <= best_km:
+                        best, best_km = row, km
+        if best is None:
+            return None
+        return {
+            "city": best["name"],
+            "state": best["state"] or None,
+            "country": best["country"] or None,
+            "postcode": best["postcode"] or None,
+        }
+
+    async def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        return self.lookup(lat, lng)
+
+
+class StubProvider:
+    """In-process provider for tests and offline runs; wraps a plain function."""
+
+    def __init__(self, resolve: Callable[[float, float], Optional[dict]]):
+        self._resolve = resolve
+        self.calls = 0
+
+    async def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        self.calls += 1
+        return self._resolve(lat, lng)
+
+
+class ReverseGeocoder:
+    """
+    Async reverse geocoder used by the agent tools.
+
+    Coordinates are rounded to ``precision`` decimals (3 is roughly 100 m) so nearby
+    points share a cache entry. Provider answers live for ``ttl`` seconds, and the
+    cache holds at most ``max_entries`` cells in LRU order. Concurrent lookups for
+    the same cell wait on a single provider call, which keeps running if the caller
+    that started it is cancelled. When the provider fails or finds nothing, the
+    offline ``fallback`` is asked instead; those answers (and empty ones) are only
+    kept for ``negative_ttl`` seconds so the provider is retried soon.
+    """
+
+    def __init__(
+        self,
+        provider: GeocodingProvider,
+        fallback: Optional[GeocodingProvider] = None,
+        precision: int = 3,
+        ttl: float = 3600.0,
+        max_entries: int = 10000,
+        negative_ttl: float = 60.0,
+    ):
+        self.provider = provider
+        self.fallback = fallback
+        self.precision = precision
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[float, float], Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[Tuple[float, float], asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "fallbacks": 0, "errors": 0}
+
+    def _key(self, lat: float, lng: float) -> Tuple[float, float]:
+        return round(lat, self.precision), round(lng, self.precision)
+
+    async def reverse(self, lat: float, lng: float) -> dict:
+        key = self._key(lat, lng)
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(cached[1])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.get_running_loop().create_task(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settled(key, done))
+        # Shielded so a caller that gives up does not cancel the lookup others wait on
+        return dict(await asyncio.shield(task))
+
+    def _settled(self, key: Tuple[float, float], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the outcome in case every caller was cancelled
+        task.cancelled() or task.exception()
+
+    async def _load(self, key: Tuple[float, float]) -> dict:
+        result, ttl = await self._resolve(*key)
+        self._store(key, result, ttl)
+        return result
+
+    async def _resolve(self, lat: float, lng: float) -> Tuple[dict, float]:
+        try:
+            result = await self.provider.reverse(lat, lng)
+        except Exception:
+            self.stats["errors"] += 1
+            result = None
+        if result:
+            return result, self.ttl
+        if self.fallback is not None:
+            self.stats["fallbacks"] += 1
+            result = await self.fallback.reverse(lat, lng)
+        return result or {}, self.negative_ttl
+
+    def _store(self, key: Tuple[float, float], result: dict, ttl: float):
+        if ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def _default_provider() -> GeocodingProvider:
+    if settings.GEOCODER_PROVIDER == "offline":
+        return GazetteerProvider(settings.GAZETTEER_PATH)
+    return NominatimProvider(timeout=settings.GEOCODER_TIMEOUT_SECONDS)
+
+
+geocoder = ReverseGeocoder(
+    provider=_default_provider(),
+    fallback=GazetteerProvider(settings.GAZETTEER_PATH),
+    precision=settings.GEOCODER_CACHE_PRECISION,
+    ttl=settings.GEOCODER_CACHE_TTL_SECONDS,
+    max_entries=settings.GEOCODER_CACHE_MAX_ENTRIES,
+    negative_ttl=settings.GEOCODER_NEGATIVE_TTL_SECONDS,
+)
+
+
+def set_geocoding_provider(provider: GeocodingProvider):
+    """Swap the primary provider, e.g. for a StubProvider in tests. Clears the cache."""
+    geocoder.provider = provider
+    geocoder.clear()
+
+
+async def reverse_geocode(lat: float, lng: float) -> dict:
+    return await geocoder.reverse(lat, lng)
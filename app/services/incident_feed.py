@@ -0,0 +1,191 @@
+# Push-based incident feed: one source per worker, fanned out to every subscriber
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.db.session import get_db
+from app.utils.serialization import dumps
+
+logger = get_logger("incident_feed")
+
+# Sent when a resume token is no longer in the replay history; clients should refetch
+RESET_EVENT = dumps({"op": "reset"})
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost: the stream cannot resume
+RESUME_POINT_LOST = (260, 280, 286)
+
+
+class Subscription:
+    def __init__(self, feed: "IncidentFeed", queue_size: int):
+        self._feed = feed
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, event_id: str, payload: str):
+        try:
+            self.queue.put_nowait((event_id, payload))
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream; the client resumes from its last id
+            self.overflowed = True
+            self._feed.unsubscribe(self)
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[tuple]:
+        """
+        Next (event_id, payload), or None once the feed has dropped this subscriber.
+
+        Raises:
+            asyncio.TimeoutError: If nothing arrives within ``timeout`` seconds.
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def __aiter__(self) -> AsyncIterator[tuple]:
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            self._feed.unsubscribe(self)
+
+
+class IncidentFeed:
+    """
+    Broadcasts incident creates and updates to SSE/WebSocket subscribers.
+
+    Events come from a MongoDB change stream on ``incidents`` when the deployment
+    supports it (replica set), otherwise from ``create_incident``/``update_incident``
+    in this worker. Each event is encoded once and pushed to every subscriber queue,
+    so subscribers cost no database queries. The last ``history`` events are kept
+    so a reconnecting client can resume after the id it last saw.
+
+    Local events only cover writes made by this worker: under several gunicorn
+    workers each subscriber sees just its own worker's writes, so deployments with
+    more than one worker need a replica set for the change stream. In ``auto``
+    mode, local events raised while the change stream is still being opened are
+    held and published once the source is known, so none are lost at startup.
+    """
+
+    def __init__(self, mode: str = "auto", history: int = 1000, queue_size: int = 256):
+        self.requested_mode = mode
+        self.mode = "local" if mode == "local" else "starting"
+        self.queue_size = queue_size
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: set = set()
+        self._boot = f"{os.getpid()}-{int(time.time())}"
+        self._seq = 0
+        self._resume_token = None
+        # Local events raised before the source was known (auto mode only)
+        self._pending: deque = deque(maxlen=history)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _publish(self, event_id: str, op: str, incident: dict):
+        payload = dumps({"id": event_id, "op": op, "incident": incident})
+        self._history.append((event_id, payload))
+        for subscription in list(self._subscribers):
+            subscription.push(event_id, payload)
+
+    def notify(self, op: str, incident: dict):
+        """Called by the CRUD layer; ignored while a change stream is the source."""
+        if self.mode == "starting":
+            self._pending.append((op, incident))
+            return
+        if self.mode != "local":
+            return
+        self._publish_local(op, incident)
+
+    def _publish_local(self, op: str, incident: dict):
+        self._seq += 1
+        self._publish(f"{self._boot}:{self._seq}", op, incident)
+
+    def _settle(self, mode: str):
+        # Writes made before the stream opened will not come through it; publish them now
+        # (one landing while it opens can arrive twice, which beats losing it)
+        self.mode = mode
+        while self._pending:
+            self._publish_local(*self._pending.popleft())
+
+    def _reset(self):
+        # Events were missed: replay history no longer covers them, so subscribers refetch
+        self._resume_token = None
+        self._history.clear()
+        for subscription in list(self._subscribers):
+            subscription.push("", RESET_EVENT)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber, replaying events after ``last_event_id`` if given."""
+        subscription = Subscription(self, self.queue_size)
+        if last_event_id:
+            ids = [event_id for event_id, _ in self._history]
+            missed = list(self._history)[ids.index(last_event_id) + 1:] if last_event_id in ids else None
+            if missed is None or len(missed) >= self.queue_size:
+                subscription.push("", RESET_EVENT)
+            else:
+                for event_id, payload in missed:
+                    subscription.push(event_id, payload)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def run(self):
+        """
+        Follow the change stream; cancel it on shutdown.
+
+        In ``auto`` mode a server without change streams (standalone) switches the
+        worker to local events. Any other error, or an unsupported server in
+        ``change_stream`` mode (e.g. a replica set not yet initiated), is logged
+        and retried.
+        """
+        if self.requested_mode == "local":
+            return
+        db = await get_db()
+        while True:
+            try:
+                async with db.incidents.watch(
+                    full_document="updateLookup", resume_after=self._resume_token
+                ) as stream:
+                    self._settle("change_stream")
+                    async for change in stream:
+                        self._resume_token = change["_id"]
+                        incident = change.get("fullDocument") or {"_id": change["documentKey"]["_id"]}
+                        self._publish(change["_id"]["_data"], change["operationType"], incident)
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED and self.requested_mode == "auto":
+                    logger.warning(
+                        f"Incident change stream unavailable, using local events: {e}; "
+                        "subscribers only see writes made by their own worker"
+                    )
+                    self._settle("local")
+                    return
+                if e.code in RESUME_POINT_LOST:
+                    logger.warning(f"Incident change stream cannot resume, restarting it: {e}")
+                    self._reset()
+                else:
+                    logger.error(f"Incident change stream failed, retrying: {e}")
+                await asyncio.sleep(1)
+            except Exception as e:
+                logger.warning(f"Incident change stream interrupted, resuming: {e}")
+                await asyncio.sleep(1)
+
+
+incident_feed = IncidentFeed(
+    mode=settings.INCIDENT_FEED_MODE,
+    history=settings.INCIDENT_FEED_HISTORY,
+    queue_size=settings.INCIDENT_FEED_QUEUE_SIZE,
+)
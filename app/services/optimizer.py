@@ -0,0 +1,256 @@
+# Global dispatch optimizer: matches available responders to every unassigned incident at once
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # optional; a priority-ordered greedy pass is used instead
+    linear_sum_assignment = None
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import registry
+from app.db.session import get_db
+from app.services.spatial_index import point_of, responder_index
+from app.utils.geo import EARTH_RADIUS_KM
+
+logger = get_logger("optimizer")
+
+OPTIMIZER_DURATION = registry.histogram(
+    "dispatch_optimizer_seconds", "Time to recompute the dispatch plan.", ["solver"]
+)
+
+# Cost multiplier per priority: a minute of P1 ETA weighs as much as eight minutes of P3
+PRIORITY_WEIGHTS = {"P1": 8.0, "P2": 3.0, "P3": 1.0}
+
+
+@dataclass(frozen=True)
+class Assignment:
+    incident_id: str
+    responder_id: str
+    priority: str
+    distance_km: float
+    eta_minutes: float
+
+
+def distance_matrix_km(inc_lat, inc_lng, resp_lat, resp_lng) -> np.ndarray:
+    """Haversine distances in km, shape (incidents, responders)."""
+    phi1 = np.radians(np.asarray(inc_lat, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(resp_lat, dtype=np.float64))[None, :]
+    dlmb = np.radians(np.asarray(resp_lng, dtype=np.float64))[None, :] - np.radians(
+        np.asarray(inc_lng, dtype=np.float64)
+    )[:, None]
+    a = np.sin((phi2 - phi1) / 2) ** 2
+    a += np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    np.minimum(a, 1.0, out=a)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a, out=a), out=a)
+
+
+def _greedy(cost: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Highest priority first, oldest first within a priority; each takes its nearest free unit
+    rows, cols = [], []
+    for row in np.argsort(-weights, kind="stable"):
+        col = int(np.argmin(cost[row]))
+        if not np.isfinite(cost[row, col]):
+            continue
+        rows.append(row)
+        cols.append(col)
+        cost[:, col] = np.inf
+    return np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)
+
+
+def solve(
+    incidents: Sequence[Tuple[str, str, float, float]],
+    responders: Sequence[Tuple[str, float, float]],
+    speed_kmh: float = 40.0,
+    max_eta_minutes: float = 90.0,
+    candidates: Optional[int] = 32,
+    solver: Optional[str] = None,
+) -> List[Assignment]:
+    """
+    Assign at most one responder to each incident, minimising priority-weighted total ETA.
+
+    Args:
+        incidents: (incident_id, priority, lat, lng), oldest first.
+        responders: (responder_id, lat, lng) of available units.
+        speed_kmh: Average response speed used for ETAs.
+        max_eta_minutes: Pairs slower than this are never assigned.
+        candidates: Only each incident's nearest ``candidates`` units enter the
+            assignment (None for all), unless together they number fewer than
+            twice the incidents. Exact whenever there are no more incidents than
+            candidates.
+        solver: "hungarian" or "greedy"; defaults to hungarian when scipy is installed.
+
+    Returns:
+        List[Assignment]: In incident order. With fewer reachable units than
+        incidents, the lowest priorities are left unassigned first.
+    """
+    if not incidents or not responders:
+        return []
+    solver = solver or ("hungarian" if linear_sum_assignment is not None else "greedy")
+    inc_lat = [i[2] for i in incidents]
+    inc_lng = [i[3] for i in incidents]
+    eta = distance_matrix_km(inc_lat, inc_lng, [r[1] for r in responders], [r[2] for r in responders])
+    eta *= 60.0 / speed_kmh
+
+    columns = np.arange(len(responders))
+    if candidates is not None and candidates < len(responders):
+        nearest = np.unique(np.argpartition(eta, candidates - 1, axis=1)[:, :candidates])
+        # Clustered incidents share candidates; too few to go round means a shortage,
+        # where units further out matter, so keep them all
+        if len(nearest) >= 2 * len(incidents):
+            columns = nearest
+            eta = eta[:, columns]
+
+    feasible = eta <= max_eta_minutes
+    reachable = np.flatnonzero(feasible.any(axis=1))
+    if reachable.size == 0:
+        return []
+    eta, feasible = eta[reachable], feasible[reachable]
+    weights = np.array([PRIORITY_WEIGHTS.get(incidents[row][1], 1.0) for row in reachable])
+
+    if solver == "hungarian":
+        # Covering an incident is worth its weight times the ETA limit, so when units run
+        # short the lower priorities go without; unreachable pairs are worth nothing
+        cost = np.where(feasible, weights[:, None] * (eta - max_eta_minutes - 1.0), 0.0)
+        rows, cols = linear_sum_assignment(cost)
+        keep = feasible[rows, cols]
+        rows, cols = rows[keep], cols[keep]
+    else:
+        rows, cols = _greedy(np.where(feasible, eta, np.inf), weights)
+
+    plan = []
+    for row, col in sorted(zip(rows.tolist(), cols.tolist())):
+        incident_id, priority = incidents[reachable[row]][0], incidents[reachable[row]][1]
+        minutes = float(eta[row, col])
+        plan.append(Assignment(
+            incident_id=incident_id,
+            responder_id=responders[int(columns[col])][0],
+            priority=priority,
+            distance_km=round(minutes * speed_kmh / 60.0, 3),
+            eta_minutes=round(minutes, 1),
+        ))
+    return plan
+
+
+class DispatchOptimizer:
+    """
+    Keeps a global assignment of available responders to unassigned active incidents.
+
+    Nearby searches pick the closest unit for one incident at a time, so during a
+    surge an early P3 can take the only nearby unit a later P1 needed. The plan
+    here is recomputed for all incidents together whenever an incident or a
+    unit's availability changes (calls within the debounce window share one
+    run), and ``get_dispatch_candidates`` offers each incident its planned unit.
+    Those changes are only seen for this worker's own writes, so ``run`` also
+    recomputes it every ``refresh_interval`` seconds to pick up units reserved or
+    freed by other workers. The plan is advisory: units are still reserved
+    through ``dispatch_responder``.
+    """
+
+    def __init__(self, debounce: float = 0.5, refresh_interval: float = 30.0, enabled: bool = True):
+        self.debounce = debounce
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled
+        self.updated_at: Optional[datetime] = None
+        self._plan: Dict[str, Assignment] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def request(self):
+        """Recompute the plan shortly."""
+        if not self.enabled:
+            return
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.debounce)
+            self._pending = False
+            try:
+                await self.reoptimize()
+            except Exception as e:
+                logger.error(f"Dispatch optimization failed: {e}")
+            if not self._pending:
+                return
+
+    async def run(self):
+        """Periodic recompute; cancel it on shutdown."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            self.request()
+
+    def responder_changed(self, responder_id: str, status: Optional[str]):
+        """Call after a responder's status changes."""
+        if status != "available":
+            # Stop recommending a unit that is no longer free while the plan is recomputed
+            responder_id = str(responder_id)
+            self._plan = {key: a for key, a in self._plan.items() if a.responder_id != responder_id}
+        self.request()
+
+    def recommendation(self, incident_id: str) -> Optional[Assignment]:
+        return self._plan.get(str(incident_id))
+
+    def plan(self) -> dict:
+        return {
+            "updated_at": self.updated_at,
+            "assignments": [asdict(a) for a in self._plan.values()],
+        }
+
+    async def _load_incidents(self) -> List[Tuple[str, str, float, float]]:
+        db = await get_db()
+        cursor = db.incidents.find(
+            {
+                "status": "active",
+                "assigned_responder_id": None,
+                "assigned_ambulance_id": None,
+                "location": {"$exists": True},
+            },
+            {"priority": 1, "location": 1},
+        ).sort("_id", 1)
+        incidents = []
+        async for doc in cursor:
+            point = point_of(doc)
+            if point is not None:
+                incidents.append((str(doc["_id"]), doc.get("priority", "P3"), point[0], point[1]))
+        return incidents
+
+    async def _load_responders(self) -> List[Tuple[str, float, float]]:
+        if settings.SPATIAL_INDEX_ENABLED and responder_index.ready:
+            return [(str(doc["_id"]), lat, lng) for doc, lat, lng in responder_index.select({"status": "available"})]
+        db = await get_db()
+        responders = []
+        async for doc in db.responders.find({"status": "available"}, {"location": 1}):
+            point = point_of(doc)
+            if point is not None:
+                responders.append((str(doc["_id"]), point[0], point[1]))
+        return responders
+
+    async def reoptimize(self) -> List[Assignment]:
+        incidents, responders = await asyncio.gather(self._load_incidents(), self._load_responders())
+        solver = "hungarian" if linear_sum_assignment is not None else "greedy"
+        started = time.perf_counter()
+        plan = await asyncio.to_thread(
+            solve, incidents, responders,
+            settings.DISPATCH_SPEED_KMH, settings.OPTIMIZER_MAX_ETA_MINUTES, settings.OPTIMIZER_CANDIDATES, solver,
+        )
+        OPTIMIZER_DURATION.observe(time.perf_counter() - started, solver=solver)
+        self._plan = {a.incident_id: a for a in plan}
+        self.updated_at = datetime.now(timezone.utc)
+        return plan
+
+
+dispatch_optimizer = DispatchOptimizer(
+    debounce=settings.OPTIMIZER_DEBOUNCE_SECONDS,
+    refresh_interval=settings.OPTIMIZER_REFRESH_SECONDS,
+    enabled=settings.OPTIMIZER_ENABLED,
+)
@@ -0,0 +1,272 @@
+# Background specialist agents for live calls (AGENT_MODE=orchestrated)
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from app.agents.tools.incident import CreateIncidentTool, UpdateIncidentTool
+from app.agents.tools.phases import CALLER_KEY, INCIDENT_KEY
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import SPECIALIST_DURATION
+from app.db.session import get_db
+from app.utils.serialization import ResultShape, dumps, shape_result
+
+logger = get_logger("orchestrator")
+
+APP_NAME = "specialists"
+PRIORITIES = ("P1", "P2", "P3")
+INCIDENT_SHAPE = ResultShape(max_bytes=2048)
+MAX_TRACKED_INCIDENTS = 10000
+
+
+def _parse_json(text: Optional[str]) -> dict:
+    """The first JSON object in a specialist's answer, or {} if there is none."""
+    if not text:
+        return {}
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        value = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _build_runners() -> Dict[str, InMemoryRunner]:
+    # Imported here: the specialist modules are only needed in orchestrated mode
+    from app.agents.dispatch_agent import dispatch_agent
+    from app.agents.hospital_agent import hospital_agent
+    from app.agents.location_agent import location_agent
+    from app.agents.triage_agent import triage_agent
+    from app.agents.tools.fetch_nearby import find_responders_expanding_radius_tool, get_dispatch_candidates_tool
+    from app.agents.tools.hospital import get_hospital_tool, get_nearby_hospitals_tool
+    from app.agents.tools.incident import assign_responder_to_incident_tool
+
+    model = settings.SPECIALIST_MODEL
+    specialists = {
+        "triage": triage_agent.model_copy(update={"model": model}),
+        "location": location_agent.model_copy(update={"model": model}),
+        "hospital": hospital_agent.model_copy(
+            update={"model": model, "tools": [get_nearby_hospitals_tool, get_hospital_tool]}
+        ),
+        # Units are only committed through assign_responder_to_incident, whose
+        # compare-and-set on the incident keeps the call agent and this one from
+        # both dispatching
+        "dispatch": dispatch_agent.model_copy(update={
+            "model": model,
+            "tools": [
+                get_dispatch_candidates_tool,
+                find_responders_expanding_radius_tool,
+                assign_responder_to_incident_tool,
+            ],
+        }),
+    }
+    return {name: InMemoryRunner(agent=agent, app_name=APP_NAME) for name, agent in specialists.items()}
+
+
+class IncidentOrchestrator:
+    """
+    Runs the triage, location, hospital and dispatch specialists beside a live call.
+
+    The live model keeps talking to the caller; once the incident has a location or
+    address the specialists run on a non-live model, as concurrently as their
+    inputs allow: triage and location start together, hospital matching starts as
+    soon as coordinates are known (immediately if the caller gave them) and
+    dispatch waits for both triage and location. Each result is written back to
+    the incident where it is structured (priority, coordinates) and sent into the
+    caller's live session as it arrives. Audit records are written in the
+    background and never delay a stage.
+    """
+
+    def __init__(self):
+        self._runners: Optional[Dict[str, InMemoryRunner]] = None
+        self._queues: Dict[str, LiveRequestQueue] = {}
+        self._started: "OrderedDict[str, bool]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def attach(self, user_id: str, queue: LiveRequestQueue):
+        """Deliver results for ``user_id``'s incidents to this live session."""
+        self._queues[user_id] = queue
+
+    def detach(self, user_id: str, queue: LiveRequestQueue):
+        # A reconnect may already have attached a newer queue
+        if self._queues.get(user_id) is queue:
+            del self._queues[user_id]
+
+    def start(self, user_id: str, incident_id: str):
+        """Start the pipeline for an incident; later calls for the same incident are ignored."""
+        incident_id = str(incident_id)
+        if incident_id in self._started:
+            return
+        self._started[incident_id] = True
+        while len(self._started) > MAX_TRACKED_INCIDENTS:
+            self._started.popitem(last=False)
+        self._spawn(self._pipeline(user_id, incident_id))
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def close(self):
+        """Cancel running pipelines and wait for pending audit writes."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _pipeline(self, user_id: str, incident_id: str):
+        from app.db.crud import escalate_incident_priority, get_incident, update_incident
+
+        if self._runners is None:
+            self._runners = _build_runners()
+        incident = await get_incident(incident_id)
+        if incident is None:
+            return
+        brief = f"Incident {incident_id}: {dumps(shape_result(incident, INCIDENT_SHAPE)[0])}"
+
+        async def triage() -> dict:
+            result = _parse_json(await self._stage("triage", user_id, incident_id, brief))
+            priority = result.get("priority")
+            # Only ever escalate; checked against the stored priority, which the call agent may have raised since
+            if priority in PRIORITIES:
+                await escalate_incident_priority(incident_id, priority)
+            return result
+
+        async def location() -> Optional[dict]:
+            if incident.get("location"):
+                return incident["location"]
+            result = _parse_json(await self._stage("location", user_id, incident_id, brief))
+            resolved = result.get("resolved_location") or {}
+            try:
+                point = {"lat": float(resolved["lat"]), "lng": float(resolved["lng"])}
+            except (KeyError, TypeError, ValueError):
+                return None
+            # Also starts the dispatch candidate prefetch
+            update = {"location": point}
+            if resolved.get("address"):
+                update["address"] = resolved["address"]
+            await update_incident(incident_id, update)
+            return point
+
+        async def hospital(located: asyncio.Task):
+            point = await located
+            if point is not None:
+                await self._stage(
+                    "hospital", user_id, incident_id,
+                    f"{brief}\nLocation: {dumps(point)}\nFind the nearest suitable hospitals with free beds.",
+                )
+
+        async def dispatch(triaged: asyncio.Task, located: asyncio.Task):
+            result, point = await asyncio.gather(triaged, located)
+            if point is None:
+                return
+            current = await get_incident(incident_id)
+            if current is None or current.get("assigned_responder_id") or current.get("assigned_ambulance_id"):
+                # The call agent dispatched first; a race past this check loses the CAS in dispatch_responder
+                return
+            await self._stage(
+                "dispatch", user_id, incident_id,
+                f"{brief}\nTriage: {dumps(result)}\nLocation: {dumps(point)}\n"
+                "Call get_dispatch_candidates, then reserve its recommended responder (or the best "
+                "available one) with assign_responder_to_incident. If it reports that the incident already "
+                "has a unit assigned, stop: the call agent dispatched one. Report who was dispatched and their ETA.",
+            )
+
+        triaged = asyncio.ensure_future(triage())
+        located = asyncio.ensure_future(location())
+        outcomes = await asyncio.gather(
+            triaged, hospital(located), dispatch(triaged, located), return_exceptions=True
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error(f"Specialist pipeline for incident {incident_id} failed: {outcome}")
+
+    async def _stage(self, name: str, user_id: str, incident_id: str, prompt: str) -> Optional[str]:
+        runner = self._runners[name]
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        started = time.perf_counter()
+        outcome, text = "error", None
+        try:
+            text = await asyncio.wait_for(
+                self._final_text(runner, user_id, session.id, message), settings.SPECIALIST_TIMEOUT_SECONDS
+            )
+            outcome = "ok" if text else "empty"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except Exception as e:
+            logger.error(f"Specialist {name} failed for incident {incident_id}: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            SPECIALIST_DURATION.observe(elapsed, agent=name, outcome=outcome)
+            await runner.session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+        self._audit(incident_id=incident_id, user_id=user_id, agent=name, outcome=outcome,
+                    seconds=round(elapsed, 3), result=text)
+        if text:
+            self._deliver(user_id, incident_id, name, text)
+        return text
+
+    @staticmethod
+    async def _final_text(runner: InMemoryRunner, user_id: str, session_id: str, message: types.Content) -> str:
+        text = ""
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+            if event.is_final_response() and event.content and event.content.parts:
+                text = "".join(part.text or "" for part in event.content.parts)
+        return text
+
+    def _deliver(self, user_id: str, incident_id: str, name: str, text: str):
+        queue = self._queues.get(user_id)
+        if queue is None:
+            # The caller hung up; the result is still in the audit log
+            return
+        queue.send_content(types.Content(role="user", parts=[types.Part(text=(
+            f"[Background {name} result for incident {incident_id}. Do not read this to the caller; "
+            f"use it and do not repeat work it reports as done.]\n{text}"
+        ))]))
+
+    def _audit(self, **record: Any):
+        self._spawn(self._write_audit(record))
+
+    @staticmethod
+    async def _write_audit(record: dict):
+        try:
+            db = await get_db()
+            await db.audit_log.insert_one({**record, "created_at": datetime.now(timezone.utc)})
+        except Exception as e:
+            logger.warning(f"Audit write failed: {e}")
+
+
+orchestrator = IncidentOrchestrator()
+
+
+def launch_specialists(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> Optional[dict]:
+    """after_tool_callback that starts the specialists once the incident has a location or address."""
+    if settings.AGENT_MODE != "orchestrated":
+        return None
+    if isinstance(tool_response, dict) and "error" in tool_response:
+        return None
+    if tool.name == CreateIncidentTool.name:
+        data = args.get("data") or {}
+    elif tool.name == UpdateIncidentTool.name:
+        data = args.get("update_data") or {}
+    else:
+        return None
+    incident_id = args.get("incident_id") or tool_context.state.get(INCIDENT_KEY)
+    caller_id = tool_context.state.get(CALLER_KEY)
+    if incident_id and caller_id and (data.get("location") or data.get("address")):
+        orchestrator.start(caller_id, incident_id)
+    return None
@@ -0,0 +1,178 @@
+# Speculative lookup of dispatch candidates as soon as an incident has a location
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import registry
+from app.services.spatial_index import hospital_index, responder_index
+from app.utils.geo import haversine_km
+
+logger = get_logger("prefetch")
+
+PREFETCH_REQUESTS = registry.counter(
+    "prefetch_requests_total", "Dispatch candidate lookups by result (hit, wait, miss).", ["result"]
+)
+
+
+@dataclass
+class _Entry:
+    lat: float
+    lng: float
+    result: Optional[dict] = None
+    expires_at: float = 0.0
+    responder_ids: Set[str] = field(default_factory=set)
+    hospital_ids: Set[str] = field(default_factory=set)
+    task: Optional[asyncio.Task] = None
+    # Set when an invalidation lands while a lookup is running
+    dirty: bool = False
+
+
+class DispatchPrefetcher:
+    """
+    Computes nearby responders and hospitals for an incident in the background.
+
+    ``create_incident``/``update_incident`` call ``schedule`` when a location is
+    recorded; both searches run concurrently and the result is kept under the
+    incident id, so the dispatch tool usually answers without a query.
+
+    Unit changes only mark the entries they could affect as stale; the lookup
+    is redone when the incident is next read, so a burst of changes costs no
+    queries for incidents nobody asks about. A unit becoming available, or a
+    hospital changing, affects entries within the search radius of it (all
+    entries if its position is not indexed); any other responder change only
+    affects lists that contain it.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 120.0,
+        max_incidents: int = 1000,
+        enabled: bool = True,
+        responder_radius_km: float = 10.0,
+        hospital_radius_km: float = 20.0,
+    ):
+        self.ttl = ttl
+        self.max_incidents = max_incidents
+        self.enabled = enabled
+        self.responder_radius_km = responder_radius_km
+        self.hospital_radius_km = hospital_radius_km
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, incident_id: str, location: Optional[dict]):
+        """Start (or restart) the lookup for an incident at ``location`` {"lat", "lng"}."""
+        if not self.enabled or not location or "lat" not in location or "lng" not in location:
+            return
+        incident_id = str(incident_id)
+        entry = self._entries.pop(incident_id, None)
+        if entry is not None and entry.task is not None:
+            entry.task.cancel()
+        entry = _Entry(lat=float(location["lat"]), lng=float(location["lng"]))
+        self._entries[incident_id] = entry
+        while len(self._entries) > self.max_incidents:
+            _, evicted = self._entries.popitem(last=False)
+            if evicted.task is not None:
+                evicted.task.cancel()
+        self._start(incident_id, entry)
+
+    def _start(self, incident_id: str, entry: _Entry):
+        entry.dirty = False
+        entry.task = asyncio.get_running_loop().create_task(self._compute(incident_id, entry))
+        # Nobody may await a speculative lookup; keep its failure from being reported as unhandled
+        entry.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _compute(self, incident_id: str, entry: _Entry) -> dict:
+        from app.db.crud import get_nearby_hospitals, get_nearby_responders
+
+        try:
+            responders, hospitals = await asyncio.gather(
+                get_nearby_responders(entry.lat, entry.lng, radius=self.responder_radius_km),
+                get_nearby_hospitals(entry.lat, entry.lng, radius=self.hospital_radius_km),
+            )
+        except Exception as e:
+            logger.warning(f"Dispatch prefetch for incident {incident_id} failed: {e}")
+            entry.task = None
+            raise
+        entry.result = {"incident_id": incident_id, "responders": responders, "hospitals": hospitals}
+        entry.responder_ids = {str(doc["_id"]) for doc in responders}
+        entry.hospital_ids = {str(doc["_id"]) for doc in hospitals}
+        entry.expires_at = time.monotonic() + self.ttl
+        entry.task = None
+        if entry.dirty:
+            # This result predates an invalidation; current waiters take it, the next read recomputes
+            entry.dirty = False
+            entry.expires_at = 0.0
+        return entry.result
+
+    @staticmethod
+    def _stale(entry: _Entry):
+        entry.expires_at = 0.0
+        if entry.task is not None:
+            entry.dirty = True
+
+    def _near(self, entry: _Entry, point: Optional[tuple], radius_km: float) -> bool:
+        return point is None or haversine_km(entry.lat, entry.lng, point[0], point[1]) <= radius_km
+
+    def responder_changed(self, responder_id: str, status: Optional[str]):
+        """Call after a responder's status changes."""
+        responder_id = str(responder_id)
+        point = responder_index.point(responder_id) if status == "available" else None
+        for entry in self._entries.values():
+            if responder_id in entry.responder_ids or (
+                status == "available" and self._near(entry, point, self.responder_radius_km)
+            ):
+                self._stale(entry)
+
+    def hospital_changed(self, hospital_id: str):
+        """Call after a hospital's beds or status change; it may join or leave nearby lists."""
+        hospital_id = str(hospital_id)
+        point = hospital_index.point(hospital_id)
+        for entry in self._entries.values():
+            if hospital_id in entry.hospital_ids or self._near(entry, point, self.hospital_radius_km):
+                self._stale(entry)
+
+    def discard(self, incident_id: str):
+        entry = self._entries.pop(str(incident_id), None)
+        if entry is not None and entry.task is not None:
+            entry.task.cancel()
+
+    async def get(self, incident_id: str) -> Optional[dict]:
+        """
+        The prefetched candidates, waiting for a lookup that is still running.
+
+        Returns:
+            dict or None: {"incident_id", "responders", "hospitals"}, or None if
+            nothing was prefetched for this incident (or the entry expired).
+        """
+        entry = self._entries.get(str(incident_id))
+        if entry is None:
+            PREFETCH_REQUESTS.inc(result="miss")
+            return None
+        if entry.result is not None and entry.expires_at > time.monotonic():
+            PREFETCH_REQUESTS.inc(result="hit")
+            return entry.result
+        if entry.task is None:
+            # Expired, stale or failed: recompute now
+            self._start(str(incident_id), entry)
+        PREFETCH_REQUESTS.inc(result="wait")
+        try:
+            return await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            # Superseded by a newer location for the same incident
+            if asyncio.current_task().cancelling():
+                raise
+            return await self.get(incident_id)
+
+
+dispatch_prefetcher = DispatchPrefetcher(
+    ttl=settings.PREFETCH_TTL_SECONDS,
+    max_incidents=settings.PREFETCH_MAX_INCIDENTS,
+    enabled=settings.PREFETCH_ENABLED,
+)
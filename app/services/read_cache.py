@@ -0,0 +1,185 @@
+# Write-invalidated cache for the CRUD read functions used by the agent tools
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+CACHE_REQUESTS = registry.counter(
+    "read_cache_requests_total", "Read cache lookups by kind and result.", ["kind", "result"]
+)
+CACHE_ENTRIES = registry.gauge("read_cache_entries", "Entries held in the read cache.")
+
+Key = Tuple[str, ...]
+
+
+def _copy(value):
+    # Callers get their own top-level dicts so adding fields does not leak into the cache
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+class ReadCache:
+    """
+    TTL + LRU cache in front of CRUD reads, invalidated by tags.
+
+    Every entry carries tags naming what it was built from, e.g. ``hospital:<id>``
+    for each hospital in a list. Writers call ``invalidate`` with the tags they
+    touched after their write completes, which drops exactly the entries that
+    could now be stale. A load that overlaps an invalidation of any of the tags
+    it ends up with is returned but not stored, so a read racing a write cannot
+    re-cache the old value; invalidations of unrelated tags do not affect it.
+    Concurrent misses for the same key share one load, which keeps running if
+    the caller that started it is cancelled.
+
+    Invalidation is per worker; writes made by other workers are picked up when
+    ``ttl`` expires.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 5000, enabled: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[Key, Tuple[float, Any, Set[str]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Key]] = {}
+        self._inflight: Dict[Key, asyncio.Task] = {}
+        # Invalidation clock, and the tick each tag was last invalidated at; only
+        # loads in flight compare against it, so it is emptied whenever none are
+        self._clock = 0
+        self._invalidated: Dict[str, int] = {}
+        self._cleared_at = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(
+        self,
+        key: Key,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], Iterable[str]],
+    ) -> Any:
+        """
+        Return the cached value for ``key`` or load and cache it.
+
+        Args:
+            key (tuple): Cache key; the first element is the kind used in metrics.
+            loader (Callable): Coroutine factory that reads from MongoDB.
+            tags (Callable): Maps the loaded value to the tags it depends on.
+        """
+        kind = key[0]
+        if not self.enabled:
+            return await loader()
+
+        cached = self._entries.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            CACHE_REQUESTS.inc(kind=kind, result="hit")
+            return _copy(cached[1])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            CACHE_REQUESTS.inc(kind=kind, result="coalesced")
+        else:
+            CACHE_REQUESTS.inc(kind=kind, result="miss")
+            task = asyncio.get_running_loop().create_task(self._load(key, loader, tags, self._clock))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settled(key, done))
+        # Shielded so a caller that gives up does not cancel the load others wait on
+        return _copy(await asyncio.shield(task))
+
+    async def _load(
+        self, key: Key, loader: Callable[[], Awaitable[Any]], tags: Callable[[Any], Iterable[str]], started: int
+    ):
+        value = await loader()
+        if value is not None:
+            value_tags = set(tags(value))
+            if self._cleared_at <= started and all(self._invalidated.get(tag, 0) <= started for tag in value_tags):
+                self._store(key, value, value_tags)
+        return value
+
+    def _settled(self, key: Key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the outcome in case every caller was cancelled
+        task.cancelled() or task.exception()
+
+    def _store(self, key: Key, value: Any, tags: Set[str]):
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _tick(self) -> int:
+        if not self._inflight:
+            self._invalidated.clear()
+        self._clock += 1
+        return self._clock
+
+    def invalidate(self, *tags: Optional[str]):
+        """Drop every entry carrying any of ``tags``; None values are ignored."""
+        tags = [tag for tag in tags if tag is not None]
+        if not tags:
+            return
+        tick = self._tick()
+        for tag in tags:
+            self._invalidated[tag] = tick
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self):
+        self._cleared_at = self._tick()
+        self._entries.clear()
+        self._tags.clear()
+
+
+read_cache = ReadCache(
+    ttl=settings.READ_CACHE_TTL_SECONDS,
+    max_entries=settings.READ_CACHE_MAX_ENTRIES,
+    enabled=settings.READ_CACHE_ENABLED,
+)
+CACHE_ENTRIES.collect(lambda: {(): len(read_cache)})
+
+
+# Tag names shared by the readers in crud.py and the writers that invalidate them
+def hospital_tag(hospital_id) -> str:
+    return f"hospital:{hospital_id}"
+
+
+def ambulance_tag(ambulance_id) -> str:
+    return f"ambulance:{ambulance_id}"
+
+
+def hospital_fleet_tag(hospital_id) -> str:
+    """Membership of the ambulance list for one hospital."""
+    return f"fleet:{hospital_id}"
+
+
+def assignment_tag(assignment_id) -> str:
+    return f"assignment:{assignment_id}"
+
+
+def ambulance_assignments_tag(ambulance_id) -> str:
+    """Membership of the assignment list for one ambulance."""
+    return f"assignments_of:{ambulance_id}"
+
+
+ALL_HOSPITALS_TAG = "hospitals:all"
@@ -0,0 +1,386 @@
+# Offline road-network travel times
+
+import asyncio
+import csv
+import heapq
+import math
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.utils.geo import EARTH_RADIUS_KM, haversine_km
+
+ROUTING_SEARCHES = registry.counter(
+    "routing_searches_total", "Many-to-one travel time lookups by cache result (hit, extend, miss).", ["result"]
+)
+
+INF = math.inf
+GRID_DEG = 0.01
+KM_PER_DEGREE = 111.32
+# Landmarks consulted per point-to-point query, the ones giving the tightest bound at the source
+ACTIVE_LANDMARKS = 2
+
+CSR = Tuple[array, array, array]
+
+
+def _csr(n: int, sources: np.ndarray, targets: np.ndarray, seconds: np.ndarray) -> CSR:
+    """Compressed adjacency: the edges of node v are indptr[v]:indptr[v + 1]."""
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    # array.array keeps the storage compact and indexes to plain Python numbers in the search loops
+    return (
+        array("q", indptr.tobytes()),
+        array("i", targets[order].astype(np.int32).tobytes()),
+        array("f", seconds[order].astype(np.float32).tobytes()),
+    )
+
+
+def _dijkstra(graph: CSR, origin: int, n: int) -> array:
+    """Travel seconds from ``origin`` to every node along ``graph`` (INF if unreachable)."""
+    indptr, indices, weights = graph
+    dist = array("d", [INF]) * n
+    dist[origin] = 0.0
+    heap = [(0.0, origin)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for k in range(indptr[v], indptr[v + 1]):
+            u = indices[k]
+            nd = d + weights[k]
+            if nd < dist[u]:
+                dist[u] = nd
+                heapq.heappush(heap, (nd, u))
+    return dist
+
+
+class RoadGraph:
+    """
+    Directed road network in CSR arrays, with a reverse copy for many-to-one searches.
+
+    Built from two CSV files:
+        nodes: id, lat, lng
+        edges: source, target, length_m, speed_kmh[, oneway]
+    Edges are two-way unless ``oneway`` is 1/true/yes. An OSM extract converts to
+    this with any PBF tool that writes node coordinates and way segments.
+    """
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, sources: np.ndarray, targets: np.ndarray, seconds: np.ndarray):
+        self.n = len(lat)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.forward = _csr(self.n, sources, targets, seconds)
+        self.reverse = _csr(self.n, targets, sources, seconds)
+        self.edges = len(sources)
+        # Fastest straight-line speed any edge allows, in km per second: keeps the A* bound admissible
+        self.max_km_per_second = (
+            float(np.max(self._edge_km(sources, targets) / np.maximum(seconds, 1e-3))) if self.edges else 0.0
+        )
+        self._landmarks: List[Tuple[array, array]] = []
+        # Plain-float copies for the per-node reads in the A* bound
+        self._lat = array("d", self.lat.tobytes())
+        self._lng = array("d", self.lng.tobytes())
+        self._build_grid()
+
+    def _edge_km(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        phi1, phi2 = np.radians(self.lat[sources]), np.radians(self.lat[targets])
+        dlmb = np.radians(self.lng[targets] - self.lng[sources])
+        a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    @classmethod
+    def from_csv(cls, nodes_path: str, edges_path: str) -> "RoadGraph":
+        index: Dict[str, int] = {}
+        lat, lng = [], []
+        with open(nodes_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                index[row["id"]] = len(lat)
+                lat.append(float(row["lat"]))
+                lng.append(float(row["lng"]))
+        sources, targets, seconds = [], [], []
+        with open(edges_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                s, t = index.get(row["source"]), index.get(row["target"])
+                if s is None or t is None:
+                    continue
+                travel = float(row["length_m"]) / (float(row["speed_kmh"]) / 3.6)
+                sources.append(s)
+                targets.append(t)
+                seconds.append(travel)
+                if (row.get("oneway") or "").strip().lower() not in ("1", "true", "yes"):
+                    sources.append(t)
+                    targets.append(s)
+                    seconds.append(travel)
+        return cls(
+            np.asarray(lat), np.asarray(lng),
+            np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64), np.asarray(seconds),
+        )
+
+    def _build_grid(self):
+        rows = np.floor(self.lat / GRID_DEG).astype(np.int64)
+        cols = np.floor(self.lng / GRID_DEG).astype(np.int64)
+        keys = rows * 1_000_003 + cols
+        order = np.argsort(keys, kind="stable")
+        unique, starts = np.unique(keys[order], return_index=True)
+        self._cells = dict(zip(unique.tolist(), np.split(order, starts[1:])))
+
+    def snap(self, lat: float, lng: float, max_km: float) -> Optional[Tuple[int, float]]:
+        """Nearest node within ``max_km`` as (node, km), or None."""
+        row, col = math.floor(lat / GRID_DEG), math.floor(lng / GRID_DEG)
+        cell_km = KM_PER_DEGREE * GRID_DEG * max(math.cos(math.radians(min(abs(lat) + 1, 89.0))), 0.01)
+        rings = max(1, math.ceil(max_km / cell_km))
+        candidates = [
+            self._cells[key]
+            for i in range(row - rings, row + rings + 1)
+            for j in range(col - rings, col + rings + 1)
+            if (key := i * 1_000_003 + j) in self._cells
+        ]
+        if not candidates:
+            return None
+        nodes = np.concatenate(candidates)
+        phi1, phi2 = math.radians(lat), np.radians(self.lat[nodes])
+        dlmb = np.radians(self.lng[nodes] - lng)
+        a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        best = int(np.argmin(km))
+        if km[best] > max_km:
+            return None
+        return int(nodes[best]), float(km[best])
+
+    def build_landmarks(self, count: int, seed: int = 7):
+        """
+        Pick ``count`` landmarks by farthest-point selection and store travel times
+        to and from each, for the ALT lower bound in ``route``.
+        """
+        if self.n == 0 or count <= 0:
+            return
+        landmarks: List[Tuple[array, array]] = []
+        # Start from the node farthest from a random one so landmarks sit on the periphery
+        start = _dijkstra(self.forward, random.Random(seed).randrange(self.n), self.n)
+        node = max(range(self.n), key=lambda v: start[v] if start[v] < INF else -1)
+        closest = [INF] * self.n
+        for _ in range(count):
+            from_l = _dijkstra(self.forward, node, self.n)
+            to_l = _dijkstra(self.reverse, node, self.n)
+            landmarks.append((from_l, to_l))
+            closest = [min(c, d) for c, d in zip(closest, from_l)]
+            node = max(range(self.n), key=lambda v: closest[v] if closest[v] < INF else -1)
+        self._landmarks = landmarks
+
+    def _bound_fn(self, source: int, target: int):
+        """Lower bound on travel seconds to ``target``, from geometry and the landmarks best for this query."""
+        lat, lng, speed = self._lat, self._lng, self.max_km_per_second
+        t_lat, t_lng = lat[target], lng[target]
+        terms = []
+        for from_l, to_l in self._landmarks:
+            to_t, from_t = to_l[target], from_l[target]
+            if to_t < INF and from_t < INF:
+                # Triangle inequality through the landmark, in both directions
+                terms.append((max(to_l[source] - to_t, from_t - from_l[source]), to_l, to_t, from_l, from_t))
+        terms.sort(key=lambda term: term[0], reverse=True)
+        active = [term[1:] for term in terms[:ACTIVE_LANDMARKS]]
+
+        def bound(v: int) -> float:
+            best = haversine_km(lat[v], lng[v], t_lat, t_lng) / speed if speed > 0 else 0.0
+            for to_l, to_t, from_l, from_t in active:
+                a = to_l[v] - to_t
+                if a > best:
+                    best = a
+                a = from_t - from_l[v]
+                if a > best:
+                    best = a
+            return best
+
+        return bound
+
+    def route(self, source: int, target: int) -> Optional[float]:
+        """Travel seconds from ``source`` to ``target`` by A* with landmarks, or None if unreachable."""
+        indptr, indices, weights = self.forward
+        bound = self._bound_fn(source, target)
+        best = {source: 0.0}
+        heap = [(bound(source), 0.0, source)]
+        closed = set()
+        while heap:
+            _, d, v = heapq.heappop(heap)
+            if v == target:
+                return d
+            if v in closed:
+                continue
+            closed.add(v)
+            for k in range(indptr[v], indptr[v + 1]):
+                u = indices[k]
+                nd = d + weights[k]
+                if nd < best.get(u, INF):
+                    best[u] = nd
+                    heapq.heappush(heap, (nd + bound(u), nd, u))
+        return None
+
+
+class _ReverseSearch:
+    """
+    Dijkstra outward from one destination over reversed edges, resumable.
+
+    ``settled`` holds exact travel seconds *to* the destination; each call only
+    explores as far as needed to settle the requested origins, and a later call
+    continues from where the previous one stopped.
+    """
+
+    def __init__(self, graph: RoadGraph, destination: int):
+        self.graph = graph
+        self.settled: Dict[int, float] = {}
+        self.best: Dict[int, float] = {destination: 0.0}
+        self.heap = [(0.0, destination)]
+        self.lock = threading.Lock()
+
+    def run(self, origins: Sequence[int], limit: float) -> Tuple[List[Optional[float]], bool]:
+        """Seconds from each origin (None beyond ``limit``) and whether the search had to extend."""
+        indptr, indices, weights = self.graph.reverse
+        settled, best, heap = self.settled, self.best, self.heap
+        pending = {v for v in origins if v not in settled}
+        extended = bool(pending)
+        while heap and pending:
+            d, v = heap[0]
+            if d > limit:
+                break
+            heapq.heappop(heap)
+            if v in settled:
+                continue
+            settled[v] = d
+            pending.discard(v)
+            for k in range(indptr[v], indptr[v + 1]):
+                u = indices[k]
+                nd = d + weights[k]
+                if nd < best.get(u, INF):
+                    best[u] = nd
+                    heapq.heappush(heap, (nd, u))
+        return [settled.get(v) for v in origins], extended
+
+
+class RoadRouter:
+    """
+    Travel-time queries against the loaded road graph, falling back to None
+    (callers use straight-line estimates) when no graph is loaded or a point is
+    off the network.
+
+    ``minutes_to`` answers many origins to one destination, which is what
+    ranking responders for an incident needs. The search tree per destination
+    node is kept (LRU, ``cache_size`` destinations), so repeated lookups for the
+    same incident, including the prefetch and the agent's own call, cost one
+    search between them.
+    """
+
+    def __init__(
+        self,
+        max_minutes: float = 60.0,
+        cache_size: int = 64,
+        max_snap_km: float = 1.0,
+        access_speed_kmh: float = 20.0,
+    ):
+        self.max_minutes = max_minutes
+        self.cache_size = cache_size
+        self.max_snap_km = max_snap_km
+        self.access_speed_kmh = access_speed_kmh
+        self.graph: Optional[RoadGraph] = None
+        self._searches: "OrderedDict[int, _ReverseSearch]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.graph is not None
+
+    async def load(self, nodes_path: str, edges_path: str) -> bool:
+        """Load the graph in a worker thread; returns False if the files are missing."""
+        if not (Path(nodes_path).exists() and Path(edges_path).exists()):
+            return False
+        graph = await asyncio.to_thread(RoadGraph.from_csv, nodes_path, edges_path)
+        with self._lock:
+            self.graph = graph
+            self._searches.clear()
+        return True
+
+    async def build_landmarks(self, count: int):
+        """Precompute ALT landmarks; point-to-point queries use the geometric bound alone until then."""
+        if self.graph is not None:
+            await asyncio.to_thread(self.graph.build_landmarks, count)
+
+    def _access_seconds(self, km: float) -> float:
+        return km / self.access_speed_kmh * 3600
+
+    def _search(self, graph: RoadGraph, destination: int) -> Tuple[_ReverseSearch, bool]:
+        with self._lock:
+            search = self._searches.get(destination)
+            if search is not None and search.graph is graph:
+                self._searches.move_to_end(destination)
+                return search, False
+            search = self._searches[destination] = _ReverseSearch(graph, destination)
+            while len(self._searches) > self.cache_size:
+                self._searches.popitem(last=False)
+            return search, True
+
+    def _minutes_to(self, lat: float, lng: float, origins: Sequence[Optional[Tuple[float, float]]]):
+        graph = self.graph
+        if graph is None:
+            return [None] * len(origins)
+        destination = graph.snap(lat, lng, self.max_snap_km)
+        if destination is None:
+            return [None] * len(origins)
+        snapped = [graph.snap(p[0], p[1], self.max_snap_km) if p else None for p in origins]
+        nodes = [s[0] for s in snapped if s is not None]
+        search, created = self._search(graph, destination[0])
+        limit = self.max_minutes * 60
+        with search.lock:
+            seconds, extended = search.run(nodes, limit)
+        ROUTING_SEARCHES.inc(result="miss" if created else "extend" if extended else "hit")
+        by_node = dict(zip(nodes, seconds))
+        minutes = []
+        for s in snapped:
+            travel = by_node.get(s[0]) if s is not None else None
+            if travel is None:
+                minutes.append(None)
+            else:
+                access = self._access_seconds(s[1]) + self._access_seconds(destination[1])
+                minutes.append((travel + access) / 60)
+        return minutes
+
+    async def minutes_to(
+        self, lat: float, lng: float, origins: Sequence[Optional[Tuple[float, float]]]
+    ) -> List[Optional[float]]:
+        """Road travel minutes from each (lat, lng) origin to the destination; None where unknown."""
+        if self.graph is None or not origins:
+            return [None] * len(origins)
+        return await asyncio.to_thread(self._minutes_to, lat, lng, origins)
+
+    def _travel_minutes(self, from_point: Tuple[float, float], to_point: Tuple[float, float]) -> Optional[float]:
+        graph = self.graph
+        if graph is None:
+            return None
+        source = graph.snap(from_point[0], from_point[1], self.max_snap_km)
+        target = graph.snap(to_point[0], to_point[1], self.max_snap_km)
+        if source is None or target is None:
+            return None
+        travel = graph.route(source[0], target[0])
+        if travel is None:
+            return None
+        return (travel + self._access_seconds(source[1]) + self._access_seconds(target[1])) / 60
+
+    async def travel_minutes(self, from_point: Tuple[float, float], to_point: Tuple[float, float]) -> Optional[float]:
+        """Road travel minutes between two points, or None if either is off the network."""
+        if self.graph is None:
+            return None
+        return await asyncio.to_thread(self._travel_minutes, from_point, to_point)
+
+
+road_router = RoadRouter(
+    max_minutes=settings.ROUTING_MAX_MINUTES,
+    cache_size=settings.ROUTING_CACHE_DESTINATIONS,
+    max_snap_km=settings.ROUTING_MAX_SNAP_KM,
+    access_speed_kmh=settings.ROUTING_ACCESS_SPEED_KMH,
+)
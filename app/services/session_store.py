@@ -0,0 +1,360 @@
+# Agent sessions shared by every worker and node, persisted in MongoDB with write-behind
+
+import asyncio
+import copy
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import registry
+from app.db.session import get_db
+
+logger = get_logger("session_store")
+
+PENDING_EVENTS = registry.gauge(
+    "session_store_pending_events", "Session events waiting for the next write-behind flush."
+)
+
+SESSIONS = "agent_sessions"
+EVENTS = "agent_session_events"
+
+
+def _persistable(event: Event) -> bool:
+    # Streamed audio chunks stay in the warm copy only; replaying them to a new
+    # connection is useless and they dominate the event volume
+    if event.actions and event.actions.state_delta:
+        return True
+    parts = event.content.parts if event.content else None
+    return not parts or not all(
+        part.inline_data is not None and (part.inline_data.mime_type or "").startswith("audio/")
+        for part in parts
+    )
+
+
+def _durable_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in state.items() if not key.startswith(State.TEMP_PREFIX)}
+
+
+def _select_events(session: Session, config: Optional[GetSessionConfig]) -> Session:
+    if config is None or (config.num_recent_events is None and config.after_timestamp is None):
+        return session
+    events = session.events
+    if config.after_timestamp is not None:
+        events = [event for event in events if event.timestamp >= config.after_timestamp]
+    if config.num_recent_events is not None:
+        events = events[-config.num_recent_events:] if config.num_recent_events else []
+    return session.model_copy(update={"events": list(events)})
+
+
+class MongoSessionService(BaseSessionService):
+    """
+    ADK session service whose sessions survive a move to another worker or node.
+
+    Sessions live in ``agent_sessions`` and their events in ``agent_session_events``.
+    Appending an event updates the in-process copy straight away and queues the
+    event; a background loop writes queued events with ``insert_many`` and the
+    sessions' state with one ``bulk_write`` every ``flush_interval`` seconds, or
+    sooner when ``request_flush`` is called (on disconnect), so a call turn never
+    waits on MongoDB.
+
+    Recently used sessions stay in an LRU of ``cache_size`` entries. A reconnect
+    to the same worker costs one point read to confirm no other worker has
+    written the session since; only a session last written elsewhere is loaded
+    with its events. Live-API resumption handles are stored on the session
+    document so any worker can resume the model's side of the call.
+
+    Scoped ``app:`` and ``user:`` state is stored with each session rather than
+    shared between sessions; ``temp:`` state is never stored.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 0.25,
+        batch_size: int = 500,
+        cache_size: int = 1000,
+        ttl: float = 86400.0,
+        max_pending: int = 100000,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._cache: "OrderedDict[str, Session]" = OrderedDict()
+        # session_id -> (handle, saved_at)
+        self._handles: Dict[str, Tuple[str, float]] = {}
+        self._events: List[dict] = []
+        self._dirty: Set[str] = set()
+        self._handles_dirty: Set[str] = set()
+        # Sessions with writes queued or in flight; the local copy is authoritative for them
+        self._unflushed: Set[str] = set()
+        self._wake = asyncio.Event()
+        self.stats = {
+            "warm_hits": 0,
+            "loads": 0,
+            "flushes": 0,
+            "flushed_events": 0,
+            "dropped_events": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+
+    def _remember(self, session: Session):
+        self._cache[session.id] = session
+        self._cache.move_to_end(session.id)
+        while len(self._cache) > self.cache_size:
+            # Sessions still being written stay until their flush lands
+            oldest = next((key for key in self._cache if key not in self._unflushed), None)
+            if oldest is None:
+                return
+            del self._cache[oldest]
+            self._handles.pop(oldest, None)
+
+    def forget(self, session_id: str):
+        """Drop the warm copy; the stored session stays available to every worker."""
+        if session_id not in self._unflushed:
+            self._cache.pop(session_id, None)
+            self._handles.pop(session_id, None)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = Session(
+            id=session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            state=copy.deepcopy(state) if state else {},
+            last_update_time=time.time(),
+        )
+        # Written straight away so later conditional updates always find the document
+        db = await get_db()
+        await db[SESSIONS].insert_one({
+            "_id": session.id,
+            "app_name": app_name,
+            "user_id": user_id,
+            "state": _durable_state(session.state),
+            "last_update_time": session.last_update_time,
+            "expires_at": self._expires_at(),
+        })
+        self._remember(session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        cached = self._cache.get(session_id)
+        if cached is not None and (cached.app_name, cached.user_id) == (app_name, user_id):
+            if session_id in self._unflushed or await self._still_current(cached):
+                self.stats["warm_hits"] += 1
+                self._cache.move_to_end(session_id)
+                return _select_events(cached, config)
+        session = await self._load(app_name, user_id, session_id)
+        return _select_events(session, config) if session is not None else None
+
+    async def _still_current(self, cached: Session) -> bool:
+        db = await get_db()
+        doc = await db[SESSIONS].find_one(
+            {"_id": cached.id}, {"last_update_time": 1, "resumption_handle": 1, "resumption_saved_at": 1}
+        )
+        if doc is None or doc["last_update_time"] > cached.last_update_time:
+            return False
+        self._load_handle(cached.id, doc)
+        return True
+
+    def _load_handle(self, session_id: str, doc: dict):
+        if doc.get("resumption_handle"):
+            saved = self._handles.get(session_id)
+            if saved is None or saved[1] < doc["resumption_saved_at"]:
+                self._handles[session_id] = (doc["resumption_handle"], doc["resumption_saved_at"])
+
+    async def _load(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        self.stats["loads"] += 1
+        self._cache.pop(session_id, None)
+        db = await get_db()
+        doc = await db[SESSIONS].find_one({"_id": session_id, "app_name": app_name, "user_id": user_id})
+        if doc is None:
+            return None
+        cursor = db[EVENTS].find({"session_id": session_id}, {"event": 1}).sort([("timestamp", 1), ("_id", 1)])
+        events = [Event.model_validate_json(record["event"]) async for record in cursor]
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=doc.get("state") or {},
+            events=events,
+            last_update_time=doc["last_update_time"],
+        )
+        self._load_handle(session_id, doc)
+        self._remember(session)
+        return session
+
+    async def latest_session(self, *, app_name: str, user_id: str) -> Optional[Session]:
+        """The user's most recently updated session on any worker, or None."""
+        db = await get_db()
+        doc = await db[SESSIONS].find_one(
+            {"app_name": app_name, "user_id": user_id}, {"_id": 1}, sort=[("last_update_time", -1)]
+        )
+        if doc is None:
+            return None
+        return await self.get_session(app_name=app_name, user_id=user_id, session_id=doc["_id"])
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        db = await get_db()
+        cursor = db[SESSIONS].find({"app_name": app_name, "user_id": user_id}, {"last_update_time": 1})
+        return ListSessionsResponse(sessions=[
+            Session(id=doc["_id"], app_name=app_name, user_id=user_id, last_update_time=doc["last_update_time"])
+            async for doc in cursor
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._cache.pop(session_id, None)
+        self._handles.pop(session_id, None)
+        self._events = [doc for doc in self._events if doc["session_id"] != session_id]
+        self._dirty.discard(session_id)
+        self._handles_dirty.discard(session_id)
+        self._unflushed.discard(session_id)
+        db = await get_db()
+        await db[SESSIONS].delete_one({"_id": session_id, "app_name": app_name, "user_id": user_id})
+        await db[EVENTS].delete_many({"session_id": session_id})
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        self._remember(session)
+        self._dirty.add(session.id)
+        self._unflushed.add(session.id)
+        if _persistable(event):
+            if len(self._events) >= self.max_pending:
+                self.stats["dropped_events"] += 1
+            else:
+                self._events.append({
+                    "session_id": session.id,
+                    "timestamp": event.timestamp,
+                    "event": event.model_dump_json(exclude_none=True),
+                    "expires_at": self._expires_at(),
+                })
+        if len(self._events) >= self.batch_size:
+            self.request_flush()
+        return event
+
+    def resumption_handle(self, session_id: str) -> Optional[Tuple[str, float]]:
+        """The last stored (handle, saved_at) for the session, if any."""
+        return self._handles.get(session_id)
+
+    def save_resumption_handle(self, session_id: str, handle: str):
+        self._handles[session_id] = (handle, time.time())
+        self._handles_dirty.add(session_id)
+        self._unflushed.add(session_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._events)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "pending_events": len(self._events), "cached_sessions": len(self._cache)}
+
+    def request_flush(self):
+        """Wake the flush loop now instead of at the next interval."""
+        self._wake.set()
+
+    async def flush(self) -> int:
+        """Write queued events, then the state of the sessions they touched. Returns events written."""
+        if not (self._events or self._dirty or self._handles_dirty):
+            return 0
+        started = time.perf_counter()
+        events, self._events = self._events, []
+        dirty, self._dirty = self._dirty, set()
+        handles_dirty, self._handles_dirty = self._handles_dirty, set()
+        expires_at = self._expires_at()
+        operations = []
+        for session_id in dirty:
+            session = self._cache.get(session_id)
+            if session is not None:
+                # A later write from another worker wins
+                operations.append(UpdateOne(
+                    {"_id": session_id, "last_update_time": {"$lte": session.last_update_time}},
+                    {"$set": {
+                        "state": _durable_state(session.state),
+                        "last_update_time": session.last_update_time,
+                        "expires_at": expires_at,
+                    }},
+                ))
+        for session_id in handles_dirty:
+            if session_id in self._handles:
+                handle, saved_at = self._handles[session_id]
+                operations.append(UpdateOne(
+                    {"_id": session_id, "resumption_saved_at": {"$not": {"$gt": saved_at}}},
+                    {"$set": {"resumption_handle": handle, "resumption_saved_at": saved_at}},
+                ))
+
+        db = await get_db()
+        try:
+            # Events first, so a reader that sees the new last_update_time also sees them
+            for i in range(0, len(events), self.batch_size):
+                await db[EVENTS].insert_many(events[i:i + self.batch_size], ordered=False)
+            if operations:
+                await db[SESSIONS].bulk_write(operations, ordered=False)
+        except Exception:
+            self.stats["flush_errors"] += 1
+            # Retried on the next flush; a partially inserted batch may repeat events
+            self._events = (events + self._events)[-self.max_pending:]
+            self._dirty |= dirty
+            self._handles_dirty |= handles_dirty
+            raise
+        self._unflushed = self._dirty | self._handles_dirty | {doc["session_id"] for doc in self._events}
+        self.stats["flushes"] += 1
+        self.stats["flushed_events"] += len(events)
+        self.stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        return len(events)
+
+    async def run(self):
+        """Flush loop; cancel it on shutdown and call ``flush`` once more."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Session flush failed: {e}")
+
+
+def create_session_service() -> BaseSessionService:
+    """The session service selected by ``SESSION_BACKEND``."""
+    if settings.SESSION_BACKEND == "mongo":
+        service = MongoSessionService(
+            flush_interval=settings.SESSION_FLUSH_INTERVAL_SECONDS,
+            batch_size=settings.SESSION_FLUSH_BATCH,
+            cache_size=settings.SESSION_MAX,
+            ttl=settings.SESSION_STORE_TTL_SECONDS,
+        )
+        PENDING_EVENTS.collect(lambda: {(): service.pending})
+        return service
+    return InMemorySessionService()
@@ -0,0 +1,213 @@
+# Session pooling for live agent connections
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, Session
+
+from app.core.logs import get_logger
+
+logger = get_logger("sessions")
+
+
+@dataclass
+class _Entry:
+    session_id: str
+    active: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # (handle, saved_at) when the session service does not store handles itself
+    handle: Optional[Tuple[str, float]] = None
+
+
+class LiveRunner(Runner):
+    """
+    Runner with in-memory artifacts and memory over any session service.
+
+    ADK keeps the Live API's latest resumption handle on the call's invocation
+    context without surfacing it as an event; this runner keeps a reference to
+    each live call's context so the handle can be read when the call ends.
+
+    That hooks the private ``Runner._new_invocation_context_for_live``, so
+    google-adk is pinned in requirements.txt and pyproject.toml; check this
+    override when upgrading it.
+    """
+
+    def __init__(self, *, app_name: str, agent, session_service: BaseSessionService):
+        super().__init__(
+            app_name=app_name,
+            agent=agent,
+            session_service=session_service,
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService(),
+        )
+        self._live: Dict[LiveRequestQueue, InvocationContext] = {}
+
+    def _new_invocation_context_for_live(self, session, *, live_request_queue=None, run_config=None):
+        context = super()._new_invocation_context_for_live(
+            session, live_request_queue=live_request_queue, run_config=run_config
+        )
+        if live_request_queue is not None:
+            self._live[live_request_queue] = context
+        return context
+
+    def end_live(self, live_request_queue: LiveRequestQueue) -> Optional[str]:
+        """Forget a finished call; returns its last resumption handle, if the model sent one."""
+        context = self._live.pop(live_request_queue, None)
+        return context.live_session_resumption_handle if context is not None else None
+
+
+class SessionManager:
+    """
+    Tracks one agent session per user on top of a shared session service.
+
+    Reconnecting users get their warm session back instead of a new one. Sessions
+    with no attached connection are evicted after ``idle_ttl`` seconds, and the
+    least recently used idle sessions are dropped once ``max_sessions`` is reached.
+    Sessions with live connections are never evicted.
+
+    With a ``shared`` session service (SESSION_BACKEND=mongo) a user unknown to
+    this worker picks up their latest stored session, and eviction only drops
+    the worker's warm copy. Each session also remembers the Live API resumption
+    handle of its last call, offered to the next connection for ``handle_ttl``
+    seconds.
+    """
+
+    def __init__(
+        self,
+        session_service: BaseSessionService,
+        app_name: str,
+        max_sessions: int = 1000,
+        idle_ttl: float = 900.0,
+        shared: bool = False,
+        handle_ttl: float = 7200.0,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.shared = shared
+        self.handle_ttl = handle_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    @property
+    def active_connections(self) -> int:
+        return sum(entry.active for entry in self._entries.values())
+
+    async def acquire(self, user_id: str) -> Session:
+        """
+        Return the user's session, reusing a warm one when it still exists.
+
+        Args:
+            user_id (str): Caller identifier from the WebSocket path.
+
+        Returns:
+            Session: The session to run the live agent on. Call ``release`` when
+            the connection ends.
+        """
+        async with self._lock:
+            entry = self._entries.get(user_id)
+            if entry:
+                session = await self.session_service.get_session(
+                    app_name=self.app_name, user_id=user_id, session_id=entry.session_id
+                )
+                if session:
+                    entry.active += 1
+                    entry.last_used = time.monotonic()
+                    self._entries.move_to_end(user_id)
+                    return session
+                del self._entries[user_id]
+
+            await self._make_room()
+            session = None
+            if self.shared:
+                # Reconnects may land on any worker; continue where the last one stopped
+                session = await self.session_service.latest_session(app_name=self.app_name, user_id=user_id)
+            if session is None:
+                session = await self.session_service.create_session(
+                    app_name=self.app_name, user_id=user_id
+                )
+            self._entries[user_id] = _Entry(session_id=session.id, active=1)
+            return session
+
+    def release(self, user_id: str):
+        """Detach a connection; the session stays warm until it idles out."""
+        entry = self._entries.get(user_id)
+        if entry:
+            entry.active = max(entry.active - 1, 0)
+            entry.last_used = time.monotonic()
+        if self.shared:
+            # Persist the call now so a reconnect elsewhere sees all of it
+            self.session_service.request_flush()
+
+    def resumption_handle(self, user_id: str) -> Optional[str]:
+        """The handle to resume the user's last live call with, if it is recent enough."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        saved = self.session_service.resumption_handle(entry.session_id) if self.shared else entry.handle
+        if saved and time.time() - saved[1] <= self.handle_ttl:
+            return saved[0]
+        return None
+
+    def save_resumption_handle(self, user_id: str, handle: Optional[str]):
+        entry = self._entries.get(user_id)
+        if entry is None or not handle:
+            return
+        if self.shared:
+            self.session_service.save_resumption_handle(entry.session_id, handle)
+        else:
+            entry.handle = (handle, time.time())
+
+    async def evict_idle(self) -> int:
+        """Delete sessions idle longer than ``idle_ttl``. Returns how many were evicted."""
+        cutoff = time.monotonic() - self.idle_ttl
+        async with self._lock:
+            expired = [
+                user_id for user_id, entry in self._entries.items()
+                if entry.active == 0 and entry.last_used < cutoff
+            ]
+            for user_id in expired:
+                await self._evict(user_id)
+        return len(expired)
+
+    async def run_eviction(self, interval: float = 60.0):
+        """Background loop for idle eviction; cancel it on shutdown."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Session eviction failed: {e}")
+
+    async def _make_room(self):
+        # Oldest entries come first; skip the ones still in a call
+        for user_id in list(self._entries):
+            if len(self._entries) < self.max_sessions:
+                return
+            if self._entries[user_id].active == 0:
+                await self._evict(user_id)
+
+    async def _evict(self, user_id: str):
+        entry = self._entries.pop(user_id)
+        if self.shared:
+            # Another worker may be serving the user now; the store expires it
+            self.session_service.forget(entry.session_id)
+            return
+        await self.session_service.delete_session(
+            app_name=self.app_name, user_id=user_id, session_id=entry.session_id
+        )
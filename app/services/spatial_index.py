@@ -0,0 +1,321 @@
+# In-process spatial index for nearest responder/hospital queries
+
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.logs import get_logger
+from app.utils.geo import haversine_km
+
+logger = get_logger("spatial_index")
+
+KM_PER_DEGREE = 111.32
+
+
+def point_of(doc: dict) -> Optional[Tuple[float, float]]:
+    """Return (lat, lng) from a GeoJSON Point or a {"lat", "lng"} location."""
+    location = doc.get("location")
+    if not location:
+        return None
+    if "coordinates" in location:
+        lng, lat = location["coordinates"][:2]
+        return float(lat), float(lng)
+    if "lat" in location and "lng" in location:
+        return float(location["lat"]), float(location["lng"])
+    return None
+
+
+def _match_value(value, condition) -> bool:
+    if isinstance(condition, dict):
+        for op, operand in condition.items():
+            if op == "$in":
+                values = value if isinstance(value, list) else [value]
+                if not any(v in operand for v in values):
+                    return False
+            elif op == "$nin":
+                values = value if isinstance(value, list) else [value]
+                if any(v in operand for v in values):
+                    return False
+            elif op == "$ne":
+                if value == operand:
+                    return False
+            elif op == "$gte":
+                if value is None or value < operand:
+                    return False
+            elif op == "$lte":
+                if value is None or value > operand:
+                    return False
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return True
+    if isinstance(value, list):
+        return condition in value
+    return value == condition
+
+
+def matches(doc: dict, conditions: Optional[dict]) -> bool:
+    """Evaluate the subset of MongoDB match syntax used by the geo queries."""
+    if not conditions:
+        return True
+    return all(_match_value(doc.get(field), condition) for field, condition in conditions.items())
+
+
+def compile_conditions(conditions: Optional[dict]) -> Callable[[dict], bool]:
+    """Build a predicate for ``conditions`` once per query; plain equality gets a fast path."""
+    if not conditions:
+        return lambda doc: True
+    if any(isinstance(c, dict) for c in conditions.values()):
+        return lambda doc: matches(doc, conditions)
+    pairs = tuple(conditions.items())
+
+    def predicate(doc: dict) -> bool:
+        for field, expected in pairs:
+            value = doc.get(field)
+            if value != expected and not (isinstance(value, list) and expected in value):
+                return False
+        return True
+
+    return predicate
+
+
+class SpatialIndex:
+    """
+    Grid index over documents with a point ``location``.
+
+    Points are bucketed into square cells of ``cell_deg`` degrees. Nearest-neighbour
+    search walks rings of cells outward from the query cell and stops once no
+    unvisited cell can hold a closer match. Filters use the same match dicts as the
+    MongoDB pipelines, so both paths return the same documents.
+
+    Each worker keeps its own copy. Writes made through this worker update it
+    immediately; ``replace_all`` resynchronises it with the collection.
+    """
+
+    def __init__(self, cell_deg: float = 0.01, max_rings: int = 64):
+        self.cell_deg = cell_deg
+        self.max_rings = max_rings
+        self.ready = False
+        self._docs: Dict[str, dict] = {}
+        self._points: Dict[str, Tuple[float, float, Tuple[int, int]]] = {}
+        self._cells: Dict[Tuple[int, int], set] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def upsert(self, doc: dict):
+        """Insert or replace a document; documents without a location are dropped."""
+        doc_id = str(doc["_id"])
+        self.remove(doc_id)
+        point = point_of(doc)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        self._docs[doc_id] = doc
+        self._points[doc_id] = (point[0], point[1], cell)
+        self._cells.setdefault(cell, set()).add(doc_id)
+
+    def point(self, doc_id: str) -> Optional[Tuple[float, float]]:
+        """The indexed (lat, lng) of a document, or None if it is not indexed."""
+        entry = self._points.get(str(doc_id))
+        return (entry[0], entry[1]) if entry else None
+
+    def update(self, doc_id: str, fields: dict):
+        """Merge changed fields into an indexed document, moving it if the location changed."""
+        doc = self._docs.get(str(doc_id))
+        if doc is None:
+            return
+        updated = {**doc, **fields}
+        if "location" in fields:
+            self.upsert(updated)
+        else:
+            self._docs[str(doc_id)] = updated
+
+    def remove(self, doc_id: str):
+        doc_id = str(doc_id)
+        entry = self._points.pop(doc_id, None)
+        self._docs.pop(doc_id, None)
+        if entry:
+            members = self._cells.get(entry[2])
+            members.discard(doc_id)
+            if not members:
+                del self._cells[entry[2]]
+
+    def replace_all(self, docs: Iterable[dict]):
+        self._docs.clear()
+        self._points.clear()
+        self._cells.clear()
+        for doc in docs:
+            self.upsert(doc)
+        self.ready = True
+
+    def select(self, conditions: Optional[dict] = None) -> List[Tuple[dict, float, float]]:
+        """Every matching document with its (lat, lng), in no particular order."""
+        predicate = compile_conditions(conditions)
+        return [
+            (doc, self._points[doc_id][0], self._points[doc_id][1])
+            for doc_id, doc in self._docs.items()
+            if predicate(doc)
+        ]
+
+    def _ring(self, center: Tuple[int, int], r: int):
+        ci, cj = center
+        if r == 0:
+            yield center
+            return
+        for dj in range(-r, r + 1):
+            yield ci - r, cj + dj
+            yield ci + r, cj + dj
+        for di in range(-r + 1, r):
+            yield ci + di, cj - r
+            yield ci + di, cj + r
+
+    def _reach_km(self, lat: float, lng: float, center: Tuple[int, int], r: int) -> float:
+        """Distance from the query point to the edge of the rings searched so far."""
+        ci, cj = center
+        d_lat = min(lat - (ci - r) * self.cell_deg, (ci + r + 1) * self.cell_deg - lat)
+        d_lng = min(lng - (cj - r) * self.cell_deg, (cj + r + 1) * self.cell_deg - lng)
+        # Cells narrow towards the poles; use the narrowest width the rings reach
+        edge_lat = min(abs(lat) + (r + 1) * self.cell_deg, 89.0)
+        return KM_PER_DEGREE * min(d_lat, d_lng * math.cos(math.radians(edge_lat)))
+
+    def _scan(self, lat, lng, radius_km, predicate, min_distance_km, found, doc_ids):
+        for doc_id in doc_ids:
+            if doc_id in found or not predicate(self._docs[doc_id]):
+                continue
+            p_lat, p_lng, _ = self._points[doc_id]
+            km = haversine_km(lat, lng, p_lat, p_lng)
+            if km < min_distance_km or (radius_km is not None and km > radius_km):
+                continue
+            found[doc_id] = km
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        radius_km: Optional[float] = None,
+        conditions: Optional[dict] = None,
+        min_distance_km: float = 0.0,
+    ) -> List[dict]:
+        """
+        Return up to k matching documents ordered by distance.
+
+        Args:
+            lat (float): Query latitude.
+            lng (float): Query longitude.
+            k (int): Maximum number of results.
+            radius_km (Optional[float]): Upper distance bound.
+            conditions (Optional[dict]): MongoDB-style filter on the documents.
+            min_distance_km (float): Lower distance bound.
+
+        Returns:
+            List[dict]: Copies of the documents with ``distance_meters`` set.
+        """
+        if k <= 0:
+            return []
+        center = self._cell(lat, lng)
+        predicate = compile_conditions(conditions)
+        found: Dict[str, float] = {}
+        cells_left = len(self._cells)
+        r = 0
+        while cells_left > 0:
+            if r > self.max_rings:
+                # Sparse outliers far away: a linear scan beats walking empty rings
+                self._scan(lat, lng, radius_km, predicate, min_distance_km, found, self._points)
+                break
+            for cell in self._ring(center, r):
+                members = self._cells.get(cell)
+                if not members:
+                    continue
+                cells_left -= 1
+                self._scan(lat, lng, radius_km, predicate, min_distance_km, found, members)
+            # Anything in later rings is at least this far away
+            reach_km = self._reach_km(lat, lng, center, r)
+            if radius_km is not None and reach_km > radius_km:
+                break
+            if len(found) >= k and sorted(found.values())[k - 1] <= reach_km:
+                break
+            r += 1
+
+        ranked = sorted(found.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, km in ranked[:k]:
+            doc = dict(self._docs[doc_id])
+            doc["distance_meters"] = km * 1000
+            results.append(doc)
+        return results
+
+    def within(
+        self, lat: float, lng: float, radius_km: float, conditions: Optional[dict] = None
+    ) -> List[dict]:
+        """Return every matching document within radius_km, nearest first."""
+        return self.nearest(lat, lng, len(self._docs), radius_km, conditions)
+
+
+responder_index = SpatialIndex()
+hospital_index = SpatialIndex()
+
+
+# Fields the nearby queries filter on or return; see app/schemas
+RESPONDER_INDEX_PROJECTION = {
+    "name": 1, "phone": 1, "location": 1, "status": 1, "vehicle_type": 1, "skills": 1,
+    "incident_id": 1, "updated_at": 1,
+}
+HOSPITAL_INDEX_PROJECTION = {
+    "name": 1, "location": 1, "address": 1, "beds_available": 1, "specialties": 1,
+    "contact_phone": 1, "status": 1, "updated_at": 1,
+}
+
+
+async def load_spatial_indexes(db):
+    """Rebuild both indexes from MongoDB."""
+    responders, hospitals = await asyncio.gather(
+        db.responders.find({}, RESPONDER_INDEX_PROJECTION).to_list(length=None),
+        db.hospitals.find({}, HOSPITAL_INDEX_PROJECTION).to_list(length=None),
+    )
+    responder_index.replace_all(responders)
+    hospital_index.replace_all(hospitals)
+
+
+async def refresh_spatial_indexes(db, since: datetime) -> int:
+    """Apply documents whose ``updated_at`` is at or after ``since``. Returns how many."""
+    changed = {"updated_at": {"$gte": since}}
+    responders, hospitals = await asyncio.gather(
+        db.responders.find(changed, RESPONDER_INDEX_PROJECTION).to_list(length=None),
+        db.hospitals.find(changed, HOSPITAL_INDEX_PROJECTION).to_list(length=None),
+    )
+    for doc in responders:
+        responder_index.upsert(doc)
+    for doc in hospitals:
+        hospital_index.upsert(doc)
+    return len(responders) + len(hospitals)
+
+
+async def run_spatial_refresh(db, interval: float, full_interval: float = 600.0):
+    """
+    Periodically resync with writes made by other workers; cancel it on shutdown.
+
+    Each pass only reads documents whose ``updated_at`` moved since the previous
+    pass, overlapping it by ``interval`` to absorb clock skew between workers. A
+    full reload every ``full_interval`` seconds picks up deletes and writes that
+    do not set ``updated_at``.
+    """
+    last_full = time.monotonic()
+    since = datetime.now(timezone.utc)
+    while True:
+        await asyncio.sleep(interval)
+        started = datetime.now(timezone.utc)
+        try:
+            if time.monotonic() - last_full >= full_interval:
+                await load_spatial_indexes(db)
+                last_full = time.monotonic()
+            else:
+                await refresh_spatial_indexes(db, since - timedelta(seconds=interval))
+            since = started
+        except Exception as e:
+            logger.error(f"Spatial index refresh failed: {e}")
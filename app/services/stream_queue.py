@@ -0,0 +1,230 @@
+# Bounded per-session queues between the caller's WebSocket and the live model
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.live_request_queue import LiveRequest
+from google.genai import types
+from google.genai.types import Blob
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+QUEUE_DEPTH = registry.gauge(
+    "stream_queue_depth", "Frames waiting in a live session's bridge queue.", ["session_id", "direction"]
+)
+AUDIO_DROPPED = registry.counter(
+    "stream_audio_dropped_total", "Audio frames dropped by a full bridge queue or purged on interruption.",
+    ["direction", "reason"],
+)
+FRAMES_MERGED = registry.counter(
+    "stream_frames_merged_total", "Frames folded into a queued frame instead of being queued on their own.",
+    ["direction", "kind"],
+)
+
+AUDIO = "audio"
+TEXT = "text"
+CONTROL = "control"
+
+POLICIES = ("drop_oldest", "drop_newest", "merge")
+AUDIO_MIME = "audio/pcm"
+
+
+@dataclass
+class Frame:
+    kind: str
+    payload: Any
+    # time.perf_counter() when the first data in the frame was queued
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class FrameQueue:
+    """
+    FIFO of audio, text and control frames that never blocks its producer.
+
+    At most ``max_audio`` audio frames are queued. When another arrives the
+    policy decides: ``drop_oldest`` discards the stalest queued chunk (lowest
+    latency), ``drop_newest`` discards the new one, and ``merge`` appends it to
+    the newest queued chunk while that stays under ``max_merge_bytes`` (nothing
+    is lost, fewer frames are sent) and falls back to ``drop_oldest`` beyond
+    that. Text appended right behind queued text joins it, up to
+    ``max_text_chars``. Control frames are never dropped or merged.
+    """
+
+    def __init__(
+        self,
+        direction: str,
+        max_audio: int = 50,
+        policy: str = "drop_oldest",
+        max_merge_bytes: int = 96000,
+        max_text_chars: int = 2000,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown audio queue policy: {policy}")
+        self.direction = direction
+        self.max_audio = max_audio
+        self.policy = policy
+        self.max_merge_bytes = max_merge_bytes
+        self.max_text_chars = max_text_chars
+        self._frames: Deque[Frame] = deque()
+        self._audio = 0
+        self._ready = asyncio.Event()
+        self.stats = {"queued": 0, "sent": 0, "dropped": 0, "merged": 0, "purged": 0, "max_depth": 0}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def _append(self, frame: Frame):
+        self._frames.append(frame)
+        if frame.kind == AUDIO:
+            self._audio += 1
+        self.stats["queued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._frames))
+        self._ready.set()
+
+    def _newest_audio(self) -> Optional[Frame]:
+        for frame in reversed(self._frames):
+            if frame.kind == AUDIO:
+                return frame
+        return None
+
+    def _drop_oldest_audio(self):
+        for i, frame in enumerate(self._frames):
+            if frame.kind == AUDIO:
+                del self._frames[i]
+                self._audio -= 1
+                return
+
+    def put_audio(self, data: bytes):
+        if self._audio >= self.max_audio:
+            if self.policy == "merge":
+                newest = self._newest_audio()
+                if newest is not None and len(newest.payload) + len(data) <= self.max_merge_bytes:
+                    newest.payload += data
+                    self.stats["merged"] += 1
+                    FRAMES_MERGED.inc(direction=self.direction, kind=AUDIO)
+                    return
+            self.stats["dropped"] += 1
+            AUDIO_DROPPED.inc(direction=self.direction, reason="full")
+            if self.policy == "drop_newest":
+                return
+            self._drop_oldest_audio()
+        self._append(Frame(AUDIO, data))
+
+    def put_text(self, text: str):
+        tail = self._frames[-1] if self._frames else None
+        if tail is not None and tail.kind == TEXT and len(tail.payload) + len(text) <= self.max_text_chars:
+            tail.payload += text
+            self.stats["merged"] += 1
+            FRAMES_MERGED.inc(direction=self.direction, kind=TEXT)
+            return
+        self._append(Frame(TEXT, text))
+
+    def put_control(self, payload: Any):
+        self._append(Frame(CONTROL, payload))
+
+    def purge_audio(self) -> int:
+        """Discard every queued audio frame, e.g. when the caller interrupts. Returns how many."""
+        if not self._audio:
+            return 0
+        purged = self._audio
+        self._frames = deque(frame for frame in self._frames if frame.kind != AUDIO)
+        self._audio = 0
+        self.stats["purged"] += purged
+        AUDIO_DROPPED.inc(purged, direction=self.direction, reason="interrupted")
+        return purged
+
+    def take_text(self) -> str:
+        """Pop text frames from the head of the queue and return them joined."""
+        parts = []
+        while self._frames and self._frames[0].kind == TEXT:
+            parts.append(self._frames.popleft().payload)
+        return "".join(parts)
+
+    async def get(self) -> Frame:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self._frames.popleft()
+        if frame.kind == AUDIO:
+            self._audio -= 1
+        self.stats["sent"] += 1
+        return frame
+
+
+class BoundedLiveRequestQueue(LiveRequestQueue):
+    """
+    LiveRequestQueue whose caller audio goes through a ``FrameQueue``.
+
+    ADK drains the queue only as fast as it can send to the model, so a caller
+    streaming faster than the upstream link no longer grows it without limit.
+    Content, activity markers and close requests keep their order with the
+    audio around them and are never dropped.
+    """
+
+    def __init__(self, frames: FrameQueue):
+        super().__init__()
+        self.frames = frames
+
+    def send(self, req: LiveRequest):
+        if req.blob is not None and req.blob.mime_type == AUDIO_MIME and req.blob.data:
+            self.frames.put_audio(req.blob.data)
+        else:
+            self.frames.put_control(req)
+
+    def close(self):
+        self.send(LiveRequest(close=True))
+
+    def send_content(self, content: types.Content):
+        self.send(LiveRequest(content=content))
+
+    def send_realtime(self, blob: Blob):
+        self.send(LiveRequest(blob=blob))
+
+    def send_activity_start(self):
+        self.frames.put_control(LiveRequest(activity_start=types.ActivityStart()))
+
+    def send_activity_end(self):
+        self.frames.put_control(LiveRequest(activity_end=types.ActivityEnd()))
+
+    async def get(self) -> LiveRequest:
+        frame = await self.frames.get()
+        if frame.kind == AUDIO:
+            return LiveRequest(blob=Blob(data=frame.payload, mime_type=AUDIO_MIME))
+        return frame.payload
+
+
+# (session_id, direction) -> queue for connections on this worker
+active_queues: Dict[Tuple[str, str], FrameQueue] = {}
+
+
+def open_queues(session_id: str) -> Tuple[FrameQueue, FrameQueue]:
+    """Create a session's (inbound, outbound) queues from settings."""
+    inbound = FrameQueue(
+        "inbound",
+        max_audio=settings.STREAM_INBOUND_MAX_AUDIO_FRAMES,
+        policy=settings.STREAM_INBOUND_AUDIO_POLICY,
+        max_merge_bytes=settings.STREAM_MERGE_MAX_BYTES,
+    )
+    outbound = FrameQueue(
+        "outbound",
+        max_audio=settings.STREAM_OUTBOUND_MAX_AUDIO_FRAMES,
+        policy=settings.STREAM_OUTBOUND_AUDIO_POLICY,
+        max_merge_bytes=settings.STREAM_MERGE_MAX_BYTES,
+    )
+    active_queues[(session_id, "inbound")] = inbound
+    active_queues[(session_id, "outbound")] = outbound
+    return inbound, outbound
+
+
+def close_queues(session_id: str, inbound: FrameQueue, outbound: FrameQueue):
+    for key, queue in (((session_id, "inbound"), inbound), ((session_id, "outbound"), outbound)):
+        if active_queues.get(key) is queue:
+            del active_queues[key]
+
+
+QUEUE_DEPTH.collect(lambda: {key: len(queue) for key, queue in active_queues.items()})
@@ -0,0 +1,173 @@
+# Vehicle GPS telemetry ingestion: coalesce per vehicle, flush in bulk
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.db.session import get_db
+from app.schemas.telemetry import PositionReport
+from app.services.read_cache import ambulance_tag, read_cache
+from app.services.spatial_index import responder_index
+
+logger = get_logger("telemetry")
+
+# Collection each vehicle kind is stored in
+COLLECTIONS = {"ambulance": "ambulances", "responder": "responders"}
+
+
+def _timestamp(recorded_at) -> float:
+    if recorded_at is None:
+        return time.time()
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+    return recorded_at.timestamp()
+
+
+class TelemetryIngestor:
+    """
+    Buffers position reports and writes them with one unordered bulk_write per flush.
+
+    Only the latest fix per vehicle is kept within a flush window, so a vehicle
+    reporting every second costs one write per ``flush_interval``. Responder fixes
+    also update the in-memory spatial index straight away. When ``max_pending``
+    vehicles are already waiting for a flush, reports for new vehicles are
+    rejected and counted as dropped; callers should back off.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, max_pending: int = 50000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (kind, vehicle_id) -> (timestamp, lat, lng)
+        self._pending: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+        self.stats = {
+            "received": 0,
+            "coalesced": 0,
+            "stale": 0,
+            "invalid": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flushed": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def saturated(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "utilization": len(self._pending) / self.max_pending,
+        }
+
+    def ingest(self, reports: Iterable[PositionReport]) -> dict:
+        """
+        Buffer a batch of reports.
+
+        Returns:
+            dict: {"accepted": int, "dropped": int} for this batch. Dropped covers
+            backpressure rejections and invalid vehicle ids.
+        """
+        accepted = dropped = 0
+        for report in reports:
+            self.stats["received"] += 1
+            if report.kind not in COLLECTIONS or not ObjectId.is_valid(report.vehicle_id):
+                self.stats["invalid"] += 1
+                dropped += 1
+                continue
+            key = (report.kind, report.vehicle_id)
+            ts = _timestamp(report.recorded_at)
+            previous = self._pending.get(key)
+            if previous is not None:
+                if ts < previous[0]:
+                    # Out-of-order fix; the buffered one is newer
+                    self.stats["stale"] += 1
+                    accepted += 1
+                    continue
+                self.stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                dropped += 1
+                continue
+            self._pending[key] = (ts, report.lat, report.lng)
+            accepted += 1
+            if report.kind == "responder":
+                responder_index.update(
+                    report.vehicle_id,
+                    {"location": {"type": "Point", "coordinates": [report.lng, report.lat]}},
+                )
+        return {"accepted": accepted, "dropped": dropped}
+
+    async def flush(self) -> int:
+        """Write every buffered fix. Returns the number of vehicles written."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        started = time.perf_counter()
+        operations: Dict[str, list] = {}
+        # Server time, so the spatial index delta refresh sees late or skewed fixes
+        now = datetime.now(timezone.utc)
+        for (kind, vehicle_id), (ts, lat, lng) in batch.items():
+            recorded_at = datetime.fromtimestamp(ts, timezone.utc)
+            if kind == "ambulance":
+                fields = {"current_location": {"lat": lat, "lng": lng}}
+            else:
+                fields = {"location": {"type": "Point", "coordinates": [lng, lat]}}
+            fields.update(recorded_at=recorded_at, updated_at=now)
+            # A fix from an earlier flush window must not overwrite a newer stored one
+            operations.setdefault(COLLECTIONS[kind], []).append(
+                UpdateOne(
+                    {"_id": ObjectId(vehicle_id), "recorded_at": {"$not": {"$gt": recorded_at}}},
+                    {"$set": fields},
+                )
+            )
+
+        db = await get_db()
+        results = await asyncio.gather(
+            *(db[name].bulk_write(ops, ordered=False) for name, ops in operations.items()),
+            return_exceptions=True,
+        )
+        if any(isinstance(r, BaseException) for r in results):
+            self.stats["flush_errors"] += 1
+            # Put the batch back unless a newer fix arrived meanwhile
+            for key, value in batch.items():
+                current = self._pending.get(key)
+                if current is None or current[0] < value[0]:
+                    self._pending[key] = value
+        else:
+            self.stats["flushed"] += len(batch)
+            read_cache.invalidate(
+                *(ambulance_tag(vehicle_id) for kind, vehicle_id in batch if kind == "ambulance")
+            )
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    async def run(self):
+        """Flush loop; cancel it on shutdown and call ``flush`` once more."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats["flush_errors"] += 1
+                logger.error(f"Telemetry flush failed: {e}")
+
+
+telemetry_ingestor = TelemetryIngestor(
+    flush_interval=settings.TELEMETRY_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.TELEMETRY_MAX_PENDING,
+)
@@ -0,0 +1,224 @@
+# Voice activity gate for caller audio sent upstream to the live model
+
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+from google.genai.types import Blob
+
+from app.core.config import settings
+from app.core.logs import get_logger
+
+logger = get_logger("vad")
+
+BYTES_PER_SAMPLE = 2  # 16-bit mono PCM
+
+
+class EnergyDetector:
+    """RMS threshold on 16-bit PCM; cheap enough to run on the event loop."""
+
+    name = "energy"
+    blocking = False
+
+    def __init__(self, sample_rate: int, rms_threshold: float):
+        # 20 ms frames so one loud click does not count as a whole chunk of speech
+        self.frame_bytes = sample_rate // 50 * BYTES_PER_SAMPLE
+        self.rms_threshold = rms_threshold
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) >= self.rms_threshold
+
+
+class SileroDetector:
+    """
+    Silero VAD through pipecat's ONNX wrapper.
+
+    The model keeps recurrent state, so each session needs its own instance, and
+    inference takes long enough that it runs in a worker thread.
+    """
+
+    name = "silero"
+    blocking = True
+
+    def __init__(self, sample_rate: int, threshold: float):
+        from pipecat.audio.vad.silero import SileroVADAnalyzer
+
+        self._analyzer = SileroVADAnalyzer(sample_rate=sample_rate)
+        self._analyzer.set_sample_rate(sample_rate)
+        self.frame_bytes = self._analyzer.num_frames_required() * BYTES_PER_SAMPLE
+        self.threshold = threshold
+
+    def is_speech(self, frame: bytes) -> bool:
+        return self._analyzer.voice_confidence(frame) >= self.threshold
+
+
+_silero_missing = False
+
+
+def _make_detector(backend: str):
+    global _silero_missing
+    if backend in ("auto", "silero") and not _silero_missing:
+        try:
+            return SileroDetector(settings.VAD_SAMPLE_RATE, settings.VAD_THRESHOLD)
+        except ImportError as e:
+            if backend == "silero":
+                raise
+            _silero_missing = True
+            logger.warning(f"Silero VAD unavailable, using energy detection: {e}")
+    return EnergyDetector(settings.VAD_SAMPLE_RATE, settings.VAD_ENERGY_RMS)
+
+
+class VoiceActivityGate:
+    """
+    Forwards caller PCM to the live request queue only around speech.
+
+    Each chunk is classified in detector-sized frames (chunks carry no alignment
+    guarantee, so a remainder is carried over). Silence after speech keeps being
+    forwarded for ``hangover_ms`` so the model hears the end of the turn; after
+    that it is dropped and counted in ``stats["bytes_suppressed"]``. The last
+    ``preroll_ms`` of dropped audio is replayed when speech resumes so word onsets
+    are not clipped.
+
+    With ``activity_markers`` the gate also sends activity start/end around each
+    speech segment. The live session must then be started with automatic activity
+    detection disabled (see ``realtime_input_config``), and the model responds as
+    soon as the hangover expires instead of waiting for its own silence timeout.
+    """
+
+    def __init__(
+        self,
+        live_request_queue,
+        detector,
+        sample_rate: int = 16000,
+        hangover_ms: int = 800,
+        preroll_ms: int = 400,
+        activity_markers: bool = False,
+    ):
+        self.live_request_queue = live_request_queue
+        self.detector = detector
+        self.activity_markers = activity_markers
+        self._bytes_per_ms = sample_rate * BYTES_PER_SAMPLE / 1000
+        self._hangover_bytes = hangover_ms * self._bytes_per_ms
+        self._preroll_bytes = preroll_ms * self._bytes_per_ms
+        self._preroll: deque = deque()
+        self._preroll_size = 0
+        self._remainder = b""
+        self._speaking = False
+        self._silence_bytes = 0.0
+        self.stats = {
+            "detector": detector.name,
+            "chunks": 0,
+            "bytes_in": 0,
+            "bytes_forwarded": 0,
+            "bytes_suppressed": 0,
+            "speech_segments": 0,
+        }
+
+    def _classify(self, pcm: bytes) -> bool:
+        data = self._remainder + pcm
+        size = self.detector.frame_bytes
+        usable = len(data) - len(data) % size
+        self._remainder = data[usable:]
+        speech = False
+        # Check every frame: Silero state has to see the whole stream in order
+        for offset in range(0, usable, size):
+            if self.detector.is_speech(data[offset:offset + size]):
+                speech = True
+        return speech
+
+    def _send(self, pcm: bytes):
+        self.live_request_queue.send_realtime(Blob(data=pcm, mime_type="audio/pcm"))
+        self.stats["bytes_forwarded"] += len(pcm)
+
+    def _hold(self, pcm: bytes):
+        self._preroll.append(pcm)
+        self._preroll_size += len(pcm)
+        while self._preroll and self._preroll_size - len(self._preroll[0]) >= self._preroll_bytes:
+            self._preroll_size -= len(self._preroll.popleft())
+
+    async def push(self, pcm: bytes):
+        """Classify one chunk from the caller and forward or drop it."""
+        self.stats["chunks"] += 1
+        self.stats["bytes_in"] += len(pcm)
+        if self.detector.blocking:
+            speech = await asyncio.to_thread(self._classify, pcm)
+        else:
+            speech = self._classify(pcm)
+
+        if speech:
+            self._silence_bytes = 0.0
+            if not self._speaking:
+                self._speaking = True
+                self.stats["speech_segments"] += 1
+                if self.activity_markers:
+                    self.live_request_queue.send_activity_start()
+                # Held chunks were counted as suppressed when they arrived
+                for held in self._preroll:
+                    self.stats["bytes_suppressed"] -= len(held)
+                    self._send(held)
+                self._preroll.clear()
+                self._preroll_size = 0
+            self._send(pcm)
+            return
+
+        if self._speaking:
+            self._send(pcm)
+            self._silence_bytes += len(pcm)
+            if self._silence_bytes >= self._hangover_bytes:
+                self._speaking = False
+                if self.activity_markers:
+                    self.live_request_queue.send_activity_end()
+            return
+
+        self.stats["bytes_suppressed"] += len(pcm)
+        self._hold(pcm)
+
+    def close(self):
+        """End an open speech segment; call before closing the request queue."""
+        if self._speaking and self.activity_markers:
+            self.live_request_queue.send_activity_end()
+        self._speaking = False
+
+
+# user_id -> gate for connections on this worker
+active_gates: Dict[str, VoiceActivityGate] = {}
+_closed_totals = {"sessions": 0, "bytes_in": 0, "bytes_forwarded": 0, "bytes_suppressed": 0}
+
+
+async def open_gate(user_id: str, live_request_queue) -> Optional[VoiceActivityGate]:
+    """Create the gate for an audio session, or None when VAD is disabled."""
+    if not settings.VAD_ENABLED:
+        return None
+    # Loading the ONNX model takes a while; keep it off the event loop
+    detector = await asyncio.to_thread(_make_detector, settings.VAD_BACKEND)
+    gate = VoiceActivityGate(
+        live_request_queue,
+        detector,
+        sample_rate=settings.VAD_SAMPLE_RATE,
+        hangover_ms=settings.VAD_HANGOVER_MS,
+        preroll_ms=settings.VAD_PREROLL_MS,
+        activity_markers=settings.VAD_ACTIVITY_MARKERS,
+    )
+    active_gates[user_id] = gate
+    return gate
+
+
+def close_gate(user_id: str, gate: VoiceActivityGate):
+    gate.close()
+    if active_gates.get(user_id) is gate:
+        del active_gates[user_id]
+    _closed_totals["sessions"] += 1
+    for key in ("bytes_in", "bytes_forwarded", "bytes_suppressed"):
+        _closed_totals[key] += gate.stats[key]
+
+
+def snapshot() -> dict:
+    """Per-session counters for open connections plus totals for closed ones."""
+    return {
+        "enabled": settings.VAD_ENABLED,
+        "activity_markers": settings.VAD_ACTIVITY_MARKERS,
+        "sessions": {user_id: dict(gate.stats) for user_id, gate in active_gates.items()},
+        "closed": dict(_closed_totals),
+    }
@@ -0,0 +1,44 @@
+"""Binary WebSocket frame codec for the live audio stream.
+
+Audio travels as raw PCM behind a fixed 4 byte header instead of base64 inside
+JSON. Control and text messages stay JSON text frames.
+
+Header layout (network byte order):
+    - version (uint8): currently ``FRAME_VERSION``.
+    - kind (uint8): payload type, ``KIND_AUDIO_PCM`` for 16-bit mono PCM.
+    - sequence (uint16): per-direction counter, wraps at 65535.
+"""
+import struct
+
+FRAME_VERSION = 1
+KIND_AUDIO_PCM = 1
+
+HEADER = struct.Struct("!BBH")
+HEADER_SIZE = HEADER.size
+
+
+def encode_frame(kind: int, sequence: int, payload: bytes) -> bytes:
+    """Prefix the payload with a frame header."""
+    return HEADER.pack(FRAME_VERSION, kind, sequence & 0xFFFF) + payload
+
+
+def encode_audio_frame(payload: bytes, sequence: int) -> bytes:
+    return encode_frame(KIND_AUDIO_PCM, sequence, payload)
+
+
+def decode_frame(frame: bytes) -> tuple[int, int, bytes]:
+    """
+    Split a binary frame into its header fields and payload.
+
+    Returns:
+        tuple: (kind, sequence, payload).
+
+    Raises:
+        ValueError: If the frame is truncated or uses an unknown version.
+    """
+    if len(frame) < HEADER_SIZE:
+        raise ValueError(f"Binary frame too short: {len(frame)} bytes")
+    version, kind, sequence = HEADER.unpack_from(frame)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    return kind, sequence, frame[HEADER_SIZE:]
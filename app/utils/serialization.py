@@ -0,0 +1,187 @@
+# JSON encoding for MongoDB documents
+
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+
+def to_jsonable(value):
+    """Recursively convert BSON types (ObjectId, datetime) into JSON-compatible values."""
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(value) -> bytes:
+    """Encode a document straight from BSON types, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, separators=(",", ":"), default=_default).encode()
+
+
+def dumps(value) -> str:
+    return dumps_bytes(value).decode()
+
+
+# Result shaping for agent tools
+
+# Dropped from every tool result unless a shape asks for them
+BOOKKEEPING_FIELDS = frozenset({"created_at", "updated_at", "distance_meters"})
+MAX_STRING_CHARS = 280
+
+
+def _compact(value, precision: int):
+    if isinstance(value, dict):
+        coordinates = value.get("coordinates")
+        if value.get("type") == "Point" and isinstance(coordinates, (list, tuple)) and len(coordinates) >= 2:
+            # GeoJSON is [lng, lat]; models get the order wrong less often with named keys
+            return {"lat": round(coordinates[1], precision), "lng": round(coordinates[0], precision)}
+        return {
+            key: _compact(item, precision)
+            for key, item in value.items()
+            if item is not None and item != [] and item != {}
+        }
+    if isinstance(value, (list, tuple)):
+        return [_compact(item, precision) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds")
+    if isinstance(value, float):
+        return round(value, precision)
+    return value
+
+
+def summarize(items: list) -> dict:
+    """Aggregate facts about a full result list, for when only its head is returned."""
+    summary = {}
+    statuses = Counter(item.get("status") for item in items if isinstance(item, dict) and item.get("status"))
+    if statuses:
+        summary["by_status"] = dict(statuses)
+    distances = [item["distance_km"] for item in items if isinstance(item, dict) and "distance_km" in item]
+    if distances:
+        summary["distance_km"] = {"min": round(min(distances), 2), "max": round(max(distances), 2)}
+    return summary
+
+
+@dataclass(frozen=True)
+class ResultShape:
+    """
+    How one tool's result is reduced before it goes into the model context.
+
+    Attributes:
+        fields: Keys kept from each document (``_id`` is renamed ``id``); None keeps
+            everything except ``BOOKKEEPING_FIELDS``.
+        max_items: Lists longer than this are cut to their first items plus a summary.
+        max_bytes: Upper bound on the encoded result; list tails and long strings
+            are trimmed to fit.
+        precision: Decimal places kept for floats (5 is about 1 m of latitude).
+        summary: Builds the summary for truncated lists.
+    """
+
+    fields: Optional[Tuple[str, ...]] = None
+    max_items: Optional[int] = None
+    max_bytes: int = 4096
+    precision: int = 5
+    summary: Callable[[list], dict] = summarize
+
+
+def _project(doc, shape: ResultShape):
+    if not isinstance(doc, dict):
+        return doc
+    if shape.fields is None:
+        kept = {key: value for key, value in doc.items() if key not in BOOKKEEPING_FIELDS}
+    else:
+        kept = {key: doc[key] for key in shape.fields if key in doc}
+        if "error" in doc:
+            # Error results (e.g. a dispatch conflict) must reach the model intact
+            kept["error"] = doc["error"]
+    if "_id" in kept:
+        kept = {"id": kept.pop("_id"), **kept}
+    return kept
+
+
+def _trim_strings(value):
+    if isinstance(value, dict):
+        return {key: _trim_strings(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_trim_strings(item) for item in value]
+    if isinstance(value, str) and len(value) > MAX_STRING_CHARS:
+        return value[:MAX_STRING_CHARS] + "..."
+    return value
+
+
+def shape_result(result: Any, shape: ResultShape) -> Tuple[Any, int]:
+    """
+    Project, compact and truncate a tool result.
+
+    Lists come back as ``{"items": [...], "total": n}``, with ``omitted`` and
+    ``summary`` added when items were cut. Everything else keeps its structure.
+
+    Returns:
+        Tuple[Any, int]: The shaped result and its encoded size in bytes.
+    """
+    if not isinstance(result, list):
+        shaped = _compact(_project(result, shape), shape.precision)
+        size = len(dumps_bytes(shaped))
+        if size > shape.max_bytes:
+            shaped = _trim_strings(shaped)
+            size = len(dumps_bytes(shaped))
+        return shaped, size
+
+    total = len(result)
+    limit = total if shape.max_items is None else min(total, shape.max_items)
+    items = [_compact(_project(doc, shape), shape.precision) for doc in result[:limit]]
+    summary = None
+
+    def build(count: int) -> dict:
+        nonlocal summary
+        shaped = {"items": items[:count], "total": total}
+        if count < total:
+            shaped["omitted"] = total - count
+            if summary is None:
+                summary = shape.summary([_project(doc, shape) for doc in result])
+            if summary:
+                shaped["summary"] = summary
+        return shaped
+
+    shaped = build(limit)
+    size = len(dumps_bytes(shaped))
+    if size > shape.max_bytes and limit > 1:
+        # Largest prefix that fits; always keep the first (nearest) item
+        low, high = 1, limit - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if len(dumps_bytes(build(middle))) <= shape.max_bytes:
+                low = middle
+            else:
+                high = middle - 1
+        shaped = build(low)
+        size = len(dumps_bytes(shaped))
+    if size > shape.max_bytes:
+        shaped = _trim_strings(shaped)
+        size = len(dumps_bytes(shaped))
+    return shaped, size
@@ -0,0 +1,98 @@
+"""
+Incident-to-dispatch time, single agent vs orchestrated specialists.
+
+Usage:
+    python seed.py                                   # responders and hospitals to dispatch from
+    python -m benchmarks.bench_incident_to_dispatch
+    python -m benchmarks.bench_incident_to_dispatch --calls 10 --modes orchestrated
+
+Plays a scripted caller against the root agent through ``run_async`` (text, with
+the agent moved to SPECIALIST_MODEL, since live models cannot be driven turn by
+turn) and reads the ``incident_to_dispatch_seconds`` histogram: the time from
+``create_incident`` to the first unit reserved for it, by whichever agent gets
+there first. In orchestrated mode the specialists run in the background as they
+would beside a live call; their messages are not fed back into a text session.
+Dispatched responders are made available again after each call. Needs
+GOOGLE_API_KEY and a MongoDB at MONGODB_URL.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+CALLER_TURNS = (
+    "Help, my father just collapsed and he's not breathing! My name is Dana Ruiz.",
+    "We're at 350 Fifth Avenue, New York, in the lobby. My number is 212 555 0147.",
+    "He's 67 and has a heart condition. I'm starting CPR now, please send someone.",
+    "Is the ambulance coming?",
+)
+
+
+async def call(runner, user_id: str, mode: str, wait: float):
+    from google.genai import types
+    from app.core.metrics import INCIDENT_TO_DISPATCH
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    dispatched = INCIDENT_TO_DISPATCH.count(mode=mode)
+    seconds = INCIDENT_TO_DISPATCH.total(mode=mode)
+    for text in CALLER_TURNS:
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            pass
+        if INCIDENT_TO_DISPATCH.count(mode=mode) > dispatched:
+            break
+    deadline = time.monotonic() + wait
+    while INCIDENT_TO_DISPATCH.count(mode=mode) == dispatched and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if INCIDENT_TO_DISPATCH.count(mode=mode) == dispatched:
+        return None
+    return INCIDENT_TO_DISPATCH.total(mode=mode) - seconds
+
+
+async def release_responders():
+    from app.db import crud
+    from app.db.session import get_db
+
+    db = await get_db()
+    async for responder in db.responders.find({"status": "en_route"}, {"_id": 1}):
+        await crud.update_responder_status(str(responder["_id"]), "available")
+
+
+async def run(args):
+    from google.adk.runners import InMemoryRunner
+    from app.agents.agent import root_agent
+    from app.core.config import settings
+    from app.services.orchestrator import orchestrator
+
+    runner = InMemoryRunner(
+        agent=root_agent.model_copy(update={"model": settings.SPECIALIST_MODEL}),
+        app_name="bench_incident_to_dispatch",
+    )
+    for mode in args.modes:
+        settings.AGENT_MODE = mode
+        samples = []
+        for i in range(args.calls):
+            seconds = await call(runner, f"bench-{mode}-{i}", mode, args.wait)
+            if seconds is not None:
+                samples.append(seconds)
+            await orchestrator.close()
+            await release_responders()
+        if samples:
+            print(
+                f"{mode:<14} dispatched {len(samples)}/{args.calls}   "
+                f"p50 {statistics.median(samples):6.2f} s   max {max(samples):6.2f} s"
+            )
+        else:
+            print(f"{mode:<14} no dispatch in {args.calls} calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["single", "orchestrated"], choices=["single", "orchestrated"])
+    parser.add_argument("--wait", type=float, default=60.0, help="seconds to wait for a dispatch after the script ends")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
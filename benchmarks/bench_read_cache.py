@@ -0,0 +1,95 @@
+"""
+Repeat-lookup latency through the CRUD read cache.
+
+Usage:
+    python -m benchmarks.bench_read_cache            # cache overhead with a simulated 2 ms query
+    python -m benchmarks.bench_read_cache --mongo    # get_hospital/get_all_hospitals against MONGODB_URL
+
+Measures the first (miss) and repeated (hit) lookup latency, and what an
+invalidation costs. The MongoDB run points DATABASE_NAME at a scratch
+``bench_read_cache`` database and drops it afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from bson import ObjectId
+
+
+async def timed(call, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"  {label:<28} p50 {statistics.median(samples):8.4f} ms   p99 {p99:8.4f} ms")
+
+
+async def run(args):
+    if args.mongo:
+        os.environ["DATABASE_NAME"] = "bench_read_cache"
+    from app.services.read_cache import ReadCache, hospital_tag, read_cache
+
+    if not args.mongo:
+        cache = ReadCache(ttl=60, max_entries=10000)
+        docs = [{"_id": ObjectId(), "name": f"Hospital {i}", "beds_available": i} for i in range(args.hospitals)]
+
+        async def load():
+            await asyncio.sleep(args.query_ms / 1000)
+            return docs
+
+        def tags(value):
+            return [hospital_tag(d["_id"]) for d in value]
+
+        print(f"simulated {args.query_ms} ms query, list of {args.hospitals} hospitals")
+        report("miss", await timed(lambda: cache.get_or_load(("hospitals",), load, tags), 1))
+        report("hit", await timed(lambda: cache.get_or_load(("hospitals",), load, tags), args.repeat))
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            cache.invalidate(hospital_tag(docs[0]["_id"]))
+        print(f"  invalidate (no entry)        {(time.perf_counter() - started) * 1e6 / args.repeat:8.2f} us")
+        return
+
+    from app.db import crud
+    from app.db.session import client, get_db
+
+    db = await get_db()
+    await db.hospitals.insert_many(
+        [{"name": f"Hospital {i}", "beds_available": i} for i in range(args.hospitals)]
+    )
+    try:
+        hospital_id = str((await db.hospitals.find_one())["_id"])
+        print(f"{args.hospitals} hospitals")
+        for label, call in (
+            ("get_hospital", lambda: crud.get_hospital(hospital_id)),
+            ("get_all_hospitals", crud.get_all_hospitals),
+        ):
+            read_cache.clear()
+            report(f"{label} miss", await timed(call, 1))
+            report(f"{label} hit", await timed(call, args.repeat))
+            read_cache.enabled = False
+            report(f"{label} uncached", await timed(call, args.repeat))
+            read_cache.enabled = True
+    finally:
+        await client.drop_database(db.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hospitals", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--query-ms", type=float, default=2.0, help="simulated query time without --mongo")
+    parser.add_argument("--mongo", action="store_true", help="run the CRUD functions against MongoDB")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
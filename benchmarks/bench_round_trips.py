@@ -0,0 +1,93 @@
+"""
+Count MongoDB round trips per agent tool call.
+
+Usage:
+    python -m benchmarks.bench_round_trips
+
+Runs each mutator once against a scratch database (DATABASE_NAME is overridden
+to ``bench_round_trips`` and dropped afterwards) and prints the commands sent
+to the server and the wall time per call. Requires MONGODB_URL to be reachable.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# The listener must be registered before app.db.session creates its client
+counter = CommandCounter()
+monitoring.register(counter)
+os.environ["DATABASE_NAME"] = "bench_round_trips"
+os.environ["SPATIAL_INDEX_ENABLED"] = "false"
+
+from app.db import crud  # noqa: E402
+from app.db.session import client, get_db  # noqa: E402
+
+
+async def measure(label: str, call):
+    counter.commands.clear()
+    started = time.perf_counter()
+    result = await call
+    elapsed_ms = (time.perf_counter() - started) * 1e3
+    trips = sum(counter.commands.values())
+    detail = ", ".join(f"{name}={n}" for name, n in sorted(counter.commands.items()))
+    print(f"{label:<32} {trips:>2} round trips  {elapsed_ms:7.2f} ms  ({detail})")
+    return result
+
+
+async def main():
+    db = await get_db()
+    await client.drop_database(db.name)
+    try:
+        await measure("create_user", crud.create_user({"name": "Bench", "email": "b@example.com"}))
+        hospital = await measure("create_hospital", crud.create_hospital({
+            "name": "Bench Hospital", "status": "operational", "beds_available": 10,
+            "location": {"type": "Point", "coordinates": [-74.0, 40.7]},
+        }))
+        hospital_id = str(hospital["_id"])
+        await measure("update_hospital_beds", crud.update_hospital_beds(hospital_id, 9))
+        ambulance = await measure("create_ambulance", crud.create_ambulance({
+            "hospital_id": hospital_id, "vehicle_number": "B-1", "status": "operational",
+        }))
+        ambulance_id = str(ambulance["_id"])
+        await measure("update_ambulance_status", crud.update_ambulance_status(ambulance_id, "operational"))
+        await measure("update_ambulance_location",
+                      crud.update_ambulance_location(ambulance_id, {"lat": 40.7, "lng": -74.0}))
+        incident_id = await crud.create_incident({"caller_name": "Bench", "location": {"lat": 40.7, "lng": -74.0}})
+        await measure("assign_ambulance_to_incident", crud.assign_ambulance_to_incident({
+            "ambulance_id": ambulance_id, "incident_id": incident_id,
+            "hospital_id": hospital_id, "status": "assigned",
+        }))
+        responder = await measure("create_responder", crud.create_responder({
+            "name": "Bench Unit", "status": "available", "vehicle_type": "ambulance",
+            "location": {"type": "Point", "coordinates": [-74.0, 40.7]},
+        }))
+        responder_id = str(responder["_id"])
+        await measure("update_responder_status", crud.update_responder_status(responder_id, "available"))
+        await measure("assign_responder_to_incident", crud.assign_responder_to_incident(incident_id, responder_id))
+        response = await measure("create_response", crud.create_response({
+            "incident_id": incident_id, "responder_id": responder_id, "status": "dispatched",
+        }))
+        await measure("update_response_status", crud.update_response_status(str(response["_id"]), "arrived"))
+    finally:
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
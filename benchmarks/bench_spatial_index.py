@@ -0,0 +1,118 @@
+"""
+Nearest-responder lookups: in-memory SpatialIndex vs MongoDB $geoNear.
+
+Usage:
+    python -m benchmarks.bench_spatial_index            # index only
+    python -m benchmarks.bench_spatial_index --mongo    # also MongoDB (uses MONGODB_URL)
+
+The MongoDB run writes to a scratch ``bench_responders`` collection and drops it afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from bson import ObjectId
+
+from app.services.spatial_index import SpatialIndex
+
+# Roughly the New York metro area
+LAT_RANGE = (40.45, 40.95)
+LNG_RANGE = (-74.30, -73.65)
+STATUSES = ["available", "available", "en_route", "busy", "offline"]
+VEHICLES = ["ambulance", "paramedic", "fire_truck"]
+
+
+def make_units(n: int, rng: random.Random) -> list:
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Unit {i}",
+            "location": {
+                "type": "Point",
+                "coordinates": [rng.uniform(*LNG_RANGE), rng.uniform(*LAT_RANGE)],
+            },
+            "status": rng.choice(STATUSES),
+            "vehicle_type": rng.choice(VEHICLES),
+        }
+        for i in range(n)
+    ]
+
+
+def make_queries(n: int, rng: random.Random) -> list:
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(n)]
+
+
+def summarize(label: str, samples: list):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1e6
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+    print(f"  {label:<10} p50 {p50:10.1f} us   p99 {p99:10.1f} us")
+
+
+def bench_index(units: list, queries: list, conditions: dict):
+    index = SpatialIndex()
+    started = time.perf_counter()
+    index.replace_all(units)
+    print(f"  build      {(time.perf_counter() - started) * 1e3:10.1f} ms")
+    samples = []
+    for lat, lng in queries:
+        started = time.perf_counter()
+        index.nearest(lat, lng, 10, 10.0, conditions)
+        samples.append(time.perf_counter() - started)
+    summarize("index", samples)
+
+
+async def bench_mongo(units: list, queries: list, conditions: dict):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    collection = client[os.getenv("DATABASE_NAME", "emergency")].bench_responders
+    await collection.drop()
+    await collection.insert_many([dict(unit) for unit in units])
+    await collection.create_index([("location", "2dsphere")])
+    samples = []
+    try:
+        for lat, lng in queries:
+            pipeline = [
+                {
+                    "$geoNear": {
+                        "near": {"type": "Point", "coordinates": [lng, lat]},
+                        "distanceField": "distance_meters",
+                        "maxDistance": 10_000,
+                        "spherical": True,
+                    }
+                },
+                {"$match": conditions},
+                {"$limit": 10},
+            ]
+            started = time.perf_counter()
+            await collection.aggregate(pipeline).to_list(length=10)
+            samples.append(time.perf_counter() - started)
+    finally:
+        await collection.drop()
+    summarize("mongo", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--mongo", action="store_true", help="also benchmark MongoDB $geoNear")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    conditions = {"status": "available", "vehicle_type": "ambulance"}
+    queries = make_queries(args.queries, rng)
+    for size in args.sizes:
+        units = make_units(size, rng)
+        print(f"{size} units, {args.queries} queries (k=10, 10 km, status+vehicle_type filter)")
+        bench_index(units, queries, conditions)
+        if args.mongo:
+            asyncio.run(bench_mongo(units, queries, conditions))
+
+
+if __name__ == "__main__":
+    main()
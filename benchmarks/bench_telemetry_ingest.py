@@ -0,0 +1,83 @@
+"""
+GPS telemetry ingest throughput.
+
+Usage:
+    python -m benchmarks.bench_telemetry_ingest            # buffering/coalescing only
+    python -m benchmarks.bench_telemetry_ingest --mongo    # also time bulk flushes (uses MONGODB_URL)
+
+Simulates a fleet reporting once per second and measures how many reports per
+second the ingestor buffers, how many writes coalescing saves, and (with --mongo)
+how long each unordered bulk_write flush takes. The MongoDB run points
+DATABASE_NAME at a scratch ``bench_telemetry`` database and drops it afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from bson import ObjectId
+
+
+def make_batches(vehicles: list, seconds: int, batch_size: int, rng: random.Random) -> list:
+    reports = []
+    for second in range(seconds):
+        for vehicle_id, kind in vehicles:
+            reports.append({
+                "vehicle_id": vehicle_id,
+                "kind": kind,
+                "lat": 40.7 + rng.uniform(-0.2, 0.2),
+                "lng": -74.0 + rng.uniform(-0.2, 0.2),
+            })
+    rng.shuffle(reports)
+    return [reports[i:i + batch_size] for i in range(0, len(reports), batch_size)]
+
+
+async def run(args):
+    if args.mongo:
+        os.environ["DATABASE_NAME"] = "bench_telemetry"
+    from app.schemas.telemetry import PositionReport
+    from app.services.telemetry import TelemetryIngestor
+
+    rng = random.Random(7)
+    vehicles = [(str(ObjectId()), rng.choice(["ambulance", "responder"])) for _ in range(args.vehicles)]
+    batches = [
+        [PositionReport(**report) for report in batch]
+        for batch in make_batches(vehicles, args.seconds, args.batch_size, rng)
+    ]
+    total = sum(len(batch) for batch in batches)
+
+    ingestor = TelemetryIngestor(max_pending=args.vehicles * 2)
+    started = time.perf_counter()
+    for batch in batches:
+        ingestor.ingest(batch)
+    elapsed = time.perf_counter() - started
+    print(f"{args.vehicles} vehicles x {args.seconds} s, {total} reports in batches of {args.batch_size}")
+    print(f"  ingest      {total / elapsed:12.0f} reports/s")
+    print(f"  coalesced   {ingestor.stats['coalesced']:12d} ({ingestor.stats['coalesced'] / total:.0%} of reports)")
+    print(f"  pending     {ingestor.pending:12d} vehicle writes for one flush")
+
+    if args.mongo:
+        from app.db.session import client, get_db
+
+        db = await get_db()
+        await db.ambulances.insert_many([{"_id": ObjectId(v)} for v, kind in vehicles if kind == "ambulance"])
+        await db.responders.insert_many([{"_id": ObjectId(v)} for v, kind in vehicles if kind == "responder"])
+        try:
+            written = await ingestor.flush()
+            print(f"  flush       {ingestor.stats['last_flush_ms']:12.1f} ms for {written} vehicles")
+        finally:
+            await client.drop_database(db.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--seconds", type=int, default=10, help="reports per vehicle in one flush window")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--mongo", action="store_true", help="also time the bulk_write flush")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
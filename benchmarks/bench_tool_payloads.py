@@ -0,0 +1,109 @@
+"""
+Serialized size of agent tool results, raw vs shaped.
+
+Usage:
+    python -m benchmarks.bench_tool_payloads
+    python -m benchmarks.bench_tool_payloads --hospitals 500 --ambulances 40
+
+Builds documents shaped like the seeded collections (ObjectIds, timestamps,
+GeoJSON locations) and reports, per tool, the bytes the model would receive
+from the raw CRUD result versus the result after ResultShape, plus the time
+spent shaping. Needs no database.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+
+def _point(rng: random.Random) -> dict:
+    return {"type": "Point", "coordinates": [-74.0 + rng.uniform(-0.3, 0.3), 40.7 + rng.uniform(-0.3, 0.3)]}
+
+
+def make_hospitals(count: int, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(count):
+        docs.append({
+            "_id": ObjectId(),
+            "name": f"General Hospital {i}",
+            "location": _point(rng),
+            "address": f"{rng.randint(1, 999)} Main Street, Borough {i % 5}, New York, NY 100{i % 90:02d}",
+            "beds_available": rng.randint(0, 40),
+            "specialties": rng.sample(["emergency", "cardiology", "trauma", "pediatrics", "burns", "neurology"], 3),
+            "contact_phone": f"+1-212-555-{i:04d}",
+            "status": rng.choice(["operational", "operational", "overloaded"]),
+            "created_at": now,
+            "updated_at": now,
+        })
+    return docs
+
+
+def make_ambulances(count: int, hospital_id: str, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    return [{
+        "_id": ObjectId(),
+        "hospital_id": hospital_id,
+        "address": "Depot 4, West Side Highway",
+        "contact_phone": f"+1-212-555-9{i:03d}",
+        "status": rng.choice(["operational", "en_route", "overloaded"]),
+        "vehicle_number": f"NY-AMB-{i:04d}",
+        "driver_name": f"Driver {i}",
+        "driver_phone": f"+1-917-555-{i:04d}",
+        "equipment": ["defibrillator", "oxygen", "stretcher"],
+        "capacity": 2,
+        "current_location": {"lat": 40.7 + rng.uniform(-0.1, 0.1), "lng": -74.0 + rng.uniform(-0.1, 0.1)},
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(count)]
+
+
+def with_distances(docs: list, rng: random.Random) -> list:
+    out = []
+    for doc in docs:
+        meters = rng.uniform(100, 20000)
+        out.append({**doc, "distance_meters": meters, "distance_km": meters / 1000})
+    return sorted(out, key=lambda d: d["distance_meters"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hospitals", type=int, default=200)
+    parser.add_argument("--ambulances", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.agents.tools.base import DEFAULT_SHAPE
+    from app.agents.tools.ambulance import AMBULANCE_SHAPE
+    from app.agents.tools.hospital import HOSPITAL_SHAPE
+    from app.agents.tools.fetch_nearby import NEARBY_HOSPITAL_SHAPE
+    from app.utils.serialization import shape_result, to_jsonable
+
+    rng = random.Random(11)
+    hospitals = make_hospitals(args.hospitals, rng)
+    ambulances = make_ambulances(args.ambulances, str(hospitals[0]["_id"]), rng)
+    cases = [
+        ("get_hospital", hospitals[0], HOSPITAL_SHAPE),
+        ("get_all_hospitals", hospitals, HOSPITAL_SHAPE),
+        ("get_nearby_hospitals", with_distances(hospitals[:20], rng)[:5], NEARBY_HOSPITAL_SHAPE),
+        ("get_ambulance", ambulances[0], AMBULANCE_SHAPE),
+        ("get_ambulances_by_hospital", ambulances, AMBULANCE_SHAPE),
+        ("unshaped tool (default)", hospitals, DEFAULT_SHAPE),
+    ]
+
+    print(f"{'tool':<28}{'raw bytes':>12}{'shaped bytes':>14}{'ratio':>8}{'shape us':>10}")
+    for name, result, shape in cases:
+        raw = len(json.dumps(to_jsonable(result)).encode())
+        shaped, size = shape_result(result, shape)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            shape_result(result, shape)
+        micros = (time.perf_counter() - started) * 1e6 / args.repeat
+        print(f"{name:<28}{raw:>12}{size:>14}{raw / size:>7.1f}x{micros:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,44 @@
 import multiprocessing
+import os
 
-max_requests = 1000
-max_requests_jitter = 50
+# Request-count recycling would cut off live calls; workers recycle by live sessions
+# instead (app/services/drain.py): after WORKER_RECYCLE_SESSIONS a worker stops taking
+# WebSockets, lets its calls finish (up to DRAIN_TIMEOUT_SECONDS) and exits.
+max_requests = 0
+os.environ.setdefault("WORKER_RECYCLE_SESSIONS", "500")
+os.environ.setdefault("WORKER_RECYCLE_JITTER", "50")
+
+# Deploys: once traffic goes to the new release, touch DRAIN_FILE so this release's
+# workers finish their calls before exiting; only workers started before the touch
+# drain, one at a time (lowest pid first, coordinated through WORKER_STATE_DIR).
+# Draining workers answer new WebSockets with close code 1013 and the client retries
+# on another worker, so recycling needs no load balancer change. With every worker
+# waiting up to DRAIN_TIMEOUT_SECONDS in turn, a full rollover can take a while.
+drain_file = os.environ.setdefault("DRAIN_FILE", "/tmp/emergency-backend.drain")
+state_dir = os.environ.setdefault("WORKER_STATE_DIR", "/tmp/emergency-backend-workers")
+
+# SIGTERM still arrives for shutdowns and HUP reloads; give calls some time then
+graceful_timeout = 60
 
 log_file = "-"
 
 bind = "0.0.0.0:3100"
 
 worker_class = "uvicorn.workers.UvicornWorker"
-workers = (multiprocessing.cpu_count() * 2) + 1
\ No newline at end of file
+workers = (multiprocessing.cpu_count() * 2) + 1
+
+# Import the agent libraries once in the master: replacement workers are forked with
+# them loaded instead of paying the cold import on every recycle
+try:
+    import google.adk.runners  # noqa: F401
+    import google.genai  # noqa: F401
+except ImportError:
+    pass
+
+
+def child_exit(server, worker):
+    # A worker that crashed never removed its state file
+    try:
+        os.remove(os.path.join(state_dir, f"{worker.pid}.json"))
+    except OSError:
+        pass
@@ -2,8 +2,10 @@ import os
 import json
 import asyncio
 import base64
+import time
 import warnings
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -13,19 +15,40 @@ from google.genai.types import (
     Blob,
 )
 
-from google.adk.runners import InMemoryRunner
 from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
+from google.adk.events import Event, EventActions
 from google.genai import types
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import incident
+from app.api import dashboard, debug, incident, telemetry, voice
+from app.core.config import settings
+from app.core.diagnostics import loop_monitor
+from app.core.logs import FrameLogger, get_logger, setup_logging, shutdown_logging
+from app.core.metrics import STREAM_RECEIVE_TO_SEND, TurnTimer, registry
+from app.db.indexes import ensure_indexes
+from app.db.session import get_db
+from app.services.session_store import MongoSessionService, create_session_service
+from app.services.sessions import LiveRunner, SessionManager
+from app.services.stream_queue import AUDIO, CONTROL, BoundedLiveRequestQueue, FrameQueue, close_queues, open_queues
+from app.services.spatial_index import load_spatial_indexes, run_spatial_refresh
+from app.services.admission import PRIORITY_NEW, PRIORITY_RECONNECT, admission
+from app.services.counters import live_counters
+from app.services.drain import TRY_AGAIN_LATER, worker_drain
+from app.services.incident_feed import incident_feed
+from app.services.optimizer import dispatch_optimizer
+from app.services.orchestrator import orchestrator
+from app.services.routing import road_router
+from app.services.telemetry import telemetry_ingestor
+from app.services.vad import close_gate, open_gate
 
 from app.agents.agent import root_agent
+from app.agents.tools.phases import LIVE_KEY, call_start_state
+from app.utils.frames import KIND_AUDIO_PCM, decode_frame, encode_audio_frame
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
 #
@@ -37,31 +60,61 @@ load_dotenv()
 
 APP_NAME = "ADK Streaming example"
 
+setup_logging()
+logger = get_logger("stream")
 
-async def start_agent_session(user_id, is_audio=False):
+# One Runner per worker: tool declarations and the session store are shared by all calls
+session_service = create_session_service()
+runner = LiveRunner(
+    app_name=APP_NAME,
+    agent=root_agent,
+    session_service=session_service,
+)
+
+session_manager = SessionManager(
+    session_service,
+    app_name=APP_NAME,
+    max_sessions=settings.SESSION_MAX,
+    idle_ttl=settings.SESSION_IDLE_TTL_SECONDS,
+    shared=isinstance(session_service, MongoSessionService),
+    handle_ttl=settings.SESSION_RESUMPTION_MAX_AGE_SECONDS,
+)
+
+
+async def start_agent_session(user_id, is_audio=False, inbound=None):
     """Starts an agent session"""
 
-    # Create a Runner
-    runner = InMemoryRunner(
-        app_name=APP_NAME,
-        agent=root_agent,
-    )
+    # Reuse the caller's warm session or create a new one
+    session = await session_manager.acquire(user_id)
+    handle = session_manager.resumption_handle(user_id)
 
-    # Create a Session
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,  # Replace with actual user ID
-    )
+    # A fresh call starts a new incident in intake; a resumed one carries on
+    try:
+        await session_service.append_event(
+            session, Event(author="system", actions=EventActions(state_delta=call_start_state(user_id, resumed=handle is not None)))
+        )
+    except BaseException:
+        # The call never starts; give the session back
+        session_manager.release(user_id)
+        raise
 
     # Set response modality
     modality = "AUDIO" if is_audio else "TEXT"
+    realtime_input_config = None
+    if is_audio and settings.VAD_ENABLED and settings.VAD_ACTIVITY_MARKERS:
+        # Turns are delimited by the VAD gate's activity markers instead
+        realtime_input_config = types.RealtimeInputConfig(
+            automatic_activity_detection=types.AutomaticActivityDetection(disabled=True)
+        )
     run_config = RunConfig(
         response_modalities=[modality],
-        session_resumption=types.SessionResumptionConfig()
+        # Resume the model's side of the caller's previous call, whichever worker served it
+        session_resumption=types.SessionResumptionConfig(handle=handle),
+        realtime_input_config=realtime_input_config,
     )
 
-    # Create a LiveRequestQueue for this session
-    live_request_queue = LiveRequestQueue()
+    # Create a LiveRequestQueue for this session, bounded when an inbound queue is given
+    live_request_queue = BoundedLiveRequestQueue(inbound) if inbound is not None else LiveRequestQueue()
 
     # Start agent session
     live_events = runner.run_live(
@@ -69,59 +122,136 @@ async def start_agent_session(user_id, is_audio=False):
         live_request_queue=live_request_queue,
         run_config=run_config,
     )
-    return live_events, live_request_queue
+    # Live tool set for this call only; append_event never stores temp: state, so set it directly
+    session.state[LIVE_KEY] = True
+    return session, live_events, live_request_queue
 
 
-async def agent_to_client_messaging(websocket, live_events):
+async def agent_to_client_messaging(websocket, live_events, binary=False, session_id="", turn_timer=None, outbound=None):
     """Agent to client communication"""
-    async for event in live_events:
-
-        # If the turn complete or interrupted, send it
-        if event.turn_complete or event.interrupted:
-            message = {
-                "turn_complete": event.turn_complete,
-                "interrupted": event.interrupted,
-            }
-            await websocket.send_text(json.dumps(message))
-            print(f"[AGENT TO CLIENT]: {message}")
-            continue
+    turn_timer = turn_timer or TurnTimer()
+    outbound = outbound or FrameQueue("outbound")
+    frames = FrameLogger(logger, session_id, "agent_to_client", settings.LOG_FRAME_SAMPLE_EVERY)
+    # The WebSocket is written by its own task so a slow client never holds up the model's events
+    sender = asyncio.create_task(send_to_client(websocket, outbound, binary, turn_timer, frames))
+    try:
+        async for event in live_events:
+            if sender.done():
+                # The client went away; surface why
+                sender.result()
+                return
+
+            # If the turn complete or interrupted, send it
+            if event.turn_complete or event.interrupted:
+                if event.interrupted:
+                    # The caller spoke over the agent; speech still queued is stale
+                    outbound.purge_audio()
+                outbound.put_control({
+                    "turn_complete": event.turn_complete,
+                    "interrupted": event.interrupted,
+                })
+                continue
 
-        # Read the Content and its first Part
-        part: Part = (
-            event.content and event.content.parts and event.content.parts[0]
-        )
-        if not part:
+            # Read the Content and its first Part
+            part: Part = (
+                event.content and event.content.parts and event.content.parts[0]
+            )
+            if not part:
+                continue
+
+            # If it's audio, queue the raw PCM
+            is_audio = part.inline_data and part.inline_data.mime_type.startswith("audio/pcm")
+            if is_audio:
+                audio_data = part.inline_data and part.inline_data.data
+                if audio_data:
+                    outbound.put_audio(audio_data)
+                continue
+
+            # If it's text and a partial text, queue it
+            if part.text and event.partial:
+                outbound.put_text(part.text)
+
+        # The model stream ended; let what is queued go out
+        outbound.put_control(None)
+        await sender
+    finally:
+        sender.cancel()
+
+
+async def send_to_client(websocket, outbound, binary, turn_timer, frames):
+    """Writes queued frames to the client in order until a None control frame"""
+    sequence = 0
+    while True:
+        frame = await outbound.get()
+        if frame.kind == CONTROL:
+            if frame.payload is None:
+                return
+            await websocket.send_text(json.dumps(frame.payload))
+            if frame.payload["turn_complete"]:
+                turn_timer.turn_complete()
+            frames.event("turn", **frame.payload)
             continue
 
-        # If it's audio, send Base64 encoded audio data
-        is_audio = part.inline_data and part.inline_data.mime_type.startswith("audio/pcm")
-        if is_audio:
-            audio_data = part.inline_data and part.inline_data.data
-            if audio_data:
+        # Raw PCM in binary mode, Base64 in JSON mode
+        if frame.kind == AUDIO:
+            if binary:
+                await websocket.send_bytes(encode_audio_frame(frame.payload, sequence))
+                sequence = (sequence + 1) & 0xFFFF
+                frames.frame("audio_binary", len(frame.payload), frame.queued_at)
+            else:
                 message = {
                     "mime_type": "audio/pcm",
-                    "data": base64.b64encode(audio_data).decode("ascii")
+                    "data": base64.b64encode(frame.payload).decode("ascii")
                 }
                 await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
-                continue
+                frames.frame("audio", len(frame.payload), frame.queued_at)
+            turn_timer.agent_audio()
+            continue
 
-        # If it's text and a partial text, send it
-        if part.text and event.partial:
-            message = {
-                "mime_type": "text/plain",
-                "data": part.text
-            }
-            await websocket.send_text(json.dumps(message))
-            print(f"[AGENT TO CLIENT]: text/plain: {message}")
+        text = frame.payload
+        if len(text) < settings.STREAM_TEXT_COALESCE_CHARS and settings.STREAM_TEXT_COALESCE_MS > 0:
+            # Give the next partials a moment to arrive and send them in one frame
+            await asyncio.sleep(settings.STREAM_TEXT_COALESCE_MS / 1000)
+            text += outbound.take_text()
+        message = {
+            "mime_type": "text/plain",
+            "data": text
+        }
+        await websocket.send_text(json.dumps(message))
+        frames.frame("text", len(text), frame.queued_at)
 
 
-async def client_to_agent_messaging(websocket, live_request_queue):
+async def client_to_agent_messaging(websocket, live_request_queue, vad_gate=None, session_id="", turn_timer=None):
     """Client to agent communication"""
+    turn_timer = turn_timer or TurnTimer()
+    frames = FrameLogger(logger, session_id, "client_to_agent", settings.LOG_FRAME_SAMPLE_EVERY)
+
+    async def send_audio(pcm):
+        # Drop silence before it goes upstream when a VAD gate is configured
+        if vad_gate is not None:
+            await vad_gate.push(pcm)
+        else:
+            live_request_queue.send_realtime(Blob(data=pcm, mime_type="audio/pcm"))
+
     while True:
+        frame = await websocket.receive()
+        started = time.perf_counter()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+
+        # Binary frames carry raw PCM behind a fixed header
+        if frame.get("bytes") is not None:
+            kind, _, payload = decode_frame(frame["bytes"])
+            if kind != KIND_AUDIO_PCM:
+                raise ValueError(f"Binary frame kind not supported: {kind}")
+            turn_timer.caller_audio(payload, started)
+            await send_audio(payload)
+            STREAM_RECEIVE_TO_SEND.observe(time.perf_counter() - started, kind="audio")
+            frames.frame("audio_binary", len(payload), started)
+            continue
+
         # Decode JSON message
-        message_json = await websocket.receive_text()
-        message = json.loads(message_json)
+        message = json.loads(frame["text"])
         mime_type = message["mime_type"]
         data = message["data"]
 
@@ -129,21 +259,156 @@ async def client_to_agent_messaging(websocket, live_request_queue):
         if mime_type == "text/plain":
             # Send a text message
             content = Content(role="user", parts=[Part.from_text(text=data)])
+            turn_timer.caller_text(started)
             live_request_queue.send_content(content=content)
-            print(f"[CLIENT TO AGENT]: {data}")
+            STREAM_RECEIVE_TO_SEND.observe(time.perf_counter() - started, kind="text")
+            frames.event("text", chars=len(data))
         elif mime_type == "audio/pcm":
             # Send an audio data
             decoded_data = base64.b64decode(data)
-            live_request_queue.send_realtime(Blob(data=decoded_data, mime_type=mime_type))
+            turn_timer.caller_audio(decoded_data, started)
+            await send_audio(decoded_data)
+            STREAM_RECEIVE_TO_SEND.observe(time.perf_counter() - started, kind="audio")
+            frames.frame("audio", len(decoded_data), started)
         else:
             raise ValueError(f"Mime type not supported: {mime_type}")
 
 
+HOLD_MESSAGE = (
+    "All call-takers on this line are busy. Please stay connected; your call will start "
+    "automatically. If anyone is in immediate danger, also call your local emergency number."
+)
+
+
+async def discard_until_disconnect(websocket):
+    """Reads and drops frames from a caller on hold; returns when they hang up"""
+    while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            return
+
+
+def cleanup(step: str, action, *args):
+    """Run one connection teardown step; a failure is logged and the remaining steps still run."""
+    try:
+        action(*args)
+    except Exception:
+        logger.exception("connection cleanup failed", extra={"fields": {"step": step}})
+
+
+async def hold_until_admitted(websocket, user_id):
+    """Admits the call, holding the caller while the worker is at capacity; False if it must not start"""
+    if admission.try_admit():
+        return True
+    priority = PRIORITY_RECONNECT if user_id in session_manager else PRIORITY_NEW
+    ticket = admission.enqueue(priority)
+    if ticket is None:
+        # The hold queue is full too; the retry may land on a less loaded worker
+        await websocket.close(code=TRY_AGAIN_LATER, reason="busy")
+        return False
+
+    hung_up = asyncio.create_task(discard_until_disconnect(websocket))
+    deadline = time.monotonic() + settings.ADMISSION_MAX_WAIT_SECONDS
+    try:
+        while not ticket.done() and not hung_up.done():
+            # A text update right away and then periodically, instead of a silent stream
+            await websocket.send_text(json.dumps({
+                "hold": True,
+                "position": admission.position(ticket),
+                "message": HOLD_MESSAGE,
+            }))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.wait(
+                [ticket, hung_up],
+                timeout=min(remaining, settings.ADMISSION_HOLD_UPDATE_SECONDS),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        caller_left = hung_up.done()
+    except Exception:
+        # The hold update could not be sent
+        caller_left = True
+    finally:
+        hung_up.cancel()
+    if ticket.done() and not caller_left:
+        logger.info("call admitted after hold", extra={"fields": {"session_id": user_id}})
+        return True
+    # Timed out or hung up; a slot granted meanwhile goes to the next caller
+    admission.cancel(ticket)
+    if not caller_left:
+        await websocket.close(code=TRY_AGAIN_LATER, reason="busy")
+    return False
+
+
 #
 # FastAPI web app
 #
 
-app = FastAPI(title="AI for Good - Blood Management & Chatbot")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = await get_db()
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Index creation failed: {e}")
+    try:
+        # Loads the shared totals, recounting if the stats document does not exist yet
+        await live_counters.flush()
+    except Exception as e:
+        logger.error(f"Live counters load failed: {e}")
+
+    background_tasks = [
+        asyncio.create_task(
+            session_manager.run_eviction(settings.SESSION_EVICTION_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(telemetry_ingestor.run()),
+        asyncio.create_task(incident_feed.run()),
+        asyncio.create_task(live_counters.run()),
+        asyncio.create_task(dispatch_optimizer.run()),
+        asyncio.create_task(worker_drain.run()),
+        asyncio.create_task(admission.run()),
+        asyncio.create_task(loop_monitor.run()),
+    ]
+    if isinstance(session_service, MongoSessionService):
+        background_tasks.append(asyncio.create_task(session_service.run()))
+    if settings.SPATIAL_INDEX_ENABLED:
+        try:
+            await load_spatial_indexes(db)
+        except Exception as e:
+            # Nearby queries keep using $geoNear until the next refresh succeeds
+            logger.error(f"Spatial index load failed: {e}")
+        background_tasks.append(
+            asyncio.create_task(run_spatial_refresh(
+                db, settings.SPATIAL_INDEX_REFRESH_SECONDS, settings.SPATIAL_INDEX_FULL_REFRESH_SECONDS
+            ))
+        )
+    try:
+        if await road_router.load(settings.ROUTING_NODES_PATH, settings.ROUTING_EDGES_PATH):
+            logger.info(
+                "road graph loaded",
+                extra={"fields": {"nodes": road_router.graph.n, "edges": road_router.graph.edges}},
+            )
+            background_tasks.append(asyncio.create_task(road_router.build_landmarks(settings.ROUTING_LANDMARKS)))
+    except Exception as e:
+        # ETAs stay straight-line estimates
+        logger.error(f"Road graph load failed: {e}")
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # Write out positions, counter deltas, audit records and session events still buffered
+    final_flushes = [telemetry_ingestor.flush(), live_counters.flush(), orchestrator.close()]
+    if isinstance(session_service, MongoSessionService):
+        final_flushes.append(session_service.flush())
+    try:
+        await asyncio.gather(*final_flushes)
+    except Exception as e:
+        logger.error(f"Final flush failed: {e}")
+    worker_drain.remove_state()
+    shutdown_logging()
+
+
+app = FastAPI(title="AI for Good - Blood Management & Chatbot", lifespan=lifespan)
 
 STATIC_DIR = Path("static")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -165,38 +430,102 @@ app.add_middleware(
 # app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 # app.include_router(donors.router, prefix="/donors", tags=["Donors"])
 app.include_router(incident.router, prefix="/incident", tags=["Incident"])
+app.include_router(telemetry.router, prefix="/telemetry", tags=["Telemetry"])
+app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(voice.router, prefix="/voice", tags=["Voice"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
 
 @app.get("/")
 async def root():
     """Serves the index.html"""
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint for this worker"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+async def health():
+    """Liveness for this worker with event-loop lag percentiles and admission state"""
+    return {"status": "ok", **loop_monitor.snapshot(), "admission": admission.state()}
+
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, is_audio: str):
+async def websocket_endpoint(websocket: WebSocket, user_id: int, is_audio: str, binary: str = "false"):
     """Client websocket endpoint"""
 
     # Wait for client connection
     await websocket.accept()
-    print(f"Client #{user_id} connected, audio mode: {is_audio}")
-
-    # Start agent session
+    if not worker_drain.admit():
+        # This worker is about to exit; the client's reconnect lands on another one
+        await websocket.close(code=TRY_AGAIN_LATER, reason="worker draining")
+        return
+    if not await hold_until_admitted(websocket, str(user_id)):
+        return
+
+    # From here on the admission slot is held; every exit path below must give it back
     user_id_str = str(user_id)
-    live_events, live_request_queue = await start_agent_session(user_id_str, is_audio == "true")
-
-    # Start tasks
-    agent_to_client_task = asyncio.create_task(
-        agent_to_client_messaging(websocket, live_events)
-    )
-    client_to_agent_task = asyncio.create_task(
-        client_to_agent_messaging(websocket, live_request_queue)
-    )
+    inbound = outbound = live_request_queue = vad_gate = None
+    session_started = False
+    try:
+        logger.info(
+            "client connected",
+            extra={"fields": {"session_id": user_id_str, "audio": is_audio == "true", "binary": binary == "true"}},
+        )
 
-    # Wait until the websocket is disconnected or an error occurs
-    tasks = [agent_to_client_task, client_to_agent_task]
-    await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        # Confirm binary audio transport; clients that never see this keep using JSON
+        use_binary = binary == "true"
+        if use_binary:
+            await websocket.send_text(json.dumps({"transport": "binary"}))
+
+        # Start agent session
+        inbound, outbound = open_queues(user_id_str)
+        session, live_events, live_request_queue = await start_agent_session(user_id_str, is_audio == "true", inbound)
+        vad_gate = await open_gate(user_id_str, live_request_queue) if is_audio == "true" else None
+        if settings.AGENT_MODE == "orchestrated":
+            orchestrator.attach(user_id_str, live_request_queue)
+
+        worker_drain.session_started()
+        session_started = True
+
+        # Start tasks; both directions share one turn timer
+        turn_timer = TurnTimer()
+        agent_to_client_task = asyncio.create_task(
+            agent_to_client_messaging(websocket, live_events, use_binary, user_id_str, turn_timer, outbound)
+        )
+        client_to_agent_task = asyncio.create_task(
+            client_to_agent_messaging(websocket, live_request_queue, vad_gate, user_id_str, turn_timer)
+        )
 
-    # Close LiveRequestQueue
-    live_request_queue.close()
+        # Wait until the websocket is disconnected or an error occurs
+        tasks = [agent_to_client_task, client_to_agent_task]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            task.cancel()
+    finally:
+        # Close LiveRequestQueue and keep the session warm for a reconnect. Each step
+        # only undoes what was set up, and a failing step does not skip the rest.
+        if vad_gate is not None:
+            cleanup("close vad gate", close_gate, user_id_str, vad_gate)
+            logger.info("vad summary", extra={"fields": {"session_id": user_id_str, **vad_gate.stats}})
+        if live_request_queue is not None:
+            cleanup("detach orchestrator", orchestrator.detach, user_id_str, live_request_queue)
+            cleanup("close live queue", live_request_queue.close)
+            cleanup(
+                "save resumption handle",
+                lambda: session_manager.save_resumption_handle(user_id_str, runner.end_live(live_request_queue)),
+            )
+            cleanup("clear live flag", session.state.pop, LIVE_KEY, None)
+            cleanup("release session", session_manager.release, user_id_str)
+        if session_started:
+            cleanup("end drain session", worker_drain.session_ended)
+        cleanup("release admission slot", admission.release)
+        if inbound is not None:
+            cleanup("close stream queues", close_queues, user_id_str, inbound, outbound)
+            logger.info(
+                "stream queue summary",
+                extra={"fields": {"session_id": user_id_str, "inbound": inbound.stats, "outbound": outbound.stats}},
+            )
 
     # Disconnected
-    print(f"Client #{user_id} disconnected")
\ No newline at end of file
+    logger.info("client disconnected", extra={"fields": {"session_id": user_id_str}})
\ No newline at end of file
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 import os
 import asyncio
 from datetime import datetime, timezone
+from app.db.indexes import ensure_indexes
 
 # Load environment variables
 load_dotenv()
@@ -140,8 +141,7 @@ async def main():
         await db.responses.insert_many(responses)
 
         # Create geospatial indexes for efficient location queries
-        await db.hospitals.create_index([("location", "2dsphere")])
-        await db.responders.create_index([("location", "2dsphere")])
+        await ensure_indexes(db)
 
         print("Emergency system seeding complete!")
         print(f"Seeded {len(hospitals)} hospitals, {len(responders)} responders, {len(incidents)} incidents")
@@ -29,6 +29,11 @@ const ws_url =
 let websocket = null;
 let is_audio = false;
 
+// Binary audio transport: requested on connect, used once the server confirms
+const use_binary = true;
+let binaryNegotiated = false;
+let outboundSequence = 0;
+
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
 const messageInput = document.getElementById("message");
@@ -38,7 +43,11 @@ let currentMessageId = null;
 // WebSocket handlers
 function connectWebsocket() {
   // Connect websocket
-  websocket = new WebSocket(ws_url + "?is_audio=" + is_audio);
+  websocket = new WebSocket(
+    ws_url + "?is_audio=" + is_audio + "&binary=" + use_binary
+  );
+  websocket.binaryType = "arraybuffer";
+  binaryNegotiated = false;
 
   // Handle connection open
   websocket.onopen = function () {
@@ -53,10 +62,31 @@ function connectWebsocket() {
 
   // Handle incoming messages
   websocket.onmessage = function (event) {
+    // Binary frames are raw PCM audio
+    if (event.data instanceof ArrayBuffer) {
+      if (audioPlayerNode) {
+        playAudioFrame(audioPlayerNode, event.data);
+      }
+      return;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
 
+    // The server accepted the binary audio transport
+    if (message_from_server.transport == "binary") {
+      binaryNegotiated = true;
+      return;
+    }
+
+    // Every call-taker is busy; the call starts on its own when a slot frees up
+    if (message_from_server.hold) {
+      messagesDiv.textContent =
+        message_from_server.message + " (position " + message_from_server.position + ")";
+      return;
+    }
+
     // Check if the turn is complete
     // if turn complete, add new message
     if (
@@ -105,7 +135,14 @@ function connectWebsocket() {
   };
 
   // Handle connection close
-  websocket.onclose = function () {
+  websocket.onclose = function (event) {
+    if (event.code === 1013) {
+      // The worker is draining (retry at once, another worker takes it) or
+      // full (back off a little so the retry finds a less loaded one)
+      const delay = event.reason === "busy" ? 2000 + Math.random() * 3000 : 100 + Math.random() * 200;
+      setTimeout(connectWebsocket, delay);
+      return;
+    }
     console.log("WebSocket connection closed.");
     document.getElementById("sendButton").disabled = true;
     document.getElementById("messages").textContent = "Connection closed";
@@ -149,6 +186,20 @@ function sendMessage(message) {
   }
 }
 
+// Send raw PCM as a binary frame: [version, kind, sequence (uint16)] + payload
+function sendAudioFrame(pcmBytes) {
+  if (websocket && websocket.readyState == WebSocket.OPEN) {
+    const frame = new Uint8Array(FRAME_HEADER_BYTES + pcmBytes.byteLength);
+    const header = new DataView(frame.buffer);
+    header.setUint8(0, FRAME_VERSION);
+    header.setUint8(1, FRAME_KIND_AUDIO_PCM);
+    header.setUint16(2, outboundSequence);
+    frame.set(pcmBytes, FRAME_HEADER_BYTES);
+    outboundSequence = (outboundSequence + 1) & 0xffff;
+    websocket.send(frame.buffer);
+  }
+}
+
 // Decode Base64 data to Array
 function base64ToArray(base64) {
   const binaryString = window.atob(base64);
@@ -175,7 +226,13 @@ let audioBuffer = [];
 let bufferTimer = null;
 
 // Import the audio worklets
-import { startAudioPlayerWorklet } from "./audio-player.js";
+import {
+  startAudioPlayerWorklet,
+  playAudioFrame,
+  FRAME_HEADER_BYTES,
+  FRAME_VERSION,
+  FRAME_KIND_AUDIO_PCM,
+} from "./audio-player.js";
 import { startAudioRecorderWorklet } from "./audio-recorder.js";
 
 // Start audio
@@ -237,10 +294,14 @@ function sendBufferedAudio() {
   }
   
   // Send the combined audio data
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(combinedBuffer.buffer),
-  });
+  if (binaryNegotiated) {
+    sendAudioFrame(combinedBuffer);
+  } else {
+    sendMessage({
+      mime_type: "audio/pcm",
+      data: arrayBufferToBase64(combinedBuffer.buffer),
+    });
+  }
   console.log("[CLIENT TO AGENT] sent %s bytes", combinedBuffer.byteLength);
   
   // Clear the buffer
@@ -2,6 +2,11 @@
  * Audio Player Worklet
  */
 
+// Binary audio frame header: version (uint8), kind (uint8), sequence (uint16)
+export const FRAME_HEADER_BYTES = 4;
+export const FRAME_VERSION = 1;
+export const FRAME_KIND_AUDIO_PCM = 1;
+
 export async function startAudioPlayerWorklet() {
     // 1. Create an AudioContext
     const audioContext = new AudioContext({
@@ -21,4 +26,16 @@ export async function startAudioPlayerWorklet() {
 
     // The audioPlayerNode.port is how we send messages (audio data) to the processor
     return [audioPlayerNode, audioContext];
-}
\ No newline at end of file
+}
+
+// Play a binary audio frame received from the server.
+// The header is stripped and the PCM payload is transferred to the worklet without copying again.
+export function playAudioFrame(audioPlayerNode, frame) {
+    const header = new DataView(frame, 0, FRAME_HEADER_BYTES);
+    if (header.getUint8(0) !== FRAME_VERSION || header.getUint8(1) !== FRAME_KIND_AUDIO_PCM) {
+        console.log("Unsupported audio frame, dropping.");
+        return;
+    }
+    const pcm = frame.slice(FRAME_HEADER_BYTES);
+    audioPlayerNode.port.postMessage(pcm, [pcm]);
+}
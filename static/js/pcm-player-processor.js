@@ -21,7 +21,7 @@ class PCMPlayerProcessor extends AudioWorkletProcessor {
         return;
       }
 
-      // Decode the base64 data to int16 array.
+      // Interpret the PCM payload as an int16 array.
       const int16Samples = new Int16Array(event.data);
 
       // Add the audio data to the buffer
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from app.services.geocoding import ReverseGeocoder, StubProvider
+
+PLACE = {"city": "Springfield", "state": "IL", "country": "USA", "postcode": "62701"}
+
+
+class GatedProvider:
+    """Provider whose lookups wait until the test opens the gate."""
+
+    def __init__(self, result=PLACE):
+        self.result = result
+        self.gate = asyncio.Event()
+        self.calls = 0
+
+    async def reverse(self, lat, lng):
+        self.calls += 1
+        await self.gate.wait()
+        return self.result
+
+
+class FailingProvider:
+    async def reverse(self, lat, lng):
+        raise RuntimeError("provider down")
+
+
+def test_cache_hit_shares_rounded_cell():
+    provider = StubProvider(lambda lat, lng: PLACE)
+    geocoder = ReverseGeocoder(provider, precision=3)
+
+    async def run():
+        first = await geocoder.reverse(39.78171, -89.65012)
+        second = await geocoder.reverse(39.78174, -89.65008)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == PLACE
+    assert provider.calls == 1
+    assert geocoder.stats["hits"] == 1
+
+
+def test_results_are_copies():
+    geocoder = ReverseGeocoder(StubProvider(lambda lat, lng: PLACE))
+
+    async def run():
+        first = await geocoder.reverse(1.0, 2.0)
+        first["city"] = "Shelbyville"
+        return await geocoder.reverse(1.0, 2.0)
+
+    assert asyncio.run(run())["city"] == "Springfield"
+
+
+def test_concurrent_lookups_share_one_provider_call():
+    provider = GatedProvider()
+    geocoder = ReverseGeocoder(provider)
+
+    async def run():
+        lookups = [asyncio.ensure_future(geocoder.reverse(10.0, 20.0)) for _ in range(5)]
+        await asyncio.sleep(0)
+        provider.gate.set()
+        return await asyncio.gather(*lookups)
+
+    assert asyncio.run(run()) == [PLACE] * 5
+    assert provider.calls == 1
+    assert geocoder.stats["coalesced"] == 4
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    provider = GatedProvider()
+    geocoder = ReverseGeocoder(provider)
+
+    async def run():
+        leader = asyncio.ensure_future(geocoder.reverse(10.0, 20.0))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(geocoder.reverse(10.0, 20.0))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        provider.gate.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == PLACE
+    assert provider.calls == 1
+
+
+def test_fallback_answer_is_cached_briefly():
+    fallback = StubProvider(lambda lat, lng: {"city": "Nearby", "state": None, "country": None, "postcode": None})
+    geocoder = ReverseGeocoder(FailingProvider(), fallback=fallback, negative_ttl=60)
+
+    async def run():
+        await geocoder.reverse(5.0, 5.0)
+        return await geocoder.reverse(5.0, 5.0)
+
+    assert asyncio.run(run())["city"] == "Nearby"
+    assert fallback.calls == 1
+    assert geocoder.stats["errors"] == 1
+    assert geocoder.stats["fallbacks"] == 1
+    assert geocoder.stats["hits"] == 1
+
+
+def test_fallback_answer_expires_with_negative_ttl():
+    fallback = StubProvider(lambda lat, lng: {"city": "Nearby", "state": None, "country": None, "postcode": None})
+    geocoder = ReverseGeocoder(FailingProvider(), fallback=fallback, negative_ttl=0)
+
+    async def run():
+        await geocoder.reverse(5.0, 5.0)
+        return await geocoder.reverse(5.0, 5.0)
+
+    assert asyncio.run(run())["city"] == "Nearby"
+    assert fallback.calls == 2
+
+
+def test_provider_answer_replaces_negative_entry():
+    answers = [None, PLACE]
+    provider = StubProvider(lambda lat, lng: answers.pop(0))
+    geocoder = ReverseGeocoder(provider, negative_ttl=0)
+
+    async def run():
+        return await geocoder.reverse(7.0, 8.0), await geocoder.reverse(7.0, 8.0), await geocoder.reverse(7.0, 8.0)
+
+    empty, found, cached = asyncio.run(run())
+    assert empty == {}
+    assert found == cached == PLACE
+    assert provider.calls == 2
+
+
+def test_fallback_failure_reaches_every_waiter():
+    class BrokenFallback:
+        async def reverse(self, lat, lng):
+            raise RuntimeError("gazetteer unreadable")
+
+    provider = GatedProvider(result=None)
+    geocoder = ReverseGeocoder(provider, fallback=BrokenFallback())
+
+    async def run():
+        lookups = [asyncio.ensure_future(geocoder.reverse(3.0, 4.0)) for _ in range(3)]
+        await asyncio.sleep(0)
+        provider.gate.set()
+        return await asyncio.gather(*lookups, return_exceptions=True)
+
+    outcomes = asyncio.run(run())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert provider.calls == 1